@@ -14,6 +14,7 @@
 # ============================================================================
 """Sonnet built for TensorFlow 2."""
 
+from sonnet import checkpoint
 from sonnet import distribute
 from sonnet import functional
 from sonnet import initializers
@@ -28,13 +29,18 @@ from sonnet.src.base import allow_empty_variables
 from sonnet.src.base import Module
 from sonnet.src.base import no_name_scope
 from sonnet.src.base import Optimizer
+from sonnet.src.base import skip_eager_name_scopes
 from sonnet.src.batch_apply import BatchApply
 from sonnet.src.batch_apply import merge_leading_dims
 from sonnet.src.batch_apply import split_leading_dim
 from sonnet.src.batch_norm import BaseBatchNorm
 from sonnet.src.batch_norm import BatchNorm
 from sonnet.src.bias import Bias
+from sonnet.src.bucketed_function import bucketed_function
+from sonnet.src.bucketed_function import bucketed_function_cache_info
+from sonnet.src.bucketed_function import CacheInfo
 from sonnet.src.build import build
+from sonnet.src.build import bulk_initialization
 from sonnet.src.conv import Conv1D
 from sonnet.src.conv import Conv2D
 from sonnet.src.conv import Conv3D
@@ -54,6 +60,8 @@ from sonnet.src.metrics import Metric
 from sonnet.src.metrics import Sum
 from sonnet.src.moving_averages import ExponentialMovingAverage
 from sonnet.src.once import once
+from sonnet.src.recurrent import bidirectional_dynamic_unroll
+from sonnet.src.recurrent import chunked_dynamic_unroll
 from sonnet.src.recurrent import Conv1DLSTM
 from sonnet.src.recurrent import Conv2DLSTM
 from sonnet.src.recurrent import Conv3DLSTM
@@ -77,6 +85,7 @@ from sonnet.src.reshape import Reshape
 from sonnet.src.reshape import reshape
 from sonnet.src.scale_gradient import scale_gradient
 from sonnet.src.sequential import Sequential
+from sonnet.src.streaming import StreamingRNN
 from sonnet.src.utils import format_variables
 from sonnet.src.utils import log_variables
 
@@ -85,6 +94,7 @@ __all__ = (
     "BatchApply",
     "BatchNorm",
     "Bias",
+    "CacheInfo",
     "Conv1D",
     "Conv1DLSTM",
     "Conv1DTranspose",
@@ -117,13 +127,20 @@ __all__ = (
     "Reshape",
     "RNNCore",
     "Sequential",
+    "StreamingRNN",
     "Sum",
     "TrainableState",
     "UnrolledLSTM",
     "UnrolledRNN",
     "VanillaRNN",
     "allow_empty_variables",
+    "bidirectional_dynamic_unroll",
+    "bucketed_function",
+    "bucketed_function_cache_info",
     "build",
+    "bulk_initialization",
+    "checkpoint",
+    "chunked_dynamic_unroll",
     "custom_variable_getter",
     "deep_rnn_with_residual_connections",
     "deep_rnn_with_skip_connections",
@@ -143,6 +160,7 @@ __all__ = (
     "pad",
     "regularizers",
     "scale_gradient",
+    "skip_eager_name_scopes",
     "split_leading_dim",
     "static_unroll",
 )
@@ -0,0 +1,29 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Sonnet checkpointing utilities built for TensorFlow 2."""
+
+from sonnet.src.mmap_checkpoint import load_mmap
+from sonnet.src.mmap_checkpoint import MmapCheckpoint
+from sonnet.src.mmap_checkpoint import save_mmap
+from sonnet.src.sharded_checkpoint import restore_sharded
+from sonnet.src.sharded_checkpoint import save_sharded
+
+__all__ = (
+    "MmapCheckpoint",
+    "load_mmap",
+    "restore_sharded",
+    "save_mmap",
+    "save_sharded",
+)
@@ -18,13 +18,17 @@ All optimizers implement the `snt.Optimizer` interface.
 """
 
 from sonnet.src.optimizers.adam import Adam
+from sonnet.src.optimizers.lazy_adam import LazyAdam
 from sonnet.src.optimizers.momentum import Momentum
+from sonnet.src.optimizers.optimizer_utils import convert_slots
 from sonnet.src.optimizers.rmsprop import RMSProp
 from sonnet.src.optimizers.sgd import SGD
 
 __all__ = (
     "Adam",
+    "LazyAdam",
     "Momentum",
     "RMSProp",
     "SGD",
+    "convert_slots",
 )
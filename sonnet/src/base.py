@@ -20,6 +20,7 @@ import inspect
 import os
 import pprint
 import sys
+import weakref
 from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type, TypeVar
 
 from sonnet.src import once
@@ -31,6 +32,10 @@ T = TypeVar("T")
 TFFunctionType = type(tf.function(lambda: None, autograph=False))  # pylint: disable=invalid-name
 APPLY_NAME_SCOPE = "__snt_with_name_scope"
 ALLOW_EMPTY_RESULT = "__snt_allow_empty_result"
+SKIP_EAGER_NAME_SCOPES = "__snt_skip_eager_name_scopes"
+EAGER_CALLED_METHODS = "_snt_eager_called_methods"
+FLATTEN_CACHE = "_snt_flatten_cache"
+FLATTEN_CACHE_DEPENDENTS = "_snt_flatten_cache_dependents"
 
 
 def no_name_scope(method: T) -> T:
@@ -242,11 +247,21 @@ def wrap_with_name_scope(
   Returns:
     `with instance.name_scope: return method(*args, **kwargs)`
   """
+  method_name = getattr(method, "__name__", None)
   if instance is None:
     instance = args[0]
     args = args[1:]
     method = functools.partial(method, instance)
 
+  skip_eager = (getattr(instance, SKIP_EAGER_NAME_SCOPES, False) and
+                method_name is not None and tf.executing_eagerly())
+  if skip_eager:
+    called = getattr(instance, EAGER_CALLED_METHODS, None)
+    if called is not None and method_name in called:
+      # In eager mode scope names are only observable when creating variables,
+      # which happens the first time a method is called.
+      return method(*args, **kwargs)
+
   try:
     module_name_scope = instance.name_scope
   except AttributeError as exc_value_from:
@@ -259,7 +274,15 @@ def wrap_with_name_scope(
   with module_name_scope:
     # snt.Module enters the module name scope for all methods. To disable this
     # for a particular method annotate it with `@snt.no_name_scope`.
-    return method(*args, **kwargs)
+    out = method(*args, **kwargs)
+
+  if skip_eager:
+    called = getattr(instance, EAGER_CALLED_METHODS, None)
+    if called is None:
+      called = set()
+      setattr(instance, EAGER_CALLED_METHODS, called)
+    called.add(method_name)
+  return out
 
 
 @utils.decorator
@@ -356,6 +379,39 @@ def allow_empty_variables(module_or_cls: T) -> T:
   return module_or_cls
 
 
+def skip_eager_name_scopes(module_or_cls: T) -> T:
+  """Skips entering the module name scope for repeated eager method calls.
+
+  Every method on a :class:`Module` enters the module name scope. When calling
+  small modules many times eagerly (e.g. in an actor loop) the cost of this can
+  be larger than the cost of the computation. Modules marked with this function
+  only enter the name scope the first time each method is called eagerly (when
+  variables are typically created). Subsequent eager calls run the method
+  directly, calls inside a :tf:`function` still enter the name scope:
+
+  >>> mod = snt.skip_eager_name_scopes(snt.Linear(1))
+  >>> mod(tf.ones([1, 1])).shape
+  TensorShape([1, 1])
+  >>> mod.w.name
+  'linear/w:0'
+
+  Pass :class:`Module` to enable this for all modules.
+
+  NOTE: After the first eager call the current name scope is not that of the
+  module. Variables created lazily after the first call to a method and
+  operations that read the name scope in eager mode (e.g. :tf:`summary`) will
+  not be named after the module.
+
+  Args:
+    module_or_cls: A :class:`Module` instance or subclass to decorate.
+
+  Returns:
+    The input module or class.
+  """
+  setattr(module_or_cls, SKIP_EAGER_NAME_SCOPES, True)
+  return module_or_cls
+
+
 def assert_tf2():
   if not assert_tf2.checked:
     with tf.init_scope():
@@ -365,6 +421,133 @@ def assert_tf2():
 assert_tf2.checked = False
 
 
+class _FlattenCache:
+  """Results of `tf.Module._flatten` for a module and its submodules."""
+
+  __slots__ = ("owner", "containers", "leaves", "variables",
+               "trainable_variables", "submodules")
+
+  def __init__(self, owner=None, containers=()):
+    self.owner = owner
+    # Values which may be changed in place, and the variables and modules in
+    # them when the cache was created.
+    self.containers = containers
+    self.leaves = _variables_and_modules(containers)
+    self.variables = None
+    self.trainable_variables = None
+    self.submodules = None
+
+  def __reduce__(self):
+    # Copies of a module are different object graphs, start with no cache.
+    return _FlattenCache, ()
+
+  def is_valid_for(self, module) -> bool:
+    if self.owner is None or self.owner() is not module:
+      return False
+    leaves = _variables_and_modules(self.containers)
+    return len(leaves) == len(self.leaves) and all(
+        a is b for a, b in zip(leaves, self.leaves))
+
+
+class _FlattenCacheDependents:
+  """Root modules whose flatten cache includes a given module."""
+
+  __slots__ = ("roots",)
+
+  def __init__(self):
+    # Modules may define `__hash__` and `__eq__`, so these are keyed by id.
+    self.roots = {}
+
+  def __reduce__(self):
+    return _FlattenCacheDependents, ()
+
+
+def _attributes(module: tf.Module) -> Dict[str, Any]:
+  ignored = module._TF_MODULE_IGNORED_PROPERTIES  # pylint: disable=protected-access
+  return {k: v for k, v in vars(module).items() if k not in ignored}
+
+
+def _variables_and_modules(containers: Sequence[Any]) -> Sequence[Any]:
+  """Variables and modules in `containers`, flattened as `tf.Module` does."""
+  # Flattened in one call, which is much faster than one call per container.
+  values = [_attributes(c) if isinstance(c, tf.Module) else c
+            for c in containers]
+  return [leaf for leaf in tf.nest.flatten(values, expand_composites=True)
+          if isinstance(leaf, (tf.Variable, tf.Module))]
+
+
+def _mutable_attributes(module: tf.Module) -> Sequence[Any]:
+  """Values reachable from `module` which can change without `__setattr__`.
+
+  For a Sonnet module these are the attributes holding nested structures,
+  skipping `Trackable` bookkeeping (``_self_`` attributes). Other
+  modules do not invalidate the cache when their attributes are set, so the
+  module itself is returned and all of its attributes are checked.
+  """
+  if not isinstance(module, Module):
+    return [module]
+  return [v for k, v in _attributes(module).items()
+          if not k.startswith("_self_") and _is_mutable_structure(v)]
+
+
+def _is_mutable_structure(value) -> bool:
+  # Tuples of leaves (e.g. `kernel_shape`) can not change in place.
+  return tf.nest.is_nested(value) and not (
+      isinstance(value, tuple) and
+      not any(tf.nest.is_nested(v) for v in value))
+
+
+def _invalidate_flatten_cache(module: "Module"):
+  """Drops the flatten cache of `module` and all modules containing it."""
+  module.__dict__.pop(FLATTEN_CACHE, None)
+  dependents = module.__dict__.get(FLATTEN_CACHE_DEPENDENTS)
+  if dependents is not None:
+    for root_ref in dependents.roots.values():
+      root = root_ref()
+      if root is not None:
+        root.__dict__.pop(FLATTEN_CACHE, None)
+    # Roots register again when their cache is recreated.
+    dependents.roots.clear()
+
+
+def _flatten_cache(module: "Module") -> _FlattenCache:
+  """Returns the flatten cache for `module`, reset if it may be stale.
+
+  The cache is dropped when an attribute is set or deleted on `module` or any
+  Sonnet module reachable from it (see `Module.__setattr__`). Attributes
+  holding nested structures (e.g. a list of layers, or an ``attrs`` object)
+  can be changed in place, so these are flattened again and compared to the
+  variables and modules they held when the cache was created. Any new variable
+  is only reachable through one of these, so creating variables needs no
+  further tracking.
+
+  Args:
+    module: The root module.
+
+  Returns:
+    A `_FlattenCache` for the current object graph.
+  """
+  cache = module.__dict__.get(FLATTEN_CACHE)
+  if cache is not None and cache.is_valid_for(module):
+    return cache
+
+  submodules = tuple(module._flatten(predicate=lambda m: isinstance(m, tf.Module)))  # pylint: disable=protected-access
+  containers = []
+  for m in (module,) + submodules:
+    containers.extend(_mutable_attributes(m))
+    if isinstance(m, Module):
+      dependents = m.__dict__.get(FLATTEN_CACHE_DEPENDENTS)
+      if dependents is None:
+        dependents = m.__dict__[FLATTEN_CACHE_DEPENDENTS] = (
+            _FlattenCacheDependents())
+      dependents.roots[id(module)] = weakref.ref(module)
+
+  cache = _FlattenCache(weakref.ref(module), tuple(containers))
+  cache.submodules = submodules
+  module.__dict__[FLATTEN_CACHE] = cache
+  return cache
+
+
 class Module(tf.Module, metaclass=ModuleMetaclass):
   """Base class for Sonnet modules.
 
@@ -409,6 +592,14 @@ class Module(tf.Module, metaclass=ModuleMetaclass):
       self._ctor_name_scope = self.name_scope
       self._ctor_name_scope.__enter__()
 
+  def __setattr__(self, name: str, value: Any):
+    super().__setattr__(name, value)
+    _invalidate_flatten_cache(self)
+
+  def __delattr__(self, name: str):
+    super().__delattr__(name)
+    _invalidate_flatten_cache(self)
+
   @property
   def variables(self):
     r"""Sequence of :tf:`Variable`\ s owned by this module and it's submodules.
@@ -422,12 +613,19 @@ class Module(tf.Module, metaclass=ModuleMetaclass):
     will raise an exception if their result is empty. See
     :func:`allow_empty_variables` if you want to suppress this error.
 
+    The result is cached until an attribute of this module or one of its
+    submodules is set or deleted, or a nested structure (e.g. a list) held by
+    one of them changes.
+
     Returns:
       A sequence of variables for the current module (sorted by attribute
       name) followed by variables from all submodules recursively (breadth
       first).
     """
-    variables = super().variables
+    cache = _flatten_cache(self)
+    if cache.variables is None:
+      cache.variables = super().variables
+    variables = cache.variables
     if not variables and not getattr(self, ALLOW_EMPTY_RESULT, False):
       # Raise a useful error if the collection is empty. Typically this
       # indicates that the user has requested the property before the module has
@@ -452,12 +650,19 @@ class Module(tf.Module, metaclass=ModuleMetaclass):
     will raise an exception if their result is empty. See
     :func:`allow_empty_variables` if you want to suppress this error.
 
+    The result is cached until an attribute of this module or one of its
+    submodules is set or deleted, or a nested structure (e.g. a list) held by
+    one of them changes.
+
     Returns:
       A sequence of variables for the current module (sorted by attribute
       name) followed by variables from all submodules recursively (breadth
       first).
     """
-    trainable_variables = super().trainable_variables
+    cache = _flatten_cache(self)
+    if cache.trainable_variables is None:
+      cache.trainable_variables = super().trainable_variables
+    trainable_variables = cache.trainable_variables
     if not trainable_variables and not getattr(self, ALLOW_EMPTY_RESULT, False):
       # Raise a useful error if the collection is empty. Typically this
       # indicates that the user has requested the property before the module has
@@ -470,6 +675,19 @@ class Module(tf.Module, metaclass=ModuleMetaclass):
                                     property="trainable_variables"))
     return trainable_variables
 
+  @property
+  def submodules(self):
+    """Sequence of all sub-modules.
+
+    See :tf:`Module.submodules` for implementation details.
+
+    Returns:
+      A sequence of all submodules.
+
+    The result is cached, see :attr:`variables`.
+    """
+    return _flatten_cache(self).submodules
+
 
 class Optimizer(Module):
   """Base class for Sonnet optimizers."""
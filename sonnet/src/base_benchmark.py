@@ -0,0 +1,89 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Per-call overhead benchmark for sonnet.v2.src.base.
+
+Compares eager calls to small modules with and without
+`skip_eager_name_scopes`.
+
+Run with:
+
+    python base_benchmark.py --benchmark_filter=.
+"""
+
+import time
+
+from sonnet.src import base
+from sonnet.src import linear
+from sonnet.src import recurrent
+from sonnet.src.nets import mlp
+import tensorflow as tf
+
+NUM_CALLS = 2000
+NUM_REPEATS = 5
+SIZE = 4
+
+
+class Identity(base.Module):
+
+  def __call__(self, x):
+    return x
+
+
+def _modules():
+  """Returns `(name, module, call)` for each benchmarked module."""
+  inputs = tf.ones([1, SIZE])
+  identity = Identity()
+  lin = linear.Linear(SIZE)
+  lstm = recurrent.LSTM(SIZE)
+  state = lstm.initial_state(1)
+  net = mlp.MLP([SIZE, SIZE])
+  return (
+      # Measures the overhead of the method wrapping alone.
+      ("identity", identity, lambda: identity(inputs)),
+      ("linear", lin, lambda: lin(inputs)),
+      ("lstm", lstm, lambda: lstm(inputs, state)),
+      ("mlp", net, lambda: net(inputs)),
+  )
+
+
+class NameScopeOverheadBenchmark(tf.test.Benchmark):
+  """Measures the wall time of eager module calls."""
+
+  def _run(self, call):
+    """Returns the fastest average time per call over `NUM_REPEATS` runs."""
+    call()  # Create variables.
+    call()
+    times = []
+    for _ in range(NUM_REPEATS):
+      start = time.time()
+      for _ in range(NUM_CALLS):
+        call()
+      times.append((time.time() - start) / NUM_CALLS)
+    return min(times)
+
+  def benchmark_eager_call(self):
+    for name, module, call in _modules():
+      self.report_benchmark(
+          iters=NUM_CALLS, wall_time=self._run(call), name=name + "_default")
+      for m in module.submodules:
+        base.skip_eager_name_scopes(m)
+      base.skip_eager_name_scopes(module)
+      self.report_benchmark(
+          iters=NUM_CALLS, wall_time=self._run(call),
+          name=name + "_skip_eager_name_scopes")
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -15,6 +15,10 @@
 """Tests for sonnet.v2.src.base."""
 
 import abc
+import collections
+import copy
+import dataclasses
+from typing import Any
 
 from absl.testing import parameterized
 import numpy as np
@@ -210,6 +214,171 @@ class VariableNamingTest(tf.test.TestCase):
     self.assertEqual(mod.child.child.w.name, "badger/badger/badger/mushroom:0")
 
 
+class SkipEagerNameScopesTest(tf.test.TestCase):
+
+  def test_first_eager_call_enters_name_scope(self):
+    mod = base.skip_eager_name_scopes(ReturnsNameScopeModule())
+    self.assertEqual(mod(), mod.name_scope.name)
+    self.assertEqual(mod.alternative_forward(), mod.name_scope.name)
+
+  def test_later_eager_calls_skip_name_scope(self):
+    mod = base.skip_eager_name_scopes(ReturnsNameScopeModule())
+    mod()
+    self.assertEqual(mod(), "")
+    # Tracked per method.
+    self.assertEqual(mod.alternative_forward(), mod.name_scope.name)
+    self.assertEqual(mod.alternative_forward(), "")
+
+  def test_tf_function_enters_name_scope(self):
+    mod = base.skip_eager_name_scopes(ReturnsNameScopeModule())
+    mod()
+    self.assertEqual(tf.function(mod)(), tf.constant(mod.name_scope.name))
+
+  def test_variable_names(self):
+    class LazyModule(base.Module):
+
+      def __call__(self):
+        if not hasattr(self, "w"):
+          self.w = tf.Variable(1., name="w")
+        return self.w
+
+    mod = base.skip_eager_name_scopes(LazyModule())
+    mod()
+    mod()
+    self.assertEqual(mod.w.name, "lazy_module/w:0")
+
+  def test_class(self):
+    class FastModule(ReturnsNameScopeModule):
+      pass
+
+    base.skip_eager_name_scopes(FastModule)
+    mod = FastModule()
+    mod()
+    self.assertEqual(mod(), "")
+    other = ReturnsNameScopeModule()
+    self.assertEqual(other(), other.name_scope.name)
+
+  def test_error_does_not_mark_method_as_called(self):
+    mod = base.skip_eager_name_scopes(
+        ErrorModule(call_super=True, raise_in_constructor=False))
+    with self.assertRaises(ErrorModuleError):
+      mod()
+    self.assertFalse(getattr(mod, base.EAGER_CALLED_METHODS, None))
+
+
+class VariablesCacheTest(tf.test.TestCase):
+
+  def assertSameVariables(self, module):
+    for name in ("variables", "trainable_variables", "submodules"):
+      expected = getattr(tf.Module, name).fget(module)
+      actual = getattr(module, name)
+      self.assertEqual([id(x) for x in actual], [id(x) for x in expected])
+
+  def test_matches_tf_module(self):
+    mod = RecursiveModule(3)
+    mod.extra = [tf.Variable(1., name="a"), {"b": tf.Variable(2., name="b")}]
+    mod.frozen = tf.Variable(3., trainable=False)
+    self.assertSameVariables(mod)
+    self.assertSameVariables(mod)
+
+  def test_cached(self):
+    mod = RecursiveModule(2)
+    self.assertIs(mod.variables, mod.variables)
+    self.assertIs(mod.trainable_variables, mod.trainable_variables)
+    self.assertIs(mod.submodules, mod.submodules)
+
+  def test_set_attribute(self):
+    mod = RecursiveModule(2)
+    mod.variables  # pylint: disable=pointless-statement
+    mod.v = tf.Variable(1.)
+    self.assertSameVariables(mod)
+    del mod.v
+    self.assertSameVariables(mod)
+
+  def test_set_attribute_on_submodule(self):
+    mod = RecursiveModule(3)
+    mod.variables  # pylint: disable=pointless-statement
+    mod.child.child.w = tf.Variable(1.)
+    self.assertSameVariables(mod)
+    mod.child.child = None
+    self.assertSameVariables(mod)
+
+  def test_mutate_container(self):
+    mod = RecursiveModule(1)
+    mod.vs = []
+    mod.variables  # pylint: disable=pointless-statement
+    mod.vs.append(tf.Variable(1.))
+    self.assertSameVariables(mod)
+    mod.vs[0] = tf.Variable(2.)
+    self.assertSameVariables(mod)
+    mod.vs.append({"x": RecursiveModule(1)})
+    self.assertSameVariables(mod)
+
+  def test_cycle(self):
+    mod = RecursiveModule(2)
+    mod.child.parent = mod
+    self.assertSameVariables(mod)
+
+  def test_attrs_attribute(self):
+    mod = RecursiveModule(1)
+    mod.p = AttrsContainer(tf.Variable(1.))
+    self.assertSameVariables(mod)
+    mod.p.w = tf.Variable(2.)
+    self.assertSameVariables(mod)
+    mod.p.w = [RecursiveModule(1)]
+    self.assertSameVariables(mod)
+
+  def test_dataclass_attribute(self):
+    mod = RecursiveModule(1)
+    mod.d = DataclassContainer(tf.Variable(1.))
+    self.assertSameVariables(mod)
+    mod.d.w = tf.Variable(2.)
+    self.assertSameVariables(mod)
+
+  def test_set_attribute_on_tf_module(self):
+    mod = RecursiveModule(1)
+    mod.tf_module = tf.Module()
+    self.assertSameVariables(mod)
+    mod.tf_module.w = tf.Variable(1.)
+    self.assertSameVariables(mod)
+
+  def test_module_in_several_parents(self):
+    shared = RecursiveModule(1)
+    a = RecursiveModule(1)
+    b = RecursiveModule(1)
+    a.shared = shared
+    b.shared = shared
+    self.assertSameVariables(a)
+    self.assertSameVariables(b)
+    shared.w = tf.Variable(1.)
+    self.assertSameVariables(a)
+    self.assertSameVariables(b)
+
+  def test_copy(self):
+    mod = RecursiveModule(2)
+    mod.variables  # pylint: disable=pointless-statement
+    mod_copy = copy.copy(mod)
+    mod_copy.child = RecursiveModule(1)
+    self.assertSameVariables(mod_copy)
+    self.assertSameVariables(mod)
+
+  def test_unhashable_module(self):
+    mod = UnhashableModule()
+    parent = RecursiveModule(1)
+    parent.unhashable = mod
+    self.assertSameVariables(parent)
+    mod.w = tf.Variable(1.)
+    self.assertSameVariables(parent)
+
+  def test_not_recomputed_when_unchanged(self):
+    mod = RecursiveModule(3)
+    variables = mod.variables
+    mod.child.child.child  # pylint: disable=pointless-statement
+    self.assertIs(mod.variables, variables)
+    mod.child.child.w = tf.Variable(1.)
+    self.assertIsNot(mod.variables, variables)
+
+
 class AutoReprTest(tf.test.TestCase):
 
   def test_order_matches_argspec(self):
@@ -408,6 +577,28 @@ class RecursiveModule(base.Module):
     self.w = tf.Variable(1.0, trainable=trainable, name="mushroom")
 
 
+class UnhashableModule(base.Module):
+
+  def __eq__(self, other):
+    return self is other
+
+  __hash__ = None
+
+
+class AttrsContainer:
+  """Flattened by `tf.nest` like an `attrs` class, without depending on attrs."""
+
+  __attrs_attrs__ = (collections.namedtuple("Attribute", "name")("w"),)
+
+  def __init__(self, w):
+    self.w = w
+
+
+@dataclasses.dataclass
+class DataclassContainer:
+  w: Any
+
+
 class AbstractModule(base.Module, metaclass=abc.ABCMeta):
 
   @abc.abstractmethod
@@ -0,0 +1,274 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Shape bucketed `tf.function` with a bounded trace cache."""
+
+import collections
+import inspect
+import threading
+from typing import Any, Dict, NamedTuple, Optional, TypeVar
+
+import numpy as np
+from sonnet.src import utils
+import tensorflow as tf
+import tree
+
+T = TypeVar("T")
+
+_CACHES_PROPERTY = "_snt_bucketed_function_caches"
+
+
+class CacheInfo(NamedTuple):
+  """Statistics for the trace cache of a :func:`bucketed_function`.
+
+  Attributes:
+    hits: Number of calls which reused a cached function.
+    misses: Number of calls which created a new function.
+    traces: Number of times the wrapped Python function has been traced.
+    evictions: Number of functions dropped from the cache.
+    size: Number of functions currently in the cache.
+  """
+  hits: int
+  misses: int
+  traces: int
+  evictions: int
+  size: int
+
+
+class _TraceCache:
+  """LRU cache from input signature to `tf.function`."""
+
+  def __init__(self, max_size: int):
+    self.max_size = max_size
+    self.functions = collections.OrderedDict()
+    self.lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.traces = 0
+    self.evictions = 0
+
+  def __reduce__(self):
+    # Traced functions can't be copied, copies start with an empty cache.
+    return _TraceCache, (self.max_size,)
+
+  def get(self, key, fn):
+    """Returns the function for `key`, creating it from `fn` if needed."""
+    with self.lock:
+      function = self.functions.get(key)
+      if function is not None:
+        self.hits += 1
+        self.functions.move_to_end(key)
+        return function
+
+      self.misses += 1
+      function = tf.function(self._count_traces(fn))
+      self.functions[key] = function
+      if len(self.functions) > self.max_size:
+        self.functions.popitem(last=False)
+        self.evictions += 1
+      return function
+
+  def _count_traces(self, fn):
+    def wrapper(*args, **kwargs):
+      self.traces += 1
+      return fn(*args, **kwargs)
+    return wrapper
+
+  def info(self) -> CacheInfo:
+    with self.lock:
+      return CacheInfo(hits=self.hits, misses=self.misses, traces=self.traces,
+                       evictions=self.evictions, size=len(self.functions))
+
+
+def _is_array(x) -> bool:
+  return isinstance(x, (tf.Tensor, np.ndarray))
+
+
+def _has_leading_dim(x: Any, size: int) -> bool:
+  return _is_array(x) and len(x.shape) > 0 and x.shape[0] == size  # pylint: disable=g-explicit-length-test
+
+
+def _bucket_size(batch_size: int) -> int:
+  return 1 << max(batch_size - 1, 0).bit_length()
+
+
+def _batch_size(leaves) -> Optional[int]:
+  """Returns the leading dimension shared by all arrays in `leaves`."""
+  batch_sizes = {x.shape[0] for x in leaves if _is_array(x) and len(x.shape)}
+  if not batch_sizes:
+    return None
+  if len(batch_sizes) > 1:
+    raise ValueError(
+        "All tensor arguments must have the same leading (batch) dimension "
+        "when bucket_batch_size=True, got: {}".format(sorted(batch_sizes)))
+  return batch_sizes.pop()
+
+
+def _pad(x, padded_size: int):
+  x = tf.convert_to_tensor(x)
+  if not x.shape.rank or x.shape[0] == padded_size:
+    return x
+  paddings = [[0, padded_size - x.shape[0]]] + [[0, 0]] * (x.shape.rank - 1)
+  return tf.pad(x, paddings)
+
+
+def _signature(path, x):
+  if _is_array(x):
+    return path, tf.as_dtype(x.dtype), tuple(x.shape)
+  if isinstance(x, tf.Variable):
+    # Like `tf.function`, traces are shared by variables of the same type.
+    return path, tf.Variable, x.dtype, tuple(x.shape)
+  # Python values are specialized on by `tf.function` so must be in the key.
+  return path, type(x), x
+
+
+def bucketed_function(
+    f: Optional[T] = None,
+    *,
+    max_cache_size: int = 32,
+    bucket_batch_size: bool = True,
+) -> T:
+  """Wraps ``f`` in a :tf:`function` with a bounded, shape bucketed cache.
+
+  Each call with tensors of a new shape causes a :tf:`function` to retrace
+  ``f`` and the traced functions are never released. When ``f`` is called with
+  many different batch sizes (e.g. when serving) this leads to frequent
+  retracing and growing memory use. A :func:`bucketed_function` instead pads
+  the leading (batch) dimension of all tensor arguments up to the next power of
+  two and slices the padding off any outputs with the padded leading
+  dimension, so that ``N`` different batch sizes cause at most ``log2(N) + 1``
+  traces. The most recently used ``max_cache_size`` traced functions are kept:
+
+  >>> @snt.bucketed_function(max_cache_size=8)
+  ... def f(x):
+  ...   return x * 2
+  >>> f(tf.ones([3, 2])).shape
+  TensorShape([3, 2])
+  >>> f(tf.ones([4, 2])).shape
+  TensorShape([4, 2])
+  >>> f.cache_info()
+  CacheInfo(hits=1, misses=1, traces=1, evictions=0, size=1)
+
+  Padding assumes that ``f`` processes each example in the batch independently,
+  which is not the case for e.g. :class:`BatchNorm` in training mode or losses
+  reduced over the batch. Use ``bucket_batch_size=False`` to only bound the
+  cache size without padding inputs.
+
+  If ``f`` is a method the cache is kept per instance, use
+  :func:`bucketed_function_cache_info` to inspect it:
+
+  >>> class Doubler(snt.Module):
+  ...   @snt.bucketed_function
+  ...   def __call__(self, x):
+  ...     return x * 2
+  >>> doubler = Doubler()
+  >>> doubler(tf.ones([5])).shape
+  TensorShape([5])
+  >>> snt.bucketed_function_cache_info(doubler)["Doubler.__call__"].traces
+  1
+
+  Calls made while already tracing a :tf:`function` call ``f`` directly, as do
+  calls with an unhashable Python argument (other than a :tf:`Variable`), which
+  can not be traced by a :tf:`function`.
+
+  Args:
+    f: The function or method to wrap.
+    max_cache_size: The maximum number of traced functions to keep.
+    bucket_batch_size: If ``True``, pad the leading dimension of all tensor
+      arguments of rank one or higher to the next power of two.
+
+  Returns:
+    A wrapped version of ``f``. If ``f`` is a function the wrapper has a
+    ``cache_info()`` method returning a :class:`CacheInfo`.
+
+  Raises:
+    ValueError: If ``max_cache_size`` is not positive.
+  """
+  if max_cache_size <= 0:
+    raise ValueError(
+        "max_cache_size must be positive, got: {}".format(max_cache_size))
+
+  if f is None:
+    return lambda f: bucketed_function(  # pytype: disable=bad-return-type
+        f, max_cache_size=max_cache_size, bucket_batch_size=bucket_batch_size)
+
+  if inspect.isfunction(f) or inspect.ismethod(f):
+    cache_name = f.__qualname__
+  else:
+    cache_name = type(f).__qualname__ + ".__call__"
+  none_cache = _TraceCache(max_cache_size)
+
+  def get_cache(instance) -> _TraceCache:
+    if instance is None:
+      return none_cache
+    caches = getattr(instance, _CACHES_PROPERTY, None)
+    if caches is None:
+      caches = {}
+      setattr(instance, _CACHES_PROPERTY, caches)
+    cache = caches.get(cache_name)
+    if cache is None:
+      cache = caches[cache_name] = _TraceCache(max_cache_size)
+    return cache
+
+  @utils.decorator
+  def wrapper(wrapped, instance, args, kwargs):
+    """Calls a traced version of `wrapped` for the bucketed input signature."""
+    if not tf.executing_eagerly():
+      return wrapped(*args, **kwargs)
+
+    inputs = (args, kwargs)
+    batch_size = padded_size = None
+    if bucket_batch_size:
+      batch_size = _batch_size(tree.flatten(inputs))
+    if batch_size is not None:
+      padded_size = _bucket_size(batch_size)
+      inputs = tree.map_structure(
+          lambda x: _pad(x, padded_size) if _is_array(x) else x, inputs)
+
+    key = tuple(_signature(path, x)
+                for path, x in tree.flatten_with_path(inputs))
+    try:
+      hash(key)
+    except TypeError:
+      return wrapped(*args, **kwargs)
+    function = get_cache(instance).get(key, wrapped)
+    args, kwargs = inputs
+    outputs = function(*args, **kwargs)
+
+    if padded_size is not None and padded_size != batch_size:
+      outputs = tree.map_structure(
+          lambda x: x[:batch_size] if _has_leading_dim(x, padded_size) else x,
+          outputs)
+    return outputs
+
+  decorated = wrapper(f)  # pylint: disable=no-value-for-parameter,assignment-from-none
+  decorated.cache_info = none_cache.info
+  return decorated
+
+
+def bucketed_function_cache_info(instance: Any) -> Dict[str, CacheInfo]:
+  """Returns cache statistics for the bucketed methods called on ``instance``.
+
+  Args:
+    instance: An object with methods decorated by :func:`bucketed_function`,
+      or a callable object which was itself wrapped.
+
+  Returns:
+    A dictionary from method qualified name (e.g. ``"MLP.__call__"``) to
+    :class:`CacheInfo`, for each bucketed method that has been called on
+    ``instance``.
+  """
+  caches = getattr(instance, _CACHES_PROPERTY, None) or {}
+  return {name: cache.info() for name, cache in caches.items()}
+
@@ -0,0 +1,177 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.bucketed_function."""
+
+import copy
+
+from absl.testing import parameterized
+import numpy as np
+from sonnet.src import base
+from sonnet.src import bucketed_function
+from sonnet.src import test_utils
+import tensorflow as tf
+
+
+class Scale(base.Module):
+
+  def __init__(self):
+    super().__init__()
+    self.w = tf.Variable(2.)
+
+  @bucketed_function.bucketed_function(max_cache_size=2)
+  def __call__(self, x):
+    return x * self.w
+
+
+class Double(base.Module):
+
+  def __call__(self, x):
+    return x * 2
+
+
+class Unhashable:
+
+  def __init__(self, n):
+    self.n = n
+
+  __hash__ = None
+
+
+class BucketedFunctionTest(test_utils.TestCase, parameterized.TestCase):
+
+  def test_buckets_batch_size(self):
+    f = bucketed_function.bucketed_function(lambda x: x + 1)
+    for batch_size in range(1, 9):
+      x = tf.ones([batch_size, 3])
+      self.assertAllEqual(f(x), x + 1)
+    # Batch sizes 1, 2, 3-4 and 5-8.
+    self.assertEqual(
+        f.cache_info(),
+        bucketed_function.CacheInfo(
+            hits=4, misses=4, traces=4, evictions=0, size=4))
+
+  def test_without_bucketing(self):
+    f = bucketed_function.bucketed_function(
+        lambda x: x + 1, bucket_batch_size=False)
+    for batch_size in (3, 4, 3):
+      x = tf.ones([batch_size, 3])
+      self.assertAllEqual(f(x), x + 1)
+    self.assertEqual(f.cache_info().traces, 2)
+
+  def test_padding_is_sliced_from_outputs(self):
+    @bucketed_function.bucketed_function
+    def f(x, y):
+      return {"sum": x + y, "total": tf.reduce_sum(x), "scalar": 1}
+
+    out = f(tf.ones([3, 2]), np.ones([3, 2], np.float32))
+    self.assertAllEqual(out["sum"], 2 * tf.ones([3, 2]))
+    # Padding is zeros.
+    self.assertEqual(out["total"].numpy(), 6.)
+    self.assertEqual(out["scalar"], 1)
+
+  def test_lru_eviction(self):
+    f = bucketed_function.bucketed_function(lambda x: x, max_cache_size=2)
+    f(tf.ones([1]))
+    f(tf.ones([2]))
+    f(tf.ones([1]))
+    f(tf.ones([4]))  # Evicts batch size 2.
+    f(tf.ones([1]))
+    f(tf.ones([2]))  # Retraces.
+    self.assertEqual(
+        f.cache_info(),
+        bucketed_function.CacheInfo(
+            hits=2, misses=4, traces=4, evictions=2, size=2))
+
+  def test_python_values_are_part_of_key(self):
+    f = bucketed_function.bucketed_function(lambda x, n: x * n)
+    self.assertAllEqual(f(tf.ones([2]), n=2), [2., 2.])
+    self.assertAllEqual(f(tf.ones([2]), n=3), [3., 3.])
+    self.assertEqual(f.cache_info().traces, 2)
+
+  def test_dtype_is_part_of_key(self):
+    f = bucketed_function.bucketed_function(lambda x: x)
+    f(tf.ones([2], tf.float32))
+    f(tf.ones([2], tf.int32))
+    self.assertEqual(f.cache_info().misses, 2)
+
+  def test_variable_argument(self):
+    f = bucketed_function.bucketed_function(lambda x, v: x * v)
+    self.assertAllEqual(f(tf.ones([3]), tf.Variable(2.)), [2., 2., 2.])
+    self.assertAllEqual(f(tf.ones([3]), tf.Variable(3.)), [3., 3., 3.])
+    self.assertEqual(f.cache_info().misses, 1)
+
+  def test_unhashable_argument(self):
+    f = bucketed_function.bucketed_function(lambda x, d: x * d.n)
+    d = Unhashable(2.)
+    self.assertAllEqual(f(tf.ones([3]), d), [2., 2., 2.])
+    self.assertAllEqual(f(tf.ones([3]), d), [2., 2., 2.])
+    self.assertEqual(f.cache_info().size, 0)
+
+  def test_method_cache_per_instance(self):
+    a = Scale()
+    b = Scale()
+    self.assertAllEqual(a(tf.ones([3])), [2., 2., 2.])
+    a(tf.ones([4]))
+    b(tf.ones([1]))
+
+    a_info = bucketed_function.bucketed_function_cache_info(a)
+    self.assertEqual(list(a_info), ["Scale.__call__"])
+    self.assertEqual(a_info["Scale.__call__"].hits, 1)
+    self.assertEqual(
+        bucketed_function.bucketed_function_cache_info(b)["Scale.__call__"]
+        .misses, 1)
+
+  def test_variables_are_not_captured_by_cache(self):
+    module = Scale()
+    module(tf.ones([1]))
+    self.assertLen(module.variables, 1)
+
+  def test_copy_starts_with_empty_cache(self):
+    module = Scale()
+    module(tf.ones([1]))
+    module_copy = copy.deepcopy(module)
+    self.assertEqual(
+        bucketed_function.bucketed_function_cache_info(module_copy)
+        ["Scale.__call__"].size, 0)
+    self.assertAllEqual(module_copy(tf.ones([1])), [2.])
+
+  def test_callable_object(self):
+    module = Double()
+    wrapped = bucketed_function.bucketed_function(module)
+    self.assertAllEqual(wrapped(tf.ones([3])), [2., 2., 2.])
+    self.assertEqual(
+        bucketed_function.bucketed_function_cache_info(module)
+        ["Double.__call__"].traces, 1)
+
+  def test_inside_tf_function(self):
+    @bucketed_function.bucketed_function
+    def f(x):
+      return x * 2
+
+    self.assertAllEqual(tf.function(f)(tf.ones([3])), [2., 2., 2.])
+    self.assertEqual(f.cache_info().misses, 0)
+
+  def test_mismatched_batch_sizes(self):
+    f = bucketed_function.bucketed_function(lambda x, y: x)
+    with self.assertRaisesRegex(ValueError, "same leading"):
+      f(tf.ones([2]), tf.ones([3]))
+
+  def test_invalid_max_cache_size(self):
+    with self.assertRaisesRegex(ValueError, "max_cache_size must be positive"):
+      bucketed_function.bucketed_function(lambda x: x, max_cache_size=0)
+
+
+if __name__ == "__main__":
+  tf.test.main()
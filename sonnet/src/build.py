@@ -14,8 +14,11 @@
 # ============================================================================
 """Utility function to build Sonnet modules."""
 
+import collections
+import contextlib
 from typing import Any, Callable
 
+from sonnet.src import initializers
 import tensorflow as tf
 import tree
 
@@ -69,3 +72,94 @@ def build(
   cf = f.get_concrete_function(*args, **kwargs)
   return tree.map_structure(_maybe_tensor_spec, cf.output_shapes,
                             cf.output_dtypes)
+
+
+class _BulkInitializer:
+  """Tracks initial values created while tracing and batches their sampling."""
+
+  def __init__(self):
+    # Initializer outputs (in a graph) -> (form, shape, dtype).
+    self.initial_values = {}
+    # (distribution, dtype) -> [(variable, form, shape)].
+    self.pending = collections.defaultdict(list)
+
+  def record_initial_value(self, initializer, shape, dtype, value):
+    dtype = tf.as_dtype(dtype)
+    if tf.executing_eagerly() or not dtype.is_floating:
+      return
+    form = initializers.affine_form(initializer, shape)
+    if form is not None:
+      self.initial_values[value.ref()] = (form, tuple(shape), dtype)
+
+  def creator(self, next_creator, **kwargs):
+    """Creates variables eagerly, deferring sampling of their initial value."""
+    initial_value = kwargs.get("initial_value")
+    entry = None
+    if isinstance(initial_value, tf.Tensor):
+      entry = self.initial_values.get(initial_value.ref())
+    if entry is None:
+      return next_creator(**kwargs)
+
+    form, shape, dtype = entry
+    with tf.init_scope():
+      kwargs["initial_value"] = tf.fill(shape, tf.constant(form.offset, dtype))
+      variable = next_creator(**kwargs)
+    if form.distribution != "constant":
+      self.pending[(form.distribution, dtype)].append((variable, form, shape))
+    return variable
+
+  def assign_initial_values(self):
+    """Samples all pending initial values with one op per distribution."""
+    with tf.init_scope():
+      for (distribution, dtype), pending in self.pending.items():
+        sizes = [v.shape.num_elements() for v, _, _ in pending]
+        samples = _SAMPLERS[distribution]([sum(sizes)], dtype=dtype)
+        for (variable, form, shape), sample in zip(
+            pending, tf.split(samples, sizes)):
+          variable.assign(
+              form.offset + form.scale * tf.reshape(sample, shape))
+
+
+_SAMPLERS = {
+    "uniform": tf.random.uniform,
+    "normal": tf.random.normal,
+    "truncated_normal": tf.random.truncated_normal,
+}
+
+
+@contextlib.contextmanager
+def bulk_initialization():
+  """Batches sampling the initial values of variables built in this context.
+
+  Normally each variable samples its initial value with a separate random op.
+  Inside this context, variables created while tracing (e.g. by :func:`build`)
+  with one of the built-in initializers are created without sampling. When the
+  context exits, one batch of samples is drawn for each distribution (e.g. one
+  truncated normal for all ``VarianceScaling`` weights) and split between the
+  variables:
+
+  >>> mod = snt.Sequential([snt.Linear(1000), tf.nn.relu, snt.Linear(10)])
+  >>> with snt.bulk_initialization():
+  ...   _ = snt.build(mod, [None, 28 * 28])
+  >>> [v.shape for v in mod.trainable_variables]
+  [TensorShape([1000]), TensorShape([784, 1000]), TensorShape([10]),
+   TensorShape([1000, 10])]
+
+  Variables are filled with the mean of their distribution until the context
+  exits. Initializers with a ``seed``, tensor parameters or which are not
+  built-in (e.g. :class:`~initializers.Orthogonal`) are sampled as usual, as
+  are variables whose initial value is computed from the output of an
+  initializer (e.g. the forget gate bias of :class:`LSTM`) and variables
+  created eagerly.
+
+  The context only applies to the current thread. Contexts can be nested, in
+  which case variables are sampled when the innermost one exits.
+
+  Yields:
+    Nothing.
+  """
+  bulk = _BulkInitializer()
+  with initializers.InitialValueCallbacks.instance(bulk.record_initial_value):
+    with tf.variable_creator_scope(bulk.creator):
+      yield
+  bulk.assign_initial_values()
@@ -14,7 +14,12 @@
 # ============================================================================
 """Tests for sonnet.v2.src.build."""
 
+import threading
+
 from sonnet.src import build
+from sonnet.src import initializers
+from sonnet.src import linear
+from sonnet.src import recurrent
 from sonnet.src import test_utils
 import tensorflow as tf
 
@@ -39,6 +44,81 @@ class BuildTest(test_utils.TestCase):
     self.assertEqual(mod.counter.numpy(), 0)
 
 
+class BulkInitializationTest(test_utils.TestCase):
+
+  def test_variables_are_initialized(self):
+    mod = linear.Linear(
+        100, b_init=initializers.Constant(2.),
+        w_init=initializers.TruncatedNormal(mean=1., stddev=0.5))
+    with build.bulk_initialization():
+      build.build(mod, [None, 200])
+    w = mod.w.numpy()
+    self.assertAllEqual(mod.b, 2. * tf.ones([100]))
+    self.assertNear(w.mean(), 1., 0.05)
+    self.assertLessEqual(w.max(), 2.)
+    self.assertGreaterEqual(w.min(), 0.)
+
+  def test_variance_scaling(self):
+    mod = linear.Linear(1000, w_init=initializers.VarianceScaling())
+    with build.bulk_initialization():
+      build.build(mod, [None, 400])
+    # stddev = sqrt(1 / fan_in) after truncation.
+    self.assertNear(mod.w.numpy().std(), 0.05, 0.005)
+
+  def test_sampling_is_deferred(self):
+    mod = linear.Linear(10, w_init=initializers.RandomUniform(3., 4.))
+    with build.bulk_initialization():
+      build.build(mod, [None, 10])
+      # Variables hold the offset until the context exits.
+      self.assertAllEqual(mod.w, 3. * tf.ones([10, 10]))
+    self.assertGreater(mod.w.numpy().std(), 0.)
+
+  def test_sampled_values_differ_between_variables(self):
+    mod = linear.Linear(10, b_init=initializers.RandomNormal())
+    with build.bulk_initialization():
+      build.build(mod, [None, 10])
+    self.assertNotAllClose(mod.w[0], mod.b)
+
+  def test_post_processed_initial_value(self):
+    mod = recurrent.LSTM(4, forget_bias=1.)
+    with build.bulk_initialization():
+      build.build(mod, [None, 3], mod.initial_state(1))
+    self.assertAllEqual(mod.b, [0.] * 4 + [1.] * 4 + [0.] * 8)
+
+  def test_seeded_initializer(self):
+    w_init = initializers.RandomNormal(seed=1)
+    a = linear.Linear(10, w_init=w_init)
+    b = linear.Linear(10, w_init=w_init)
+    build.build(a, [None, 10])
+    with build.bulk_initialization():
+      build.build(b, [None, 10])
+    self.assertAllEqual(a.w, b.w)
+
+  def test_initializers_are_not_patched(self):
+    call = initializers.RandomNormal.__call__
+    with build.bulk_initialization():
+      self.assertIs(initializers.RandomNormal.__call__, call)
+
+  def test_nested(self):
+    outer = linear.Linear(10, w_init=initializers.RandomUniform(3., 4.))
+    inner = linear.Linear(10, w_init=initializers.RandomUniform(3., 4.))
+    with build.bulk_initialization():
+      with build.bulk_initialization():
+        build.build(inner, [None, 10])
+      self.assertGreater(inner.w.numpy().std(), 0.)
+      build.build(outer, [None, 10])
+      self.assertAllEqual(outer.w, 3. * tf.ones([10, 10]))
+    self.assertGreater(outer.w.numpy().std(), 0.)
+
+  def test_other_threads_are_not_affected(self):
+    mod = linear.Linear(10, w_init=initializers.RandomUniform(3., 4.))
+    with build.bulk_initialization():
+      thread = threading.Thread(target=lambda: build.build(mod, [None, 10]))
+      thread.start()
+      thread.join()
+      self.assertGreater(mod.w.numpy().std(), 0.)
+
+
 def tensor_identity(x):
   assert isinstance(x, tf.Tensor)
   return x
@@ -19,6 +19,8 @@ import os
 from absl import logging
 from absl.testing import absltest
 from absl.testing import parameterized
+from sonnet.src import mmap_checkpoint
+from sonnet.src import sharded_checkpoint
 from sonnet.src import test_utils
 from sonnet.src.conformance import goldens
 from sonnet.src.distribute import replicator as snt_replicator
@@ -171,6 +173,86 @@ class GoldenCheckpointsTest(test_utils.TestCase, parameterized.TestCase):
           msg=variable.name)
 
 
+class MmapCheckpointTest(test_utils.TestCase, parameterized.TestCase):
+  """Checks that goldens round trip through memory mapped checkpoints."""
+
+  def checkpoint_path(self):
+    return os.path.join(self.get_temp_dir(), "checkpoint.snt")
+
+  @goldens.all_goldens
+  def test_save_load(self, golden):
+    module = golden.create_module()
+    variables = golden.create_all_variables(module)
+    for variable in variables:
+      variable.assign(goldens.range_like(variable))
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(path, module)
+    old_y = golden.forward(module)
+
+    for variable in variables:
+      variable.assign(tf.ones_like(variable))
+    mmap_checkpoint.load_mmap(path).restore(module)
+    for variable in variables:
+      self.assertAllEqual(
+          variable.read_value(),
+          goldens.range_like(variable),
+          msg=variable.name)
+
+    if golden.deterministic:
+      tree.map_structure(self.assertAllClose, golden.forward(module), old_y)
+
+  @goldens.all_goldens
+  def test_restore_on_create(self, golden):
+    module_1 = golden.create_module()
+    variables_1 = golden.create_all_variables(module_1)
+    for variable in variables_1:
+      variable.assign(goldens.range_like(variable))
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(path, module_1)
+    # Creating variables runs a forward pass, which may update some of them.
+    golden.forward(module_1)
+
+    with mmap_checkpoint.load_mmap(path).restore_on_create():
+      module_2 = golden.create_module()
+      variables_2 = golden.create_all_variables(module_2)
+    for var1, var2 in zip(variables_1, variables_2):
+      self.assertAllEqual(var1.read_value(), var2.read_value(), msg=var1.name)
+
+    if golden.deterministic:
+      tree.map_structure(self.assertAllClose, golden.forward(module_1),
+                         golden.forward(module_2))
+
+
+class ShardedCheckpointTest(test_utils.TestCase, parameterized.TestCase):
+  """Checks that goldens round trip through sharded checkpoints."""
+
+  @test_utils.combined_named_parameters(goldens.named_goldens(),
+                                        test_utils.named_bools("blocking"))
+  def test_save_restore(self, golden, blocking):
+    module = golden.create_module()
+    variables = golden.create_all_variables(module)
+    for variable in variables:
+      variable.assign(goldens.range_like(variable))
+    directory = self.get_temp_dir()
+    future = sharded_checkpoint.save_sharded(
+        directory, module, num_shards=3, blocking=blocking)
+    old_y = golden.forward(module)
+    if not blocking:
+      future.result()
+
+    module_2 = golden.create_module()
+    variables_2 = golden.create_all_variables(module_2)
+    sharded_checkpoint.restore_sharded(directory, module_2)
+    for variable in variables_2:
+      self.assertAllEqual(
+          variable.read_value(),
+          goldens.range_like(variable),
+          msg=variable.name)
+
+    if golden.deterministic and not golden.has_side_effects:
+      tree.map_structure(self.assertAllClose, golden.forward(module_2), old_y)
+
+
 class ReplicatorCheckpointTest(test_utils.TestCase, parameterized.TestCase):
 
   def replicator_or_skip(self, replicator_fn, use_function):
@@ -235,6 +235,9 @@ OPTIMIZER_MODULES = (
     ModuleDescriptor(
         name="optimizers.Adam",
         create=lambda: snt.optimizers.Adam(learning_rate=0.1)),
+    ModuleDescriptor(
+        name="optimizers.LazyAdam",
+        create=lambda: snt.optimizers.LazyAdam(learning_rate=0.1)),
     ModuleDescriptor(
         name="optimizers.Momentum",
         create=lambda: snt.optimizers.Momentum(learning_rate=0.1, momentum=.9)),
@@ -28,6 +28,7 @@ class CoverageTest(test_utils.TestCase):
     allow_no_checkpoint = set([
         # TODO(petebu): Remove this once optimizer goldens check works.
         snt.optimizers.Adam,
+        snt.optimizers.LazyAdam,
         snt.optimizers.Momentum,
         snt.optimizers.RMSProp,
         snt.optimizers.SGD,
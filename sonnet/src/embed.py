@@ -16,7 +16,7 @@
 """Embedding module."""
 
 import math
-from typing import Optional
+from typing import List, Optional, Union
 
 from sonnet.src import base
 from sonnet.src import initializers
@@ -24,8 +24,37 @@ from sonnet.src import types
 import tensorflow as tf
 
 
+_COMBINERS = ("sum", "mean", "sqrtn")
+
+Ids = Union[tf.Tensor, tf.RaggedTensor, tf.SparseTensor]
+
+
 class Embed(base.Module):
-  """Module for embedding tokens in a low-dimensional space."""
+  """Module for embedding tokens in a low-dimensional space.
+
+  Embeddings can be looked up for a tensor of token ids:
+
+  >>> embed = snt.Embed(vocab_size=10, embed_dim=4)
+  >>> embed(tf.constant([[1, 2], [3, 4]])).shape
+  TensorShape([2, 2, 4])
+
+  With a ``combiner``, each row of ids is a bag whose embeddings are combined
+  into one, for every bag in a single lookup. Bags are given as a
+  :tf:`RaggedTensor`, :tf:`SparseTensor` or dense tensor:
+
+  >>> embed = snt.Embed(vocab_size=10, embed_dim=4, combiner="mean")
+  >>> embed(tf.ragged.constant([[1, 2, 3], [4], []])).shape
+  TensorShape([3, 4])
+
+  For very large or open vocabularies, ids can be hashed into ``vocab_size``
+  buckets (such that no vocabulary is needed) and the table split across
+  several variables:
+
+  >>> embed = snt.Embed(vocab_size=1000, embed_dim=4, hash_inputs=True,
+  ...                   num_shards=4)
+  >>> embed(tf.constant(["hello", "world"])).shape
+  TensorShape([2, 4])
+  """
 
   def __init__(self,
                vocab_size: Optional[int] = None,
@@ -35,6 +64,9 @@ class Embed(base.Module):
                initializer: Optional[initializers.Initializer] = None,
                trainable: bool = True,
                dtype: tf.DType = tf.float32,
+               num_shards: int = 1,
+               hash_inputs: bool = False,
+               combiner: Optional[str] = None,
                name: Optional[str] = None):
     """Constructs an Embed module.
 
@@ -61,13 +93,27 @@ class Embed(base.Module):
       trainable: if True, the embeddings will be updated during training. If
         False, they are fixed to their initial values.
       dtype: The dtype to use for the embedding. Defaults to float32.
+      num_shards: Number of variables to split the embeddings between, such
+        that no single variable holds the whole table. Shard ``i`` holds a
+        contiguous range of rows, with the first ``vocab_size % num_shards``
+        shards holding one more row than the others (the ``"div"`` strategy of
+        :tf:`nn.embedding_lookup`). Lookups from all shards are done at once.
+      hash_inputs: If True, ids are hashed into ``vocab_size`` buckets before
+        lookup, so any integer or string can be embedded without building a
+        vocabulary (distinct ids may share an embedding).
+      combiner: One of ``"sum"``, ``"mean"`` or ``"sqrtn"``. If set, the
+        innermost dimension of the ids holds a bag of ids whose embeddings are
+        combined by a (weighted) sum, mean or sum divided by the square root of
+        the sum of squared weights, and bags may be ragged or sparse. Empty
+        bags have zero embeddings.
       name: Name for this module.
 
     Raises:
       ValueError: if neither one of ``vocab_size`` or ``existing_vocab`` is
-        provided, or if ``existing_vocab`` is provided along with
+        provided, if ``existing_vocab`` is provided along with
         ``vocab_size``, ``embedding_dim``, ``initializer`` (as these should be
-        inferred).
+        inferred), if ``num_shards`` is not in ``[1, vocab_size]`` or if
+        ``combiner`` is not supported.
     """
     super().__init__(name=name)
 
@@ -83,23 +129,143 @@ class Embed(base.Module):
         embed_dim = embedding_dim(vocab_size)
       if initializer is None:
         initializer = initializers.TruncatedNormal()
-      vocab = initializer([vocab_size, embed_dim], dtype)
     else:
       existing_vocab = tf.convert_to_tensor(existing_vocab, dtype=dtype)
       vocab_size, embed_dim = existing_vocab.shape
-      vocab = existing_vocab
+
+    if not 0 < num_shards <= vocab_size:
+      raise ValueError("num_shards must be in range [1, vocab_size], got: "
+                       f"{num_shards}")
+    if combiner is not None and combiner not in _COMBINERS:
+      raise ValueError(f"combiner must be one of {_COMBINERS}, got: "
+                       f"{combiner!r}")
 
     self.vocab_size = vocab_size
     self.embed_dim = embed_dim
     self.densify_gradients = densify_gradients
-    self.embeddings = tf.Variable(vocab, trainable=trainable, name="embeddings")
+    self.num_shards = num_shards
+    self.hash_inputs = hash_inputs
+    self.combiner = combiner
 
-  def __call__(self, inputs):
-    if self.densify_gradients:
-      embeddings = dense_gradient(self.embeddings)
+    self.embeddings: Union[tf.Variable, List[tf.Variable]]
+    if num_shards == 1:
+      if existing_vocab is None:
+        vocab = initializer([vocab_size, embed_dim], dtype)
+      else:
+        vocab = existing_vocab
+      self.embeddings = tf.Variable(
+          vocab, trainable=trainable, name="embeddings")
     else:
+      # Each shard is created separately, without materializing the full table.
+      self.embeddings = []
+      offset = 0
+      for shard, shard_size in enumerate(
+          _shard_sizes(vocab_size, num_shards)):
+        if existing_vocab is None:
+          value = initializer([shard_size, embed_dim], dtype)
+        else:
+          value = existing_vocab[offset:offset + shard_size]
+        offset += shard_size
+        self.embeddings.append(tf.Variable(
+            value, trainable=trainable, name=f"embeddings_{shard}"))
+
+  def __call__(self, inputs: Ids, weights: Optional[Ids] = None) -> tf.Tensor:
+    """Looks up (and combines) the embeddings of ``inputs``.
+
+    Args:
+      inputs: Integer ids in ``[0, vocab_size)``, or any integers or strings if
+        ``hash_inputs``. If the module has a ``combiner``, the innermost
+        dimension holds bags of ids and ``inputs`` may be a
+        :tf:`RaggedTensor` or :tf:`SparseTensor`.
+      weights: Optional weight for each id in ``inputs``, with the same
+        structure. Only supported with a ``combiner``.
+
+    Returns:
+      A tensor of embeddings with shape ``inputs.shape + [embed_dim]``, or
+      ``inputs.shape[:-1] + [embed_dim]`` with a ``combiner``.
+
+    Raises:
+      ValueError: If ``weights`` are given without a ``combiner``.
+    """
+    if self.hash_inputs:
+      inputs = _map_values(
+          lambda ids: _hash_ids(ids, self.vocab_size), inputs)
+
+    if self.num_shards == 1:
       embeddings = self.embeddings
-    return tf.nn.embedding_lookup(embeddings, inputs)
+      if self.densify_gradients:
+        embeddings = dense_gradient(embeddings)
+    else:
+      embeddings = list(self.embeddings)
+      if self.densify_gradients:
+        embeddings = [dense_gradient(shard) for shard in embeddings]
+
+    if self.combiner is None:
+      if weights is not None:
+        raise ValueError("weights are only supported with a combiner.")
+      return tf.nn.embedding_lookup(embeddings, inputs)
+
+    return tf.nn.safe_embedding_lookup_sparse(
+        embeddings,
+        _to_sparse(inputs),
+        None if weights is None else _to_sparse(weights),
+        combiner=self.combiner)
+
+
+def _shard_sizes(vocab_size: int, num_shards: int) -> List[int]:
+  """Rows in each shard, as partitioned by ``tf.nn.embedding_lookup``."""
+  shard_size, remainder = divmod(vocab_size, num_shards)
+  return [shard_size + (shard < remainder) for shard in range(num_shards)]
+
+
+def _map_values(fn, ids: Ids) -> Ids:
+  if isinstance(ids, tf.SparseTensor):
+    return tf.sparse.map_values(fn, ids)
+  elif isinstance(ids, tf.RaggedTensor):
+    return tf.ragged.map_flat_values(fn, ids)
+  else:
+    return fn(tf.convert_to_tensor(ids))
+
+
+def _to_sparse(ids: Ids) -> tf.SparseTensor:
+  """Converts bags of ids (or weights) to a ``tf.SparseTensor``."""
+  if isinstance(ids, tf.SparseTensor):
+    return ids
+  if not isinstance(ids, tf.RaggedTensor):
+    ids = tf.RaggedTensor.from_tensor(ids)
+  return ids.to_sparse()
+
+
+def _hash_ids(ids: tf.Tensor, num_buckets: int) -> tf.Tensor:
+  """Hashes integer or string ids into ``[0, num_buckets)``.
+
+  Strings are hashed with :tf:`strings.to_hash_bucket_fast`. Integers are mixed
+  with the SplitMix64 finalizer, such that ids with structure (e.g. multiples
+  of ``num_buckets``) are spread evenly between buckets, without converting
+  them to strings.
+
+  Args:
+    ids: A ``tf.Tensor`` of integer or string ids.
+    num_buckets: Number of buckets to hash ids into.
+
+  Returns:
+    An int64 ``tf.Tensor`` with the same shape as ``ids``.
+  """
+  ids = tf.convert_to_tensor(ids)
+  if ids.dtype == tf.string:
+    return tf.strings.to_hash_bucket_fast(ids, num_buckets)
+
+  x = tf.bitcast(tf.cast(ids, tf.int64), tf.uint64)
+  x += tf.constant(0x9E3779B97F4A7C15, tf.uint64)
+  x = _xor_shift(x, 30) * tf.constant(0xBF58476D1CE4E5B9, tf.uint64)
+  x = _xor_shift(x, 27) * tf.constant(0x94D049BB133111EB, tf.uint64)
+  x = _xor_shift(x, 31)
+  return tf.cast(x % tf.constant(num_buckets, tf.uint64), tf.int64)
+
+
+def _xor_shift(x: tf.Tensor, shift: int) -> tf.Tensor:
+  return tf.bitwise.bitwise_xor(
+      x, tf.bitwise.right_shift(x, tf.constant(shift, x.dtype)))
 
 
 def embedding_dim(vocab_size: int):
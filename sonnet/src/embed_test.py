@@ -15,6 +15,7 @@
 """Tests for sonnet.v2.src.embed."""
 
 from absl.testing import parameterized
+import numpy as np
 from sonnet.src import embed
 from sonnet.src import initializers
 from sonnet.src import test_utils
@@ -82,5 +83,114 @@ class EmbedTest(test_utils.TestCase, parameterized.TestCase):
     self.assertEqual(e.embeddings.name, "my_embedding/embeddings:0")
 
 
+  @parameterized.parameters([(10, 3, [4, 3, 3]), (8, 4, [2, 2, 2, 2]),
+                             (5, 5, [1, 1, 1, 1, 1])])
+  def test_num_shards(self, vocab_size, num_shards, shard_sizes):
+    e = embed.Embed(vocab_size, 2, num_shards=num_shards)
+    self.assertLen(e.embeddings, num_shards)
+    self.assertEqual([v.shape[0] for v in e.embeddings], shard_sizes)
+    self.assertEqual(e.embeddings[1].name, "embed/embeddings_1:0")
+
+  def test_sharded_does_not_initialize_full_table(self):
+    shapes = []
+
+    def initializer(shape, dtype):
+      shapes.append(list(shape))
+      return tf.zeros(shape, dtype)
+
+    embed.Embed(10, 3, initializer=initializer, num_shards=2)
+    self.assertEqual(shapes, [[5, 3], [5, 3]])
+
+  def test_sharded_lookup(self):
+    existing_vocab = tf.reshape(tf.range(20, dtype=tf.float32), [10, 2])
+    e = embed.Embed(existing_vocab=existing_vocab, num_shards=3)
+    self.assertAllEqual(tf.concat(e.embeddings, 0), existing_vocab)
+    ids = tf.constant([[0, 3], [4, 9]])
+    self.assertAllEqual(e(ids), tf.gather(existing_vocab, ids))
+
+  @parameterized.parameters([True, False])
+  def test_sharded_densify_gradients(self, densify_gradients):
+    e = embed.Embed(4, 2, num_shards=2, densify_gradients=densify_gradients)
+    with tf.GradientTape() as tape:
+      y = e([0, 3])
+    for dy in tape.gradient(y, e.embeddings):
+      if densify_gradients:
+        self.assertIsInstance(dy, tf.Tensor)
+      else:
+        self.assertIsInstance(dy, tf.IndexedSlices)
+
+  @parameterized.parameters([0, 11])
+  def test_invalid_num_shards(self, num_shards):
+    with self.assertRaisesRegex(ValueError, "num_shards must be in range"):
+      embed.Embed(10, num_shards=num_shards)
+
+  @parameterized.parameters([([1, 2, 10**12, -5], tf.int64),
+                             ([1, 2, 3, 4], tf.int32),
+                             (["a", "b", "foo", ""], tf.string)])
+  def test_hash_inputs(self, ids, dtype):
+    ids = tf.constant(ids, dtype)
+    e = embed.Embed(vocab_size=7, embed_dim=2, hash_inputs=True)
+    buckets = embed._hash_ids(ids, 7)
+    self.assertAllInRange(buckets, 0, 6)
+    self.assertAllEqual(e(ids), tf.gather(e.embeddings, buckets))
+
+  def test_hash_spreads_structured_ids(self):
+    # Multiples of the number of buckets would all share a bucket with modulo.
+    buckets = embed._hash_ids(tf.range(0, 100_000, 100), 100).numpy()
+    self.assertGreater(len(np.unique(buckets)), 50)
+
+  @parameterized.parameters(["sum", "mean", "sqrtn"])
+  def test_combiner(self, combiner):
+    existing_vocab = tf.reshape(tf.range(20, dtype=tf.float32), [10, 2])
+    e = embed.Embed(existing_vocab=existing_vocab, combiner=combiner)
+    bags = [[1, 2, 3], [4], []]
+    expected = []
+    for bag in bags:
+      total = tf.reduce_sum(
+          tf.gather(existing_vocab, tf.constant(bag, tf.int64)), 0)
+      if combiner == "mean" and bag:
+        total /= len(bag)
+      elif combiner == "sqrtn" and bag:
+        total /= np.sqrt(len(bag))
+      expected.append(total)
+
+    ragged = tf.ragged.constant(bags, dtype=tf.int64)
+    self.assertAllClose(e(ragged), expected)
+    self.assertAllClose(e(ragged.to_sparse()), expected)
+
+  def test_combiner_dense(self):
+    existing_vocab = tf.reshape(tf.range(20, dtype=tf.float32), [10, 2])
+    e = embed.Embed(existing_vocab=existing_vocab, combiner="sum")
+    ids = tf.constant([[0, 1], [2, 3]])
+    self.assertAllEqual(
+        e(ids), tf.reduce_sum(tf.gather(existing_vocab, ids), 1))
+
+  def test_combiner_weights(self):
+    existing_vocab = tf.reshape(tf.range(20, dtype=tf.float32), [10, 2])
+    e = embed.Embed(existing_vocab=existing_vocab, num_shards=3,
+                    combiner="sum")
+    ids = tf.ragged.constant([[1, 9], [4]], dtype=tf.int64)
+    weights = tf.ragged.constant([[2., 1.], [.5]])
+    self.assertAllClose(
+        e(ids, weights),
+        [2 * existing_vocab[1] + existing_vocab[9], .5 * existing_vocab[4]])
+
+  def test_combiner_hashed_tf_function(self):
+    e = embed.Embed(vocab_size=100, embed_dim=3, num_shards=4,
+                    hash_inputs=True, combiner="mean")
+    ids = tf.ragged.constant([["a", "b"], ["c"]])
+    self.assertAllClose(tf.function(e)(ids), e(ids))
+    self.assertEqual(e(ids).shape, [2, 3])
+
+  def test_invalid_combiner(self):
+    with self.assertRaisesRegex(ValueError, "combiner must be one of"):
+      embed.Embed(10, combiner="max")
+
+  def test_weights_require_combiner(self):
+    e = embed.Embed(10)
+    with self.assertRaisesRegex(ValueError, "only supported with a combiner"):
+      e([1], weights=[1.])
+
+
 if __name__ == "__main__":
   tf.test.main()
@@ -16,12 +16,56 @@
 
 import abc
 import collections
-from typing import Iterable, Mapping, Optional, Union
+import contextlib
+import functools
+import numbers
+import threading
+from typing import Callable, Iterable, Mapping, NamedTuple, Optional, Union
 import numpy as np
 from sonnet.src import types
 import tensorflow as tf
 
 
+class InitialValueCallbacks(threading.local):
+  """Holds callbacks that are notified when built-in initializers are called.
+
+  Only the innermost callback is notified, with the initializer, the ``shape``
+  and ``dtype`` it was called with and the resulting tensor.
+  """
+
+  instance = None  # Thread local singleton instance.
+
+  def __init__(self):
+    super().__init__()
+    self._callbacks = []
+
+  def notify(self, initializer, shape, dtype, value):
+    if self._callbacks:
+      self._callbacks[-1](initializer, shape, dtype, value)
+
+  @contextlib.contextmanager
+  def __call__(self, callback: Callable[..., None]):
+    self._callbacks.append(callback)
+    try:
+      yield
+    finally:
+      assert self._callbacks.pop() is callback
+
+InitialValueCallbacks.instance = InitialValueCallbacks()
+
+
+def _notify_initial_value_callbacks(call):
+  """Decorates a built-in initializer's ``__call__`` to notify callbacks."""
+
+  @functools.wraps(call)
+  def wrapper(self, shape, dtype):
+    value = call(self, shape, dtype)
+    InitialValueCallbacks.instance.notify(self, shape, dtype, value)
+    return value
+
+  return wrapper
+
+
 class Initializer(abc.ABC):
   """Initializer base class, all initializers must implement a call method."""
 
@@ -34,6 +78,7 @@ class Initializer(abc.ABC):
 class Zeros(Initializer):
   """Initializer that generates tensors initialized to 0."""
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType) -> tf.Tensor:
     dtype = _as_numerical_dtype(dtype)
     return tf.zeros(shape, dtype)
@@ -42,6 +87,7 @@ class Zeros(Initializer):
 class Ones(Initializer):
   """Initializer that generates tensors initialized to 1."""
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType) -> tf.Tensor:
     dtype = _as_numerical_dtype(dtype)
     return tf.ones(shape, dtype)
@@ -56,6 +102,7 @@ class Constant(Initializer):
           type(value)))
     self.value = value
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType) -> tf.Tensor:
     dtype = _as_numerical_dtype(dtype)
     value = tf.convert_to_tensor(self.value, dtype)
@@ -86,6 +133,7 @@ class RandomUniform(Initializer):
     self.maxval = maxval
     self.seed = seed
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType):
     dtype = _as_numerical_dtype(dtype)
     return tf.random.uniform(
@@ -116,6 +164,7 @@ class RandomNormal(Initializer):
     self.stddev = stddev
     self.seed = seed
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType) -> tf.Tensor:
     dtype = _as_floating_dtype(dtype)
     return tf.random.normal(
@@ -151,6 +200,7 @@ class TruncatedNormal(Initializer):
     self.stddev = stddev
     self.seed = seed
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType):
     dtype = _as_floating_dtype(dtype)
     return tf.random.truncated_normal(
@@ -314,6 +364,7 @@ class VarianceScaling(Initializer):
     self.distribution = distribution
     self.seed = seed
 
+  @_notify_initial_value_callbacks
   def __call__(self, shape: types.ShapeLike, dtype: tf.DType) -> tf.Tensor:
     dtype = _as_floating_dtype(dtype)
     scale = self.scale
@@ -361,6 +412,78 @@ def check_initializers(initializers: Mapping[str, Initializer],
   return initializers
 
 
+class AffineForm(NamedTuple):
+  """An initializer expressed as ``offset + scale * x``.
+
+  ``x`` is drawn from ``distribution``: one of ``"uniform"`` (in ``[0, 1)``),
+  ``"normal"`` or ``"truncated_normal"`` (standard, truncated to ``[-2, 2]``).
+  For ``"constant"`` no sample is needed and ``scale`` is zero.
+  """
+  distribution: str
+  offset: float
+  scale: float
+
+
+def affine_form(initializer: Initializer,
+                shape: types.ShapeLike) -> Optional[AffineForm]:
+  """Returns ``initializer`` for ``shape`` as an :class:`AffineForm`.
+
+  This allows the values of many initializers of the same type to be generated
+  from a single batch of standard samples.
+
+  Args:
+    initializer: The initializer.
+    shape: The shape it would be called with.
+
+  Returns:
+    The :class:`AffineForm` of the initializer, or ``None`` if it does not
+    have one (e.g. it is not a built-in initializer, uses a fixed seed or is
+    parameterised by tensors).
+  """
+  if any(not isinstance(d, int) for d in shape):
+    return None
+  params = [getattr(initializer, name, None)
+            for name in ("value", "mean", "stddev", "minval", "maxval")]
+  if any(p is not None and not isinstance(p, numbers.Real) for p in params):
+    return None
+  if getattr(initializer, "seed", None) is not None:
+    return None
+
+  init_type = type(initializer)
+  if init_type is Zeros:
+    return AffineForm("constant", 0., 0.)
+  elif init_type is Ones:
+    return AffineForm("constant", 1., 0.)
+  elif init_type is Constant:
+    return AffineForm("constant", float(initializer.value), 0.)
+  elif init_type is RandomUniform:
+    return AffineForm("uniform", initializer.minval,
+                      initializer.maxval - initializer.minval)
+  elif init_type is RandomNormal:
+    return AffineForm("normal", initializer.mean, initializer.stddev)
+  elif init_type is TruncatedNormal:
+    return AffineForm("truncated_normal", initializer.mean, initializer.stddev)
+  elif init_type is VarianceScaling:
+    fan_in, fan_out = _compute_fans(shape)
+    if initializer.mode == "fan_in":
+      n = fan_in
+    elif initializer.mode == "fan_out":
+      n = fan_out
+    else:
+      n = (fan_in + fan_out) / 2.
+    scale = initializer.scale / max(1., n)
+    if initializer.distribution == "truncated_normal":
+      # See `VarianceScaling.__call__`.
+      return AffineForm("truncated_normal", 0.,
+                        np.sqrt(scale) / .87962566103423978)
+    elif initializer.distribution == "normal":
+      return AffineForm("normal", 0., np.sqrt(scale))
+    else:
+      limit = np.sqrt(3. * scale)
+      return AffineForm("uniform", -limit, 2. * limit)
+  return None
+
+
 def _compute_fans(shape: types.ShapeLike):
   """Computes the number of input and output units for a weight shape.
 
@@ -563,5 +563,32 @@ class VarianceScalingInitializerTest(InitializersTest):
       }, ("b"))
 
 
+class AffineFormTest(test_utils.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(
+      (initializers.Zeros(), ("constant", 0., 0.)),
+      (initializers.Constant(3), ("constant", 3., 0.)),
+      (initializers.RandomUniform(-1., 3.), ("uniform", -1., 4.)),
+      (initializers.RandomNormal(2., 3.), ("normal", 2., 3.)),
+      (initializers.VarianceScaling(12., "fan_out", "uniform"),
+       ("uniform", -3., 6.)),
+      (initializers.VarianceScaling(14., "fan_avg", "normal"),
+       ("normal", 0., 2.)))
+  def testAffineForm(self, initializer, expected):
+    form = initializers.affine_form(initializer, [3, 4])
+    self.assertEqual(form.distribution, expected[0])
+    self.assertAllClose(form[1:], expected[1:])
+
+  @parameterized.parameters(
+      initializers.RandomNormal(seed=1),
+      initializers.RandomNormal(stddev=tf.constant(1.)),
+      initializers.Orthogonal())
+  def testNoAffineForm(self, initializer):
+    self.assertIsNone(initializers.affine_form(initializer, [3, 4]))
+
+  def testUnknownShape(self):
+    self.assertIsNone(initializers.affine_form(initializers.Ones(), [None]))
+
+
 if __name__ == "__main__":
   tf.test.main()
@@ -0,0 +1,321 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Memory mapped checkpoints for Sonnet modules."""
+
+import collections.abc
+import contextlib
+import json
+import os
+import struct
+import sys
+import threading
+from typing import Iterator, Mapping, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+import tensorflow as tf
+
+_MAGIC = b"SNTMMAP1"
+_HEADER_LENGTH = struct.Struct("<Q")
+# Offsets are aligned such that TensorFlow can wrap the buffers without copies.
+_ALIGNMENT = 64
+
+VariablesOrModule = Union[tf.Module, Sequence[tf.Variable]]
+ArrayLike = Union[tf.Variable, np.ndarray]
+
+
+class _Entry(NamedTuple):
+  dtype: tf.DType
+  shape: Tuple[int, ...]
+  offset: int
+  trainable: bool
+
+
+def _align(offset: int) -> int:
+  return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _variable_name(variable: tf.Variable) -> str:
+  return variable.name.split(":")[0]  # Remove the ":0" suffix.
+
+
+def _variables_by_name(
+    variables_or_module: VariablesOrModule) -> Mapping[str, tf.Variable]:
+  """Returns variables keyed by name, checking that names are unique."""
+  if isinstance(variables_or_module, tf.Module):
+    variables = variables_or_module.variables
+  else:
+    variables = variables_or_module
+
+  by_name = {}
+  for variable in variables:
+    name = _variable_name(variable)
+    if by_name.setdefault(name, variable) is not variable:
+      raise ValueError(
+          "Variable names must be unique to use a memory mapped checkpoint, "
+          "got more than one variable named {!r}.".format(name))
+  return by_name
+
+
+def save_mmap(path: str, variables_or_module: VariablesOrModule):
+  """Saves variables to a single memory mappable file.
+
+  The values of all variables are written to one file, each aligned to 64
+  bytes and keyed by the variable name (as shown by
+  :func:`~sonnet.format_variables`), such that they can be restored without
+  parsing or copying them into intermediate buffers using :func:`load_mmap`:
+
+  >>> import tempfile
+  >>> path = tempfile.mkdtemp() + "/mlp.snt"
+  >>> mlp = snt.nets.MLP([3, 2])
+  >>> _ = mlp(tf.ones([1, 4]))
+  >>> snt.checkpoint.save_mmap(path, mlp)
+
+  The file is written to a temporary location and moved to ``path`` once
+  complete, so readers never observe partial checkpoints.
+
+  Args:
+    path: Local path of the file to write.
+    variables_or_module: A :tf:`Module` (whose ``variables`` are saved) or a
+      sequence of variables. Variable names must be unique.
+
+  Raises:
+    ValueError: If variable names are not unique or a variable has a dtype
+      which can not be memory mapped (e.g. ``tf.string``).
+  """
+  variables = _variables_by_name(variables_or_module)
+  _write(path, variables,
+         {name: variable.trainable for name, variable in variables.items()})
+
+
+def _write(path: str, values: Mapping[str, ArrayLike],
+           trainable: Mapping[str, bool]):
+  """Writes ``values`` (variables or numpy arrays) to ``path``."""
+  entries = {}
+  offset = 0
+  for name, value in sorted(values.items()):
+    dtype = tf.as_dtype(value.dtype)
+    if not (dtype.is_floating or dtype.is_integer or dtype.is_complex or
+            dtype.is_bool):
+      raise ValueError("Variable {!r} has dtype {} which can not be memory "
+                       "mapped.".format(name, dtype.name))
+    shape = tf.TensorShape(value.shape)
+    entries[name] = {
+        "dtype": dtype.name,
+        "shape": shape.as_list(),
+        "offset": offset,
+        "trainable": trainable[name],
+    }
+    offset = _align(offset + shape.num_elements() * dtype.size)
+
+  header = json.dumps({
+      "byteorder": sys.byteorder,
+      "variables": entries,
+  }).encode("utf-8")
+  data_offset = _align(len(_MAGIC) + _HEADER_LENGTH.size + len(header))
+
+  tmp_path = path + ".tmp"
+  with open(tmp_path, "wb") as f:
+    f.write(_MAGIC)
+    f.write(_HEADER_LENGTH.pack(len(header)))
+    f.write(header)
+    for name, entry in entries.items():
+      f.seek(data_offset + entry["offset"])
+      value = np.ascontiguousarray(values[name])
+      f.write(value.reshape([-1]).view(np.uint8))
+    f.truncate(data_offset + offset)
+  os.replace(tmp_path, path)
+
+
+class MmapCheckpoint(collections.abc.Mapping):
+  """A read only view of a checkpoint written by :func:`save_mmap`.
+
+  Behaves like a mapping from variable name to a read only numpy array backed
+  by the memory mapped file. Only the header is read when the checkpoint is
+  loaded, the file is mapped on first access and the operating system pages
+  in the values of each variable as they are read.
+
+  >>> import tempfile
+  >>> path = tempfile.mkdtemp() + "/linear.snt"
+  >>> snt.checkpoint.save_mmap(path, [tf.Variable([1., 2.], name="w")])
+  >>> checkpoint = snt.checkpoint.load_mmap(path)
+  >>> list(checkpoint)
+  ['w']
+  >>> checkpoint["w"]
+  array([1., 2.], dtype=float32)
+  """
+
+  def __init__(self, path: str):
+    """Reads the header of the checkpoint at ``path``.
+
+    Args:
+      path: Local path of a file written by :func:`save_mmap`.
+
+    Raises:
+      ValueError: If ``path`` is not a memory mapped checkpoint or was written
+        on a machine with a different byte order.
+    """
+    self._path = path
+    with open(path, "rb") as f:
+      if f.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError(
+            "{!r} is not a Sonnet memory mapped checkpoint.".format(path))
+      header_length, = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+      header = json.loads(f.read(header_length).decode("utf-8"))
+
+    if header["byteorder"] != sys.byteorder:
+      raise ValueError(
+          "Checkpoint {!r} was written with {} endian byte order, expected {} "
+          "endian.".format(path, header["byteorder"], sys.byteorder))
+
+    self._data_offset = _align(
+        len(_MAGIC) + _HEADER_LENGTH.size + header_length)
+    self._entries = {
+        name: _Entry(dtype=tf.as_dtype(entry["dtype"]),
+                     shape=tuple(entry["shape"]),
+                     offset=entry["offset"],
+                     trainable=entry["trainable"])
+        for name, entry in header["variables"].items()}
+    self._mmap = None
+    self._lock = threading.Lock()
+
+  @property
+  def path(self) -> str:
+    return self._path
+
+  def _buffer(self) -> np.memmap:
+    with self._lock:
+      if self._mmap is None:
+        self._mmap = np.memmap(self._path, dtype=np.uint8, mode="r")
+      return self._mmap
+
+  def __getitem__(self, name: str) -> np.ndarray:
+    entry = self._entries[name]
+    return np.ndarray(
+        shape=entry.shape,
+        dtype=entry.dtype.as_numpy_dtype,
+        buffer=self._buffer(),
+        offset=self._data_offset + entry.offset)
+
+  def __iter__(self) -> Iterator[str]:
+    return iter(self._entries)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def spec(self, name: str) -> tf.TensorSpec:
+    """Returns the shape and dtype of variable ``name`` without reading it."""
+    entry = self._entries[name]
+    return tf.TensorSpec(entry.shape, entry.dtype, name=name)
+
+  def _check_compatible(self, name: str, shape, dtype):
+    spec = self.spec(name)
+    if not spec.shape.is_compatible_with(shape) or spec.dtype != dtype:
+      raise ValueError(
+          "Variable {!r} has shape {} and dtype {} but the checkpoint "
+          "contains shape {} and dtype {}.".format(
+              name, tf.TensorShape(shape), tf.as_dtype(dtype).name,
+              spec.shape, spec.dtype.name))
+
+  def restore(self, variables_or_module: VariablesOrModule):
+    """Assigns the values in this checkpoint to existing variables.
+
+    >>> import tempfile
+    >>> path = tempfile.mkdtemp() + "/variable.snt"
+    >>> snt.checkpoint.save_mmap(path, [tf.Variable([1., 2.], name="v")])
+    >>> v = tf.Variable([0., 0.], name="v")
+    >>> snt.checkpoint.load_mmap(path).restore([v])
+    >>> v.numpy()
+    array([1., 2.], dtype=float32)
+
+    Args:
+      variables_or_module: A :tf:`Module` (whose ``variables`` are restored)
+        or a sequence of variables.
+
+    Raises:
+      ValueError: If a variable is not in the checkpoint or has a different
+        shape or dtype to the checkpoint.
+    """
+    variables = _variables_by_name(variables_or_module)
+    missing = sorted(set(variables) - set(self._entries))
+    if missing:
+      raise ValueError("Variables {} are not in checkpoint {!r}.".format(
+          ", ".join(map(repr, missing)), self._path))
+
+    for name, variable in variables.items():
+      self._check_compatible(name, variable.shape, variable.dtype)
+      variable.assign(self[name])
+
+  @contextlib.contextmanager
+  def restore_on_create(self):
+    """Initializes variables created in this context from the checkpoint.
+
+    Variables whose name is in the checkpoint are created with the memory
+    mapped value as their initial value, without running their initializer.
+    This also applies to variables created while tracing (e.g. by
+    :func:`~sonnet.build`), which are created eagerly:
+
+    >>> import tempfile
+    >>> path = tempfile.mkdtemp() + "/linear.snt"
+    >>> linear = snt.Linear(2, b_init=snt.initializers.Ones())
+    >>> _ = linear(tf.ones([1, 2]))
+    >>> snt.checkpoint.save_mmap(path, linear)
+
+    >>> linear = snt.Linear(2)
+    >>> with snt.checkpoint.load_mmap(path).restore_on_create():
+    ...   _ = snt.build(linear, tf.TensorSpec([None, 2]))
+    >>> linear.b.numpy()
+    array([1., 1.], dtype=float32)
+
+    Other variables are created as usual.
+
+    Yields:
+      Nothing.
+    """
+    def creator(next_creator, **kwargs):
+      name = kwargs.get("name") or "Variable"
+      scope = tf.get_current_name_scope()
+      if scope:
+        name = scope + "/" + name
+      if name not in self._entries:
+        return next_creator(**kwargs)
+
+      shape = kwargs.get("shape")
+      if shape is None:
+        shape = self._entries[name].shape
+      dtype = kwargs.get("dtype") or self._entries[name].dtype
+      self._check_compatible(name, shape, dtype)
+      kwargs["initial_value"] = self[name]
+      with tf.init_scope():
+        return next_creator(**kwargs)
+
+    with tf.variable_creator_scope(creator):
+      yield
+
+
+def load_mmap(path: str) -> MmapCheckpoint:
+  """Loads a checkpoint written by :func:`save_mmap`.
+
+  Loading only reads the file header, values are read on first access. Use
+  :meth:`MmapCheckpoint.restore` to restore existing variables or
+  :meth:`MmapCheckpoint.restore_on_create` to create variables from the
+  checkpoint.
+
+  Args:
+    path: Local path of a file written by :func:`save_mmap`.
+
+  Returns:
+    A :class:`MmapCheckpoint`.
+  """
+  return MmapCheckpoint(path)
@@ -0,0 +1,129 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.mmap_checkpoint."""
+
+import os
+
+from absl.testing import parameterized
+import numpy as np
+from sonnet.src import build
+from sonnet.src import linear
+from sonnet.src import mmap_checkpoint
+from sonnet.src import test_utils
+import tensorflow as tf
+
+
+class MmapCheckpointTest(test_utils.TestCase, parameterized.TestCase):
+
+  def checkpoint_path(self):
+    return os.path.join(self.get_temp_dir(), "checkpoint.snt")
+
+  @parameterized.parameters(tf.float32, tf.float16, tf.bfloat16, tf.int64,
+                            tf.bool, tf.complex64)
+  def test_round_trip(self, dtype):
+    path = self.checkpoint_path()
+    value = tf.cast(tf.reshape(tf.range(6), [2, 3]), dtype)
+    mmap_checkpoint.save_mmap(path, [tf.Variable(value, name="v")])
+    checkpoint = mmap_checkpoint.load_mmap(path)
+    self.assertEqual(checkpoint.spec("v"), tf.TensorSpec([2, 3], dtype, "v"))
+    self.assertAllEqual(checkpoint["v"], value)
+
+  def test_values_are_aligned(self):
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(
+        path, [tf.Variable(tf.ones([n]), name=str(n)) for n in range(1, 5)])
+    checkpoint = mmap_checkpoint.load_mmap(path)
+    for name in checkpoint:
+      self.assertEqual(checkpoint[name].ctypes.data % 64, 0)
+
+  def test_values_are_read_only(self):
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(path, [tf.Variable([1.], name="v")])
+    value = mmap_checkpoint.load_mmap(path)["v"]
+    self.assertIsInstance(value.base, np.memmap)
+    self.assertFalse(value.flags.writeable)
+
+  def test_file_is_mapped_lazily(self):
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(path, [tf.Variable([1.], name="v")])
+    checkpoint = mmap_checkpoint.load_mmap(path)
+    self.assertLen(checkpoint, 1)
+    self.assertIsNone(checkpoint._mmap)
+    checkpoint["v"]  # pylint: disable=pointless-statement
+    self.assertIsNotNone(checkpoint._mmap)
+
+  def test_restore(self):
+    path = self.checkpoint_path()
+    mod = linear.Linear(3)
+    mod(tf.ones([1, 2]))
+    mod.b.assign([1., 2., 3.])
+    mmap_checkpoint.save_mmap(path, mod)
+
+    mod2 = linear.Linear(3)
+    mod2(tf.ones([1, 2]))
+    mmap_checkpoint.load_mmap(path).restore(mod2)
+    self.assertAllEqual(mod2.w, mod.w)
+    self.assertAllEqual(mod2.b, [1., 2., 3.])
+
+  def test_restore_missing_variable(self):
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(path, [tf.Variable(1., name="a")])
+    with self.assertRaisesRegex(ValueError, "'b' are not in checkpoint"):
+      mmap_checkpoint.load_mmap(path).restore([tf.Variable(1., name="b")])
+
+  def test_restore_incompatible_shape(self):
+    path = self.checkpoint_path()
+    mmap_checkpoint.save_mmap(path, [tf.Variable([1.], name="a")])
+    with self.assertRaisesRegex(ValueError, "has shape"):
+      mmap_checkpoint.load_mmap(path).restore([tf.Variable([1., 2.], name="a")])
+
+  @test_utils.combined_named_parameters(test_utils.named_bools("use_build"))
+  def test_restore_on_create(self, use_build):
+    path = self.checkpoint_path()
+    mod = linear.Linear(3)
+    mod(tf.ones([1, 2]))
+    mmap_checkpoint.save_mmap(path, [mod.w])
+
+    mod2 = linear.Linear(3, b_init=lambda *_: tf.fill([3], 2.))
+    with mmap_checkpoint.load_mmap(path).restore_on_create():
+      if use_build:
+        build.build(mod2, [None, 2])
+      else:
+        mod2(tf.ones([1, 2]))
+    self.assertAllEqual(mod2.w, mod.w)
+    # Not in the checkpoint, so initialized as usual.
+    self.assertAllEqual(mod2.b, [2., 2., 2.])
+
+  def test_duplicate_names(self):
+    with self.assertRaisesRegex(ValueError, "must be unique"):
+      mmap_checkpoint.save_mmap(
+          self.checkpoint_path(),
+          [tf.Variable(1., name="v"), tf.Variable(2., name="v")])
+
+  def test_unsupported_dtype(self):
+    with self.assertRaisesRegex(ValueError, "can not be memory mapped"):
+      mmap_checkpoint.save_mmap(self.checkpoint_path(),
+                                [tf.Variable("foo", name="v")])
+
+  def test_not_a_checkpoint(self):
+    path = self.checkpoint_path()
+    with open(path, "w") as f:
+      f.write("foo")
+    with self.assertRaisesRegex(ValueError, "not a Sonnet memory mapped"):
+      mmap_checkpoint.load_mmap(path)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -74,6 +74,34 @@ class ExponentialMovingAverage(metrics.Metric):
     self._hidden.assign_sub((self._hidden - value) * (1 - self._decay))
     self.average.assign((self._hidden / (1. - tf.pow(self._decay, counter))))
 
+  def assign(self, value: tf.Tensor, mask: Optional[tf.Tensor] = None):
+    """Sets the average to ``value``, where ``mask`` is ``True``.
+
+    The hidden average is set to match, such that later updates continue from
+    ``value`` as if it was the average of the values seen so far.
+
+    Args:
+      value: The new average, broadcastable to the shape of :attr:`average`.
+      mask: Optional boolean tensor broadcastable to the shape of
+        :attr:`average`. If given, only elements where it is ``True`` are set.
+
+    Raises:
+      ValueError: If no value has been passed to the moving average yet.
+    """
+    if self.average is None:
+      raise ValueError("Can not assign to a moving average before its first "
+                       "update.")
+    value = tf.broadcast_to(
+        tf.cast(value, self.average.dtype), self.average.shape)
+    counter = tf.cast(self._counter, value.dtype)
+    hidden = value * (1. - tf.pow(self._decay, counter))
+    if mask is not None:
+      mask = tf.broadcast_to(mask, self.average.shape)
+      value = tf.where(mask, value, self.average)
+      hidden = tf.where(mask, hidden, self._hidden)
+    self._hidden.assign(hidden)
+    self.average.assign(value)
+
   @property
   def value(self) -> tf.Tensor:
     """Returns the current EMA."""
@@ -64,6 +64,27 @@ class ExponentialMovingAverageTest(test_utils.TestCase, parameterized.TestCase):
     self.assertAllClose(ema(6.0).numpy(), 5.0, atol=1e-3, rtol=1e-5)
     self.assertAllClose(ema.value.numpy(), 5.0, atol=1e-3, rtol=1e-5)
 
+  def testAssign(self):
+    ema = moving_averages.ExponentialMovingAverage(0.50)
+    ema(3.0)
+    ema.assign(7.0)
+    self.assertAllClose(ema.value.numpy(), 7.0)
+    # Updates continue from the assigned average: (.5 * 7 + .5 * 5) / .75.
+    self.assertAllClose(ema(5.0).numpy(), 17. / 3.)
+
+  def testAssignMask(self):
+    ema = moving_averages.ExponentialMovingAverage(0.50)
+    ema(tf.constant([[1., 2.], [3., 4.]]))
+    ema.assign(tf.constant([10., 20.]), mask=tf.constant([False, True]))
+    self.assertAllClose(ema.value.numpy(), [[1., 20.], [3., 20.]])
+    self.assertAllClose(ema(tf.zeros([2, 2])).numpy(),
+                        [[1. / 3., 20. / 3.], [1., 20. / 3.]])
+
+  def testAssignBeforeUpdate(self):
+    ema = moving_averages.ExponentialMovingAverage(0.50)
+    with self.assertRaisesRegex(ValueError, "before its first update"):
+      ema.assign(1.0)
+
   @parameterized.parameters(True, False)
   def testWithTFFunction(self, autograph):
     ema_1 = moving_averages.ExponentialMovingAverage(0.95)
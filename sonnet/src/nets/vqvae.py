@@ -14,6 +14,8 @@
 # ============================================================================
 """Sonnet implementation of VQ-VAE https://arxiv.org/abs/1711.00937."""
 
+from typing import Optional
+
 from sonnet.src import base
 from sonnet.src import initializers
 from sonnet.src import moving_averages
@@ -22,6 +24,99 @@ from sonnet.src import types
 import tensorflow as tf
 
 
+# Codebook size from which `VectorQuantizerEMA` computes its statistics with
+# segment sums rather than a matmul with the one-hot encodings.
+_SEGMENT_SUM_MIN_EMBEDDINGS = 128
+
+
+def _check_return_encodings(return_encodings: Optional[bool],
+                            chunk_size: Optional[int],
+                            num_partitions: Optional[int] = None) -> bool:
+  """Validates `chunk_size` and returns whether to return encodings."""
+  if chunk_size is not None and chunk_size <= 0:
+    raise ValueError(f'chunk_size must be positive, got: {chunk_size}')
+  if chunk_size is None and num_partitions is None:
+    return True if return_encodings is None else return_encodings
+  if return_encodings:
+    raise ValueError('encodings and distances can not be returned when '
+                     'chunk_size or num_partitions is set, since the full '
+                     'distance matrix is never computed.')
+  return False
+
+
+def _distances(flat_inputs, embeddings):
+  """Squared distances between each input and each embedding, `[N, K]`."""
+  return (tf.reduce_sum(flat_inputs**2, 1, keepdims=True) -
+          2 * tf.matmul(flat_inputs, embeddings) +
+          tf.reduce_sum(embeddings**2, 0, keepdims=True))
+
+
+def _chunked_encoding_indices(flat_inputs, embeddings, chunk_size: int):
+  """Index of the nearest embedding to each input, `chunk_size` at a time.
+
+  Only `[N, chunk_size]` distances are materialized at once, the running
+  minimum is kept across chunks of the codebook.
+
+  Args:
+    flat_inputs: `[N, D]` inputs.
+    embeddings: `[D, K]` embeddings.
+    chunk_size: Number of embeddings to compute distances to at once.
+
+  Returns:
+    An int64 tensor of shape `[N]`. Ties are broken in favour of the lowest
+    index, as with `tf.argmax`.
+  """
+  embedding_dim, num_embeddings = embeddings.shape
+  num_chunks = -(-num_embeddings // chunk_size)
+  padding = num_chunks * chunk_size - num_embeddings
+
+  # Pad the codebook such that all chunks have the same (static) size, padding
+  # is infinitely far away from all inputs.
+  embeddings_sq = tf.reduce_sum(embeddings**2, 0)
+  embeddings_sq = tf.pad(embeddings_sq, [[0, padding]],
+                         constant_values=float('inf'))
+  embeddings = tf.pad(embeddings, [[0, 0], [0, padding]])
+  embeddings_sq = tf.reshape(embeddings_sq, [num_chunks, 1, chunk_size])
+  embeddings = tf.transpose(
+      tf.reshape(embeddings, [embedding_dim, num_chunks, chunk_size]),
+      [1, 0, 2])
+
+  num_inputs = tf.shape(flat_inputs)[0]
+  inputs_sq = tf.reduce_sum(flat_inputs**2, 1, keepdims=True)
+
+  def body(i, best_distances, best_indices):
+    distances = (inputs_sq - 2 * tf.matmul(flat_inputs, embeddings[i]) +
+                 embeddings_sq[i])
+    chunk_distances = tf.reduce_min(distances, 1)
+    chunk_indices = tf.argmin(distances, 1) + tf.cast(i * chunk_size, tf.int64)
+    closer = chunk_distances < best_distances
+    return (i + 1,
+            tf.where(closer, chunk_distances, best_distances),
+            tf.where(closer, chunk_indices, best_indices))
+
+  _, _, encoding_indices = tf.while_loop(
+      lambda i, *_: i < num_chunks,
+      body,
+      (tf.constant(0),
+       tf.fill([num_inputs], tf.constant(float('inf'), flat_inputs.dtype)),
+       tf.zeros([num_inputs], tf.int64)),
+      parallel_iterations=1)
+  return encoding_indices
+
+
+def _encoding_counts(encoding_indices, num_embeddings: int, dtype: tf.DType):
+  """Histogram of the number of inputs assigned to each embedding, `[K]`."""
+  # NOTE: Unlike `tf.math.bincount` the output size is static, so this can be
+  # compiled with XLA.
+  return tf.math.unsorted_segment_sum(
+      tf.ones_like(encoding_indices, dtype), encoding_indices, num_embeddings)
+
+
+def _perplexity(encoding_counts, num_inputs):
+  avg_probs = encoding_counts / tf.cast(num_inputs, encoding_counts.dtype)
+  return tf.exp(-tf.reduce_sum(avg_probs * tf.math.log(avg_probs + 1e-10)))
+
+
 class VectorQuantizer(base.Module):
   """Sonnet module representing the VQ-VAE layer.
 
@@ -45,6 +140,8 @@ class VectorQuantizer(base.Module):
     num_embeddings: integer, the number of vectors in the quantized space.
     commitment_cost: scalar which controls the weighting of the loss terms (see
       equation 4 in the paper - this variable is Beta).
+    chunk_size: if set, the number of embeddings to compute distances to at
+      once, bounding the memory used to find the nearest embedding.
   """
 
   def __init__(self,
@@ -52,6 +149,8 @@ class VectorQuantizer(base.Module):
                num_embeddings: int,
                commitment_cost: types.FloatLike,
                dtype: tf.DType = tf.float32,
+               chunk_size: Optional[int] = None,
+               return_encodings: Optional[bool] = None,
                name: str = 'vector_quantizer'):
     """Initializes a VQ-VAE module.
 
@@ -62,12 +161,26 @@ class VectorQuantizer(base.Module):
       commitment_cost: scalar which controls the weighting of the loss terms
         (see equation 4 in the paper - this variable is Beta).
       dtype: dtype for the embeddings variable, defaults to tf.float32.
+      chunk_size: if set, distances are computed to this many embeddings at a
+        time and only the index of the nearest embedding is kept, rather than
+        computing the full `[N, num_embeddings]` distance matrix. Use this
+        when both the batch and the codebook are large.
+      return_encodings: whether to return the one-hot `encodings` and
+        `distances`, both of shape `[N, num_embeddings]`. Defaults to `True`
+        unless `chunk_size` is set, in which case it must be `False`.
       name: name of the module.
+
+    Raises:
+      ValueError: if `chunk_size` is not positive, or is set and
+        `return_encodings` is `True`.
     """
     super().__init__(name=name)
     self.embedding_dim = embedding_dim
     self.num_embeddings = num_embeddings
     self.commitment_cost = commitment_cost
+    self.return_encodings = _check_return_encodings(return_encodings,
+                                                    chunk_size)
+    self.chunk_size = chunk_size
 
     embedding_shape = [embedding_dim, num_embeddings]
     initializer = initializers.VarianceScaling(distribution='uniform')
@@ -88,21 +201,27 @@ class VectorQuantizer(base.Module):
         loss: Tensor containing the loss to optimize.
         perplexity: Tensor containing the perplexity of the encodings.
         encodings: Tensor containing the discrete encodings, ie which element
-        of the quantized space each input element was mapped to.
+        of the quantized space each input element was mapped to. Only if
+        `return_encodings`.
         encoding_indices: Tensor containing the discrete encoding indices, ie
         which element of the quantized space each input element was mapped to.
+        distances: Tensor containing the squared distance from each input to
+        each embedding. Only if `return_encodings`.
     """
     flat_inputs = tf.reshape(inputs, [-1, self.embedding_dim])
 
-    distances = (
-        tf.reduce_sum(flat_inputs**2, 1, keepdims=True) -
-        2 * tf.matmul(flat_inputs, self.embeddings) +
-        tf.reduce_sum(self.embeddings**2, 0, keepdims=True))
-
-    encoding_indices = tf.argmax(-distances, 1)
-    encodings = tf.one_hot(encoding_indices,
-                           self.num_embeddings,
-                           dtype=distances.dtype)
+    if self.chunk_size is None:
+      distances = _distances(flat_inputs, self.embeddings)
+      encoding_indices = tf.argmax(-distances, 1)
+    else:
+      encoding_indices = _chunked_encoding_indices(
+          flat_inputs, self.embeddings, self.chunk_size)
+    encoding_counts = _encoding_counts(
+        encoding_indices, self.num_embeddings, flat_inputs.dtype)
+    if self.return_encodings:
+      encodings = tf.one_hot(encoding_indices,
+                             self.num_embeddings,
+                             dtype=distances.dtype)
 
     # NB: if your code crashes with a reshape error on the line below about a
     # Tensor containing the wrong number of values, then the most likely cause
@@ -118,18 +237,18 @@ class VectorQuantizer(base.Module):
 
     # Straight Through Estimator
     quantized = inputs + tf.stop_gradient(quantized - inputs)
-    avg_probs = tf.reduce_mean(encodings, 0)
-    perplexity = tf.exp(-tf.reduce_sum(avg_probs *
-                                       tf.math.log(avg_probs + 1e-10)))
+    perplexity = _perplexity(encoding_counts, tf.shape(flat_inputs)[0])
 
-    return {
+    outputs = {
         'quantize': quantized,
         'loss': loss,
         'perplexity': perplexity,
-        'encodings': encodings,
         'encoding_indices': encoding_indices,
-        'distances': distances,
     }
+    if self.return_encodings:
+      outputs['encodings'] = encodings
+      outputs['distances'] = distances
+    return outputs
 
   def quantize(self, encoding_indices):
     """Returns embedding tensor for a batch of indices."""
@@ -171,6 +290,19 @@ class VectorQuantizerEMA(base.Module):
       equation 4 in the paper).
     decay: float, decay for the moving averages.
     epsilon: small float constant to avoid numerical instability.
+    chunk_size: if set, the number of embeddings to compute distances to at
+      once, bounding the memory used to find the nearest embedding.
+    num_partitions: if set, the number of partitions in the approximate
+      nearest neighbour index used when not training.
+    num_probes: number of partitions searched per input by the index.
+    index_refresh_interval: number of EMA updates between refreshes of the
+      index.
+    segment_sum_statistics: whether the moving average statistics are computed
+      with segment sums over `encoding_indices`, rather than a matmul with the
+      one-hot encodings.
+    dead_code_threshold: if set, embeddings whose moving average cluster size
+      is below this are restarted from the reservoir of recent inputs.
+    reservoir_size: number of inputs kept in the reservoir.
   """
 
   def __init__(self,
@@ -180,6 +312,15 @@ class VectorQuantizerEMA(base.Module):
                decay,
                epsilon=1e-5,
                dtype=tf.float32,
+               chunk_size=None,
+               return_encodings=None,
+               num_partitions=None,
+               num_probes=1,
+               partition_size=None,
+               index_refresh_interval=10,
+               segment_sum_statistics=None,
+               dead_code_threshold=None,
+               reservoir_size=1024,
                name='vector_quantizer_ema'):
     """Initializes a VQ-VAE EMA module.
 
@@ -194,7 +335,66 @@ class VectorQuantizerEMA(base.Module):
         Averages.
       epsilon: small constant to aid numerical stability, default 1e-5.
       dtype: dtype for the embeddings variable, defaults to tf.float32.
+      chunk_size: if set, distances are computed to this many embeddings at a
+        time and only the index of the nearest embedding is kept, rather than
+        computing the full `[N, num_embeddings]` distance matrix. Use this
+        when both the batch and the codebook are large.
+      return_encodings: whether to return the one-hot `encodings` and
+        `distances`, both of shape `[N, num_embeddings]`. Defaults to `True`
+        unless `chunk_size` or `num_partitions` is set, in which case it must
+        be `False`.
+      num_partitions: if set, builds an inverted file index over the
+        embeddings for approximate nearest neighbour search when
+        `is_training=False`. Embeddings are partitioned by k-means into
+        `num_partitions` partitions (around `sqrt(num_embeddings)` is a good
+        choice). Inputs are compared with the centroid of every partition and
+        then only with the embeddings of the `num_probes` nearest partitions,
+        rather than with every embedding. The index is refreshed by one
+        k-means iteration every `index_refresh_interval` EMA updates. Training
+        always uses the exact search.
+      num_probes: number of partitions to search for each input. More probes
+        improve recall at the cost of speed.
+      partition_size: number of embeddings in each partition. Defaults to
+        twice the average partition size. Slots left after the embeddings
+        nearest to the centroid are filled with the nearest embeddings of
+        other partitions, which helps near partition boundaries. Embeddings in
+        partitions larger than this can not all be found by the index.
+      index_refresh_interval: number of EMA updates between refreshes of the
+        index. Each refresh compares every embedding with every centroid,
+        costing `O(num_partitions * num_embeddings * embedding_dim)`, similar
+        to exact search for `num_partitions` inputs. Refreshing after every
+        update can slow training steps considerably with a large codebook;
+        the default of 10 amortizes the refresh, at the cost of lower recall
+        from an index which lags the embeddings by up to
+        `index_refresh_interval - 1` updates. Since EMA updates move the
+        embeddings slowly this lag is usually small. Call `refresh_index`
+        before evaluating to search an up to date index.
+      segment_sum_statistics: whether to compute the sum of the inputs
+        assigned to each embedding with a segment sum over the encoding
+        indices, which costs `O(N * D)`, rather than a matmul with the one-hot
+        encodings, which costs `O(N * K * D)`. Both give the same updates up
+        to floating point rounding. Defaults to `True` if `num_embeddings` is
+        at least 128 or `return_encodings` is `False`.
+      dead_code_threshold: if set, restarts unused ("dead") embeddings during
+        training. Each training step, every embedding whose moving average
+        cluster size (roughly the number of inputs assigned to it per step) is
+        below this threshold is replaced by an input drawn at random from a
+        reservoir of inputs, until it is used again. This keeps more of a
+        large codebook in use, such that a smaller codebook often suffices.
+        `1.0` is a good choice when batches have many more inputs than
+        embeddings.
+      reservoir_size: number of inputs in the reservoir which dead embeddings
+        are restarted from. The reservoir is a uniform sample of the inputs
+        seen since the last restart, kept in a variable such that training
+        steps never copy it to the host. Restarts wait until at least this
+        many inputs have been seen.
       name: name of the module.
+
+    Raises:
+      ValueError: if `decay` is not in `[0, 1]`, `chunk_size` is not positive,
+        `chunk_size` or `num_partitions` is set and `return_encodings` is
+        `True`, `reservoir_size` is not positive, or the index arguments
+        (including `index_refresh_interval`) are out of range.
     """
     super().__init__(name=name)
     self.embedding_dim = embedding_dim
@@ -204,6 +404,14 @@ class VectorQuantizerEMA(base.Module):
     self.decay = decay
     self.commitment_cost = commitment_cost
     self.epsilon = epsilon
+    self.return_encodings = _check_return_encodings(return_encodings,
+                                                    chunk_size, num_partitions)
+    self.chunk_size = chunk_size
+    if segment_sum_statistics is None:
+      segment_sum_statistics = (
+          not self.return_encodings or
+          num_embeddings >= _SEGMENT_SUM_MIN_EMBEDDINGS)
+    self.segment_sum_statistics = segment_sum_statistics
 
     embedding_shape = [embedding_dim, num_embeddings]
     initializer = initializers.VarianceScaling(distribution='uniform')
@@ -218,6 +426,55 @@ class VectorQuantizerEMA(base.Module):
         decay=self.decay, name='ema_dw')
     self.ema_dw.initialize(self.embeddings)
 
+    self.dead_code_threshold = dead_code_threshold
+    if dead_code_threshold is not None:
+      if reservoir_size <= 0:
+        raise ValueError(
+            f'reservoir_size must be positive, got: {reservoir_size}')
+      self.reservoir = tf.Variable(
+          tf.zeros([reservoir_size, embedding_dim], dtype),
+          trainable=False,
+          name='reservoir')
+      # Number of inputs the reservoir has been sampled from.
+      self.reservoir_count = tf.Variable(
+          0, trainable=False, dtype=tf.int64, name='reservoir_count')
+
+    self.num_partitions = num_partitions
+    self.num_probes = num_probes
+    if num_partitions is not None:
+      if not 0 < num_partitions <= num_embeddings:
+        raise ValueError('num_partitions must be in range [1, '
+                         f'num_embeddings], got: {num_partitions}')
+      if not 0 < num_probes <= num_partitions:
+        raise ValueError('num_probes must be in range [1, num_partitions], '
+                         f'got: {num_probes}')
+      if partition_size is None:
+        partition_size = min(num_embeddings,
+                             2 * -(-num_embeddings // num_partitions))
+      if not 0 < partition_size <= num_embeddings:
+        raise ValueError('partition_size must be in range [1, '
+                         f'num_embeddings], got: {partition_size}')
+      self.partition_size = partition_size
+      if index_refresh_interval <= 0:
+        raise ValueError('index_refresh_interval must be positive, got: '
+                         f'{index_refresh_interval}')
+      self.index_refresh_interval = index_refresh_interval
+
+      # Initial centroids are evenly spaced embeddings.
+      stride = num_embeddings // num_partitions
+      self.partition_centroids = tf.Variable(
+          self.embeddings[:, ::stride][:, :num_partitions],
+          trainable=False,
+          name='partition_centroids')
+      self.partition_members = tf.Variable(
+          tf.zeros([num_partitions, partition_size], tf.int64),
+          trainable=False,
+          name='partition_members')
+      # Number of EMA updates since the index was last refreshed.
+      self.index_age = tf.Variable(
+          0, trainable=False, dtype=tf.int64, name='index_age')
+      self.refresh_index(num_iterations=10)
+
   def __call__(self, inputs, is_training):
     """Connects the module to some inputs.
 
@@ -234,21 +491,30 @@ class VectorQuantizerEMA(base.Module):
         loss: Tensor containing the loss to optimize.
         perplexity: Tensor containing the perplexity of the encodings.
         encodings: Tensor containing the discrete encodings, ie which element
-        of the quantized space each input element was mapped to.
+        of the quantized space each input element was mapped to. Only if
+        `return_encodings`.
         encoding_indices: Tensor containing the discrete encoding indices, ie
         which element of the quantized space each input element was mapped to.
+        distances: Tensor containing the squared distance from each input to
+        each embedding. Only if `return_encodings`.
     """
     flat_inputs = tf.reshape(inputs, [-1, self.embedding_dim])
 
-    distances = (
-        tf.reduce_sum(flat_inputs**2, 1, keepdims=True) -
-        2 * tf.matmul(flat_inputs, self.embeddings) +
-        tf.reduce_sum(self.embeddings**2, 0, keepdims=True))
-
-    encoding_indices = tf.argmax(-distances, 1)
-    encodings = tf.one_hot(encoding_indices,
-                           self.num_embeddings,
-                           dtype=distances.dtype)
+    if self.num_partitions is not None and not is_training:
+      encoding_indices = self._approximate_encoding_indices(flat_inputs)
+    elif self.chunk_size is None:
+      distances = _distances(flat_inputs, self.embeddings)
+      encoding_indices = tf.argmax(-distances, 1)
+    else:
+      encoding_indices = _chunked_encoding_indices(
+          flat_inputs, self.embeddings, self.chunk_size)
+    encoding_counts = _encoding_counts(
+        encoding_indices, self.num_embeddings, flat_inputs.dtype)
+    if self.return_encodings:
+      encodings = tf.one_hot(encoding_indices,
+                             self.num_embeddings,
+                             dtype=distances.dtype)
+    flat_encoding_indices = encoding_indices
 
     # NB: if your code crashes with a reshape error on the line below about a
     # Tensor containing the wrong number of values, then the most likely cause
@@ -260,11 +526,23 @@ class VectorQuantizerEMA(base.Module):
     e_latent_loss = tf.reduce_mean((tf.stop_gradient(quantized) - inputs)**2)
 
     if is_training:
-      updated_ema_cluster_size = self.ema_cluster_size(
-          tf.reduce_sum(encodings, axis=0))
-
-      dw = tf.matmul(flat_inputs, encodings, transpose_a=True)
+      # The number of inputs assigned to each embedding (equal to summing the
+      # one-hot encodings) and the sum of those inputs.
+      cluster_size = encoding_counts
+      if self.segment_sum_statistics:
+        dw = tf.transpose(
+            tf.math.unsorted_segment_sum(flat_inputs, flat_encoding_indices,
+                                         self.num_embeddings))
+      else:
+        if not self.return_encodings:
+          encodings = tf.one_hot(flat_encoding_indices, self.num_embeddings,
+                                 dtype=flat_inputs.dtype)
+        dw = tf.matmul(flat_inputs, encodings, transpose_a=True)
+      updated_ema_cluster_size = self.ema_cluster_size(cluster_size)
       updated_ema_dw = self.ema_dw(dw)
+      if self.dead_code_threshold is not None:
+        self._update_reservoir(flat_inputs)
+        dead = updated_ema_cluster_size < self.dead_code_threshold
 
       n = tf.reduce_sum(updated_ema_cluster_size)
       updated_ema_cluster_size = ((updated_ema_cluster_size + self.epsilon) /
@@ -273,7 +551,13 @@ class VectorQuantizerEMA(base.Module):
       normalised_updated_ema_w = (
           updated_ema_dw / tf.reshape(updated_ema_cluster_size, [1, -1]))
 
+      if self.dead_code_threshold is not None:
+        normalised_updated_ema_w = self._restart_dead_codes(
+            normalised_updated_ema_w, dead)
+
       self.embeddings.assign(normalised_updated_ema_w)
+      if self.num_partitions is not None:
+        self._maybe_refresh_index()
       loss = self.commitment_cost * e_latent_loss
 
     else:
@@ -281,20 +565,140 @@ class VectorQuantizerEMA(base.Module):
 
     # Straight Through Estimator
     quantized = inputs + tf.stop_gradient(quantized - inputs)
-    avg_probs = tf.reduce_mean(encodings, 0)
-    perplexity = tf.exp(-tf.reduce_sum(avg_probs *
-                                       tf.math.log(avg_probs + 1e-10)))
+    perplexity = _perplexity(encoding_counts, tf.shape(flat_inputs)[0])
 
-    return {
+    outputs = {
         'quantize': quantized,
         'loss': loss,
         'perplexity': perplexity,
-        'encodings': encodings,
         'encoding_indices': encoding_indices,
-        'distances': distances,
     }
+    if self.return_encodings:
+      outputs['encodings'] = encodings
+      outputs['distances'] = distances
+    return outputs
 
   def quantize(self, encoding_indices):
     """Returns embedding tensor for a batch of indices."""
     w = tf.transpose(self.embeddings, [1, 0])
     return tf.nn.embedding_lookup(w, encoding_indices)
+
+  def _update_reservoir(self, flat_inputs):
+    """Reservoir samples `flat_inputs` into `reservoir`, on device."""
+    reservoir_size = self.reservoir.shape[0]
+    num_inputs = tf.shape(flat_inputs, out_type=tf.int64)[0]
+    # Position of each input in the stream of inputs seen by the reservoir.
+    positions = self.reservoir_count + tf.range(num_inputs)
+    # Algorithm R: the first inputs fill the reservoir, later inputs replace a
+    # uniformly chosen slot with probability `reservoir_size / (position + 1)`.
+    # NOTE: Inputs in the same batch choosing the same slot overwrite each other
+    # in an unspecified order. Shuffling the batch first avoids favouring any
+    # part of it (e.g. the first examples) when it fills the reservoir.
+    flat_inputs = tf.random.shuffle(flat_inputs)
+    choices = tf.cast(
+        tf.random.uniform(tf.shape(positions), dtype=tf.float64) *
+        tf.cast(positions + 1, tf.float64), tf.int64)
+    slots = tf.where(positions < reservoir_size, positions, choices)
+    # Inputs which are not sampled write into a padding row, keeping all
+    # shapes static.
+    slots = tf.minimum(slots, reservoir_size)
+    padded = tf.pad(self.reservoir, [[0, 1], [0, 0]])
+    padded = tf.tensor_scatter_nd_update(
+        padded, tf.expand_dims(slots, 1),
+        tf.cast(flat_inputs, self.reservoir.dtype))
+    self.reservoir.assign(padded[:reservoir_size])
+    self.reservoir_count.assign_add(num_inputs)
+
+  def _restart_dead_codes(self, embeddings, dead):
+    """Replaces `dead` embeddings with random inputs from the reservoir."""
+    reservoir_size = self.reservoir.shape[0]
+    # Only restart from a full reservoir, which is then refilled from the
+    # inputs that follow such that it only holds recent inputs.
+    dead = tf.logical_and(dead, self.reservoir_count >= reservoir_size)
+    self.reservoir_count.assign(
+        tf.where(tf.reduce_any(dead), tf.constant(0, tf.int64),
+                 self.reservoir_count))
+    samples = tf.random.uniform(
+        [self.num_embeddings], maxval=reservoir_size, dtype=tf.int64)
+    restarts = tf.cast(tf.transpose(tf.gather(self.reservoir, samples)),
+                       embeddings.dtype)
+    # Restart the statistics too, as if `dead_code_threshold` inputs equal to
+    # the restart had been assigned per step. Otherwise the next update would
+    # recompute the embedding from the statistics of the dead embedding.
+    self.ema_cluster_size.assign(self.dead_code_threshold, mask=dead)
+    self.ema_dw.assign(restarts * self.dead_code_threshold,
+                       mask=tf.expand_dims(dead, 0))
+    return tf.where(tf.expand_dims(dead, 0), restarts, embeddings)
+
+  def refresh_index(self, num_iterations: int = 1):
+    """Updates the approximate nearest neighbour index from `embeddings`.
+
+    Runs `num_iterations` iterations of k-means on the embeddings, starting
+    from the current partition centroids, then fills each partition with (up
+    to `partition_size`) embeddings nearest to its centroid, followed by the
+    nearest embeddings from other partitions. This is called every
+    `index_refresh_interval` EMA updates, call it directly before evaluating
+    with a stale index or after modifying `embeddings` in other ways (e.g.
+    restoring them from a checkpoint without the index).
+
+    Args:
+      num_iterations: number of k-means iterations.
+
+    Raises:
+      ValueError: if the module was created without `num_partitions`.
+    """
+    if self.num_partitions is None:
+      raise ValueError('refresh_index requires num_partitions to be set.')
+
+    embeddings = tf.transpose(self.embeddings)
+    centroids = tf.transpose(self.partition_centroids)
+    for _ in range(num_iterations):
+      assignment = tf.argmin(
+          _distances(embeddings, tf.transpose(centroids)), 1)
+      sums = tf.math.unsorted_segment_sum(embeddings, assignment,
+                                          self.num_partitions)
+      counts = _encoding_counts(assignment, self.num_partitions,
+                                embeddings.dtype)
+      # Empty partitions keep their previous centroid.
+      centroids = tf.where(
+          tf.expand_dims(counts > 0, 1),
+          sums / tf.expand_dims(tf.maximum(counts, 1), 1),
+          centroids)
+
+    # Each partition holds the embeddings nearest to its centroid (nearest
+    # first), followed by the nearest embeddings from other partitions.
+    distances = _distances(centroids, self.embeddings)
+    assignment = tf.argmin(distances, 0)
+    is_member = tf.equal(
+        tf.expand_dims(tf.range(self.num_partitions, dtype=tf.int64), 1),
+        assignment)
+    _, members = tf.math.top_k(
+        tf.where(is_member, -distances, -distances - tf.reduce_max(distances)),
+        self.partition_size)
+    self.partition_centroids.assign(tf.transpose(centroids))
+    self.partition_members.assign(tf.cast(members, tf.int64))
+    self.index_age.assign(0)
+
+  def _maybe_refresh_index(self):
+    """Refreshes the index once every `index_refresh_interval` updates."""
+    if self.index_refresh_interval == 1:
+      self.refresh_index()
+      return
+    self.index_age.assign_add(1)
+    tf.cond(self.index_age >= self.index_refresh_interval,
+            self.refresh_index, lambda: None)
+
+  def _approximate_encoding_indices(self, flat_inputs):
+    """Nearest embedding to each input among the probed partitions."""
+    _, probes = tf.math.top_k(
+        -_distances(flat_inputs, self.partition_centroids), self.num_probes)
+    candidates = tf.reshape(
+        tf.gather(self.partition_members, probes),
+        [-1, self.num_probes * self.partition_size])
+    embeddings = tf.transpose(self.embeddings)
+    candidate_embeddings = tf.gather(embeddings, candidates)
+    # `|x|^2` is the same for all candidates of an input so is not needed.
+    distances = (
+        tf.gather(tf.reduce_sum(embeddings**2, 1), candidates) -
+        2 * tf.einsum('nd,ncd->nc', flat_inputs, candidate_embeddings))
+    return tf.gather(candidates, tf.argmin(distances, 1), batch_dims=1)
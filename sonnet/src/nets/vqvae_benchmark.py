@@ -0,0 +1,184 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Benchmarks for sonnet.v2.src.nets.vqvae.
+
+Compares the latency and recall (the fraction of inputs assigned an embedding
+as near as the exact nearest embedding) of the approximate nearest neighbour
+index in `VectorQuantizerEMA` against exact search, the cost the index adds to
+each training step, and the codebook usage and quantization error reached by
+training with and without dead code restarts.
+
+Run with:
+
+    python vqvae_benchmark.py --benchmark_filter=.
+"""
+
+import time
+
+import numpy as np
+from sonnet.src.nets import vqvae
+import tensorflow as tf
+
+NUM_EMBEDDINGS = (4096, 16384)
+NUM_PROBES = (1, 4, 8)
+EMBEDDING_DIM = 64
+BATCH_SIZE = 1024
+NUM_CLUSTERS = 256
+NUM_ITERS = 10
+NUM_TRAIN_STEPS = 200
+INDEX_REFRESH_INTERVALS = (1, 10, 100)
+
+
+def _mixture(rng, centers, size):
+  """Samples from a mixture of Gaussians, similar to a trained codebook."""
+  components = rng.randint(len(centers), size=size)
+  samples = centers[components] + 0.5 * rng.randn(size, EMBEDDING_DIM)
+  return samples.astype(np.float32)
+
+
+def _recall(inputs, embeddings, indices, exact_indices):
+  """Fraction of `indices` at most as far as `exact_indices` from inputs."""
+  inputs = inputs.astype(np.float64)
+  embeddings = embeddings.T.astype(np.float64)
+  distances = ((inputs - embeddings[indices])**2).sum(1)
+  exact_distances = ((inputs - embeddings[exact_indices])**2).sum(1)
+  # Allow for rounding differences between near ties.
+  return float(np.mean(distances <= exact_distances * (1 + 1e-5)))
+
+
+def _wall_time(f, inputs):
+  f(inputs)["encoding_indices"].numpy()  # Warmup and trace.
+  start = time.time()
+  for _ in range(NUM_ITERS):
+    encoding_indices = f(inputs)["encoding_indices"]
+  encoding_indices.numpy()
+  return (time.time() - start) / NUM_ITERS
+
+
+class VectorQuantizerIndexBenchmark(tf.test.Benchmark):
+  """Compares exact and approximate nearest embedding search."""
+
+  def benchmark_index(self):
+    rng = np.random.RandomState(0)
+    centers = 3 * rng.randn(NUM_CLUSTERS, EMBEDDING_DIM)
+    inputs_np = _mixture(rng, centers, BATCH_SIZE)
+    inputs = tf.constant(inputs_np)
+
+    for num_embeddings in NUM_EMBEDDINGS:
+      embeddings = _mixture(rng, centers, num_embeddings).T
+      exact = vqvae.VectorQuantizerEMA(
+          EMBEDDING_DIM, num_embeddings, commitment_cost=0.25, decay=0.99,
+          return_encodings=False)
+      exact.embeddings.assign(embeddings)
+      exact_fn = tf.function(lambda x, m=exact: m(x, is_training=False))
+      exact_indices = exact_fn(inputs)["encoding_indices"].numpy()
+      self.report_benchmark(
+          iters=NUM_ITERS,
+          wall_time=_wall_time(exact_fn, inputs),
+          name="exact_{}".format(num_embeddings))
+
+      num_partitions = int(np.sqrt(num_embeddings))
+      index = None
+      for num_probes in NUM_PROBES:
+        indexed = vqvae.VectorQuantizerEMA(
+            EMBEDDING_DIM, num_embeddings, commitment_cost=0.25, decay=0.99,
+            num_partitions=num_partitions, num_probes=num_probes)
+        indexed.embeddings.assign(embeddings)
+        if index is None:
+          indexed.refresh_index(num_iterations=10)
+          index = (indexed.partition_centroids.numpy(),
+                   indexed.partition_members.numpy())
+        else:
+          # Share one index such that only the number of probes differs.
+          indexed.partition_centroids.assign(index[0])
+          indexed.partition_members.assign(index[1])
+        indexed_fn = tf.function(lambda x, m=indexed: m(x, is_training=False))
+        indices = indexed_fn(inputs)["encoding_indices"].numpy()
+        self.report_benchmark(
+            iters=NUM_ITERS,
+            wall_time=_wall_time(indexed_fn, inputs),
+            name="index_{}_probes_{}".format(num_embeddings, num_probes),
+            extras={"recall": _recall(inputs_np, embeddings, indices,
+                                      exact_indices)})
+
+
+class VectorQuantizerIndexTrainingBenchmark(tf.test.Benchmark):
+  """Measures the training step time added by refreshing the index."""
+
+  def benchmark_train_step(self):
+    rng = np.random.RandomState(0)
+    centers = 3 * rng.randn(NUM_CLUSTERS, EMBEDDING_DIM)
+    inputs = tf.constant(_mixture(rng, centers, BATCH_SIZE))
+
+    for num_embeddings in NUM_EMBEDDINGS:
+      configs = [("exact", {})]
+      for interval in INDEX_REFRESH_INTERVALS:
+        configs.append(("index_interval_{}".format(interval),
+                        {"num_partitions": int(np.sqrt(num_embeddings)),
+                         "index_refresh_interval": interval}))
+      for name, kwargs in configs:
+        module = vqvae.VectorQuantizerEMA(
+            EMBEDDING_DIM, num_embeddings, commitment_cost=0.25, decay=0.99,
+            return_encodings=False, **kwargs)
+        train = tf.function(lambda x, m=module: m(x, is_training=True))
+        train(inputs)["encoding_indices"].numpy()  # Warmup and trace.
+        start = time.time()
+        for _ in range(NUM_TRAIN_STEPS):
+          encoding_indices = train(inputs)["encoding_indices"]
+        encoding_indices.numpy()
+        self.report_benchmark(
+            iters=NUM_TRAIN_STEPS,
+            wall_time=(time.time() - start) / NUM_TRAIN_STEPS,
+            name="train_step_{}_{}".format(num_embeddings, name))
+
+
+class VectorQuantizerDeadCodeBenchmark(tf.test.Benchmark):
+  """Compares training with and without restarting dead embeddings."""
+
+  def benchmark_dead_codes(self):
+    rng = np.random.RandomState(0)
+    centers = 3 * rng.randn(NUM_CLUSTERS * 4, EMBEDDING_DIM)
+    eval_inputs = tf.constant(_mixture(rng, centers, 4 * BATCH_SIZE))
+
+    for num_embeddings in (256, 1024):
+      for dead_code_threshold in (None, 1.):
+        tf.random.set_seed(0)
+        module = vqvae.VectorQuantizerEMA(
+            EMBEDDING_DIM, num_embeddings, commitment_cost=0.25, decay=0.99,
+            dead_code_threshold=dead_code_threshold)
+        train = tf.function(lambda x, m=module: m(x, is_training=True))
+        batches = [tf.constant(_mixture(rng, centers, BATCH_SIZE))
+                   for _ in range(NUM_TRAIN_STEPS)]
+        train(batches[0])
+        start = time.time()
+        for batch in batches[1:]:
+          train(batch)
+        wall_time = (time.time() - start) / (NUM_TRAIN_STEPS - 1)
+
+        outputs = module(eval_inputs, is_training=False)
+        used = len(np.unique(outputs["encoding_indices"].numpy()))
+        error = tf.reduce_mean((outputs["quantize"] - eval_inputs)**2)
+        self.report_benchmark(
+            iters=NUM_TRAIN_STEPS,
+            wall_time=wall_time,
+            name="train_{}_{}".format(
+                num_embeddings,
+                "restart" if dead_code_threshold else "no_restart"),
+            extras={"used_embeddings": used,
+                    "quantization_error": float(error)})
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -152,5 +152,275 @@ class VqvaeTest(parameterized.TestCase, test_utils.TestCase):
     self.assertFalse(model.embeddings.trainable)
 
 
+  @parameterized.parameters(
+      (vqvae.VectorQuantizer, {'commitment_cost': 0.25}),
+      (vqvae.VectorQuantizerEMA, {'commitment_cost': 0.5, 'decay': 0.1}))
+  def testChunked(self, constructor, kwargs):
+    dense = constructor(embedding_dim=6, num_embeddings=13, **kwargs)
+    chunked = constructor(embedding_dim=6, num_embeddings=13, chunk_size=4,
+                          **kwargs)
+    chunked.embeddings.assign(dense.embeddings)
+    inputs = tf.random.normal([5, 20, 6])
+
+    dense_output = dense(inputs, is_training=False)
+    chunked_output = tf.function(chunked, jit_compile=True)(
+        inputs, is_training=False)
+    self.assertCountEqual(chunked_output,
+                          ['quantize', 'loss', 'perplexity', 'encoding_indices'])
+    self.assertAllEqual(chunked_output['encoding_indices'],
+                        dense_output['encoding_indices'])
+    for key in ('quantize', 'loss', 'perplexity'):
+      self.assertAllClose(chunked_output[key], dense_output[key])
+
+  def testChunkedEmaUpdating(self):
+    kwargs = dict(embedding_dim=6, num_embeddings=13, commitment_cost=0.5,
+                  decay=0.1)
+    dense = vqvae.VectorQuantizerEMA(**kwargs)
+    chunked = vqvae.VectorQuantizerEMA(chunk_size=5, **kwargs)
+    chunked.embeddings.assign(dense.embeddings)
+    chunked.ema_dw.initialize(dense.embeddings)
+    for _ in range(5):
+      inputs = tf.random.normal([16, 6])
+      dense(inputs, is_training=True)
+      chunked(inputs, is_training=True)
+      self.assertAllClose(chunked.embeddings, dense.embeddings)
+
+  @parameterized.parameters(
+      (vqvae.VectorQuantizer, {'commitment_cost': 0.25}),
+      (vqvae.VectorQuantizerEMA, {'commitment_cost': 0.5, 'decay': 0.1}))
+  def testPerplexity(self, constructor, kwargs):
+    vqvae_module = constructor(embedding_dim=4, num_embeddings=8, **kwargs)
+    vq_output = vqvae_module(tf.random.normal([50, 4]), is_training=False)
+    avg_probs = tf.reduce_mean(vq_output['encodings'], 0)
+    expected = tf.exp(-tf.reduce_sum(avg_probs *
+                                     tf.math.log(avg_probs + 1e-10)))
+    self.assertAllClose(vq_output['perplexity'], expected)
+
+  @parameterized.parameters(vqvae.VectorQuantizer, vqvae.VectorQuantizerEMA)
+  def testReturnEncodings(self, constructor):
+    kwargs = dict(embedding_dim=4, num_embeddings=8, commitment_cost=0.5)
+    if constructor is vqvae.VectorQuantizerEMA:
+      kwargs['decay'] = 0.1
+    vqvae_module = constructor(return_encodings=False, **kwargs)
+    vq_output = vqvae_module(tf.zeros([3, 4]), is_training=True)
+    self.assertNotIn('encodings', vq_output)
+    self.assertNotIn('distances', vq_output)
+
+    with self.assertRaisesRegex(ValueError, 'chunk_size must be positive'):
+      constructor(chunk_size=0, **kwargs)
+    with self.assertRaisesRegex(ValueError, 'can not be returned'):
+      constructor(chunk_size=2, return_encodings=True, **kwargs)
+
+  def testSegmentSumStatisticsDefault(self):
+    kwargs = dict(embedding_dim=4, commitment_cost=0.5, decay=0.1)
+    self.assertFalse(vqvae.VectorQuantizerEMA(
+        num_embeddings=8, **kwargs).segment_sum_statistics)
+    self.assertTrue(vqvae.VectorQuantizerEMA(
+        num_embeddings=256, **kwargs).segment_sum_statistics)
+    self.assertTrue(vqvae.VectorQuantizerEMA(
+        num_embeddings=8, return_encodings=False, **kwargs)
+                    .segment_sum_statistics)
+
+  @parameterized.parameters(True, False)
+  def testSegmentSumStatistics(self, return_encodings):
+    kwargs = dict(embedding_dim=4, num_embeddings=256, commitment_cost=0.5,
+                  decay=0.9, return_encodings=return_encodings)
+    segment_sum = vqvae.VectorQuantizerEMA(
+        segment_sum_statistics=True, **kwargs)
+    dense = vqvae.VectorQuantizerEMA(segment_sum_statistics=False, **kwargs)
+    dense.embeddings.assign(segment_sum.embeddings)
+
+    for _ in range(3):
+      inputs = tf.random.normal([100, 4])
+      segment_sum_output = segment_sum(inputs, is_training=True)
+      dense_output = dense(inputs, is_training=True)
+      self.assertAllEqual(segment_sum_output['encoding_indices'],
+                          dense_output['encoding_indices'])
+    self.assertAllClose(segment_sum.ema_cluster_size.value,
+                        dense.ema_cluster_size.value)
+    self.assertAllClose(segment_sum.ema_dw.value, dense.ema_dw.value)
+    self.assertAllClose(segment_sum.embeddings, dense.embeddings)
+
+  def testReservoirFillsInOrder(self):
+    vqvae_module = vqvae.VectorQuantizerEMA(
+        embedding_dim=2, num_embeddings=4, commitment_cost=0.5, decay=0.9,
+        dead_code_threshold=0., reservoir_size=8)
+    first = tf.reshape(tf.range(10, dtype=tf.float32), [5, 2])
+    vqvae_module(first, is_training=True)
+    self.assertEqual(vqvae_module.reservoir_count.numpy(), 5)
+    self.assertCountEqual(vqvae_module.reservoir[:5].numpy().tolist(),
+                          first.numpy().tolist())
+
+    second = first + 10.
+    vqvae_module(second, is_training=True)
+    self.assertEqual(vqvae_module.reservoir_count.numpy(), 10)
+    # The first 8 inputs fill the reservoir, the last 2 may replace any slot.
+    reservoir = vqvae_module.reservoir.numpy().tolist()
+    from_first = [row for row in reservoir if row in first.numpy().tolist()]
+    from_second = [row for row in reservoir if row in second.numpy().tolist()]
+    self.assertGreaterEqual(len(from_first), 3)
+    self.assertGreaterEqual(len(from_second), 3)
+    self.assertLen(from_first + from_second, 8)
+
+  @parameterized.parameters(False, True)
+  def testDeadCodesRestarted(self, use_jit):
+    vqvae_module = vqvae.VectorQuantizerEMA(
+        embedding_dim=2, num_embeddings=16, commitment_cost=0.5, decay=0.9,
+        dead_code_threshold=1., reservoir_size=32)
+    # All inputs are near a single embedding, the others are never used.
+    vqvae_module.embeddings.assign(
+        tf.concat([tf.fill([2, 1], 10.), tf.fill([2, 15], -10.)], 1))
+    inputs = 10. + tf.random.normal([64, 2])
+    train = tf.function(lambda x: vqvae_module(x, is_training=True),
+                        jit_compile=use_jit)
+    train(inputs)
+
+    embeddings = vqvae_module.embeddings.numpy().T
+    self.assertEqual(vqvae_module.reservoir_count.numpy(), 0)
+    # Dead embeddings are restarted from inputs, the used one is kept.
+    self.assertAllClose(embeddings[0], tf.reduce_mean(inputs, 0), atol=1e-4)
+    for embedding in embeddings[1:]:
+      self.assertIn(embedding.tolist(), inputs.numpy().tolist())
+
+    # Restarted embeddings are now used.
+    encoding_indices = train(inputs)['encoding_indices'].numpy()
+    self.assertGreater(len(np.unique(encoding_indices)), 1)
+
+  def testRestartedCodesSurviveStepWithoutInputs(self):
+    vqvae_module = vqvae.VectorQuantizerEMA(
+        embedding_dim=2, num_embeddings=16, commitment_cost=0.5, decay=0.9,
+        dead_code_threshold=1., reservoir_size=32)
+    vqvae_module.embeddings.assign(
+        tf.concat([tf.fill([2, 1], 10.), tf.fill([2, 15], -10.)], 1))
+    vqvae_module(10. + tf.random.normal([64, 2]), is_training=True)
+    restarted = vqvae_module.embeddings[:, 1:].numpy()
+    self.assertAllClose(vqvae_module.ema_cluster_size.value[1:],
+                        tf.ones([15]))
+
+    # Every input is assigned to the first embedding and the reservoir is not
+    # full, so the restarted embeddings get no inputs and are not restarted.
+    inputs = tf.tile(vqvae_module.embeddings[:, :1], [1, 8])
+    vqvae_module(tf.transpose(inputs), is_training=True)
+    self.assertAllClose(vqvae_module.embeddings[:, 1:], restarted, rtol=1e-4)
+
+  def testDeadCodesWaitForFullReservoir(self):
+    vqvae_module = vqvae.VectorQuantizerEMA(
+        embedding_dim=2, num_embeddings=4, commitment_cost=0.5, decay=0.9,
+        dead_code_threshold=1., reservoir_size=32)
+    vqvae_module.embeddings.assign(
+        tf.concat([tf.fill([2, 1], 10.), tf.fill([2, 3], -10.)], 1))
+    vqvae_module(10. + tf.random.normal([16, 2]), is_training=True)
+    self.assertEqual(vqvae_module.reservoir_count.numpy(), 16)
+    # Not restarted, so updated as usual (unused embeddings have no inputs).
+    self.assertAllEqual(vqvae_module.embeddings[:, 1:], tf.zeros([2, 3]))
+
+  def testReservoirSizeMustBePositive(self):
+    with self.assertRaisesRegex(ValueError, 'reservoir_size must be positive'):
+      vqvae.VectorQuantizerEMA(
+          embedding_dim=2, num_embeddings=4, commitment_cost=0.5, decay=0.9,
+          dead_code_threshold=1., reservoir_size=0)
+
+  def _create_indexed(self, **kwargs):
+    return vqvae.VectorQuantizerEMA(
+        embedding_dim=4, num_embeddings=64, commitment_cost=0.5, decay=0.9,
+        num_partitions=8, **kwargs)
+
+  def testIndexExhaustiveSearchIsExact(self):
+    # Probing every partition, which together contain every embedding.
+    vqvae_module = self._create_indexed(num_probes=8, partition_size=64)
+    inputs = tf.random.normal([100, 4])
+    expected = tf.argmin(
+        vqvae._distances(inputs, vqvae_module.embeddings), 1)
+    vq_output = vqvae_module(inputs, is_training=False)
+    self.assertAllEqual(vq_output['encoding_indices'], expected)
+    self.assertNotIn('distances', vq_output)
+
+  def testIndexRecall(self):
+    vqvae_module = self._create_indexed(num_probes=2)
+    inputs = tf.random.normal([1000, 4])
+    expected = tf.argmin(
+        vqvae._distances(inputs, vqvae_module.embeddings), 1)
+    actual = tf.function(vqvae_module)(inputs, is_training=False)
+    recall = np.mean(actual['encoding_indices'].numpy() == expected.numpy())
+    self.assertGreater(recall, 0.8)
+
+  def testIndexPartitions(self):
+    vqvae_module = self._create_indexed()
+    self.assertEqual(vqvae_module.partition_size, 16)
+    members = vqvae_module.partition_members.numpy()
+    self.assertEqual(members.shape, (8, 16))
+    # Each partition starts with the embeddings nearest to its centroid, then
+    # the nearest embeddings from other partitions.
+    distances = vqvae._distances(
+        tf.transpose(vqvae_module.partition_centroids),
+        vqvae_module.embeddings).numpy()
+    assignment = np.argmin(distances, 0)
+    for partition in range(8):
+      assigned = np.flatnonzero(assignment == partition)
+      num_assigned = min(len(assigned), 16)
+      self.assertContainsSubset(members[partition][:num_assigned], assigned)
+      if len(assigned) <= 16:
+        others = np.setdiff1d(np.arange(64), assigned)
+        nearest = others[np.argsort(distances[partition][others])]
+        self.assertCountEqual(members[partition][num_assigned:],
+                              nearest[:16 - num_assigned])
+
+  def testIndexRefreshedByEmaUpdate(self):
+    vqvae_module = self._create_indexed(index_refresh_interval=1)
+    centroids = vqvae_module.partition_centroids.numpy()
+    vqvae_module(tf.random.normal([32, 4]) + 10., is_training=True)
+    self.assertNotAllClose(vqvae_module.partition_centroids, centroids)
+
+    centroids = vqvae_module.partition_centroids.numpy()
+    vqvae_module(tf.random.normal([32, 4]), is_training=False)
+    self.assertAllEqual(vqvae_module.partition_centroids, centroids)
+
+  def testIndexRefreshIntervalDefault(self):
+    vqvae_module = self._create_indexed()
+    self.assertEqual(vqvae_module.index_refresh_interval, 10)
+    centroids = vqvae_module.partition_centroids.numpy()
+    vqvae_module(tf.random.normal([32, 4]) + 10., is_training=True)
+    self.assertAllEqual(vqvae_module.partition_centroids, centroids)
+    self.assertEqual(vqvae_module.index_age.numpy(), 1)
+
+  @parameterized.parameters(True, False)
+  def testIndexRefreshInterval(self, use_tf_function):
+    vqvae_module = self._create_indexed(index_refresh_interval=3)
+    train = lambda x: vqvae_module(x, is_training=True)
+    if use_tf_function:
+      train = tf.function(train)
+    for step in range(1, 7):
+      centroids = vqvae_module.partition_centroids.numpy()
+      train(tf.random.normal([32, 4]) + 10. * step)
+      if step % 3:
+        self.assertAllEqual(vqvae_module.partition_centroids, centroids)
+      else:
+        self.assertNotAllClose(vqvae_module.partition_centroids, centroids)
+      self.assertEqual(vqvae_module.index_age.numpy(), step % 3)
+
+  def testTrainingIsExact(self):
+    vqvae_module = self._create_indexed(num_probes=1, partition_size=1)
+    inputs = tf.random.normal([100, 4])
+    expected = tf.argmin(
+        vqvae._distances(inputs, vqvae_module.embeddings), 1)
+    vq_output = vqvae_module(inputs, is_training=True)
+    self.assertAllEqual(vq_output['encoding_indices'], expected)
+
+  @parameterized.parameters(
+      ({'num_partitions': 0}, 'num_partitions must be in range'),
+      ({'num_partitions': 65}, 'num_partitions must be in range'),
+      ({'num_partitions': 4, 'num_probes': 5}, 'num_probes must be in range'),
+      ({'num_partitions': 4, 'partition_size': 0},
+       'partition_size must be in range'),
+      ({'num_partitions': 4, 'index_refresh_interval': 0},
+       'index_refresh_interval must be positive'),
+      ({'num_partitions': 4, 'return_encodings': True}, 'can not be returned'))
+  def testIndexInvalidArguments(self, kwargs, message):
+    with self.assertRaisesRegex(ValueError, message):
+      vqvae.VectorQuantizerEMA(
+          embedding_dim=4, num_embeddings=64, commitment_cost=0.5, decay=0.9,
+          **kwargs)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -17,6 +17,7 @@
 from sonnet.src import test_utils
 from sonnet.src.optimizers import adam
 from sonnet.src.optimizers import optimizer_tests
+from sonnet.src.optimizers import optimizer_utils
 import tensorflow as tf
 
 CONFIGS = optimizer_tests.named_product(learning_rate=(0.1, 0.01, 0.001),
@@ -36,11 +37,12 @@ class ComparisonTest(optimizer_tests.AbstractFuzzTest):
                                    epsilon=epsilon)
     return lambda g, p: optimizer.apply_gradients(zip(g, p))
 
-  def _make_snt(self, learning_rate, beta_1, beta_2, epsilon):
+  def _make_snt(self, learning_rate, beta_1, beta_2, epsilon, fused=False):
     optimizer = adam.Adam(learning_rate=learning_rate,
                           beta1=beta_1,
                           beta2=beta_2,
-                          epsilon=epsilon)
+                          epsilon=epsilon,
+                          fused=fused)
     return optimizer.apply
 
   @test_utils.combined_named_parameters(CONFIGS)
@@ -48,6 +50,12 @@ class ComparisonTest(optimizer_tests.AbstractFuzzTest):
     seed = config.pop("seed")
     self.assertParametersRemainClose(seed, config)
 
+  @test_utils.combined_named_parameters(CONFIGS)
+  def testComparingFusedSonnetAndTensorFlow(self, config):
+    config = dict(config)
+    seed = config.pop("seed")
+    self.assertParametersRemainClose(seed, config, snt_kwargs={"fused": True})
+
 
 class AdamTest(optimizer_tests.OptimizerTestBase):
 
@@ -153,6 +161,121 @@ class AdamTest(optimizer_tests.OptimizerTestBase):
     self.assertEqual(optimizer.v[0].device, var.device)
 
 
+class FusedAdamTest(AdamTest):
+
+  def make_optimizer(self, **kwargs):
+    return super().make_optimizer(fused=True, **kwargs)
+
+  def testMatchesUnfused(self):
+    def make_parameters():
+      return [tf.Variable(tf.reshape(tf.range(6.), [2, 3])),
+              tf.Variable([1., 2.], dtype=tf.float64),
+              tf.Variable([3., 4., 5.]),
+              tf.Variable([[1.], [2.]])]
+
+    updates = [tf.constant([[1., -2., 3.], [.5, -.5, 0.]]),
+               tf.constant([5., 5.], dtype=tf.float64),
+               None,
+               tf.IndexedSlices(tf.constant([[0.1]]), tf.constant([1]),
+                                tf.constant([2, 1]))]
+    if self.primary_device in ("GPU", "TPU"):
+      updates[-1] = None
+
+    fused_params, unfused_params = make_parameters(), make_parameters()
+    fused = self.make_optimizer(learning_rate=0.1)
+    unfused = adam.Adam(learning_rate=0.1)
+    for _ in range(3):
+      fused.apply(updates, fused_params)
+      unfused.apply(updates, unfused_params)
+      for f, u in zip(fused_params, unfused_params):
+        self.assertAllClose(u.numpy(), f.numpy())
+    for f, u in zip(fused.m + fused.v, unfused.m + unfused.v):
+      self.assertAllClose(u.numpy(), f.numpy())
+
+  def testTFFunction(self):
+    parameters = [tf.Variable([1., 2.]), tf.Variable([3., 4.])]
+    updates = [tf.constant([5., 5.]), tf.constant([3., 3.])]
+    optimizer = self.make_optimizer(learning_rate=0.001)
+    apply = tf.function(optimizer.apply)
+    apply(updates, parameters)
+    apply(updates, parameters)
+    self.assertAllClose([[0.998, 1.998], [2.998, 3.998]],
+                        [x.numpy() for x in parameters])
+
+
+class FlatSlotsAdamTest(AdamTest):
+
+  def make_optimizer(self, **kwargs):
+    return super().make_optimizer(flat_slots=True, **kwargs)
+
+  def testSingleBufferPerDType(self):
+    parameters = [tf.Variable([1., 2.]), tf.Variable([[3.], [4.]]),
+                  tf.Variable([5.], dtype=tf.float64)]
+    updates = [tf.constant([5., 5.]), tf.constant([[3.], [3.]]),
+               tf.constant([1.], dtype=tf.float64)]
+    optimizer = self.make_optimizer()
+    optimizer.apply(updates, parameters)
+    self.assertLen(optimizer.m.buffers, 2)
+    self.assertEqual(optimizer.m.buffers[0].shape, [4])
+    self.assertEqual(optimizer.m.buffers[1].shape, [1])
+    self.assertLen(optimizer.m, 3)
+    self.assertEqual(optimizer.m[1].shape, [2, 1])
+    self.assertLen(optimizer.variables, 5)
+
+  def testMatchesPerParameter(self):
+    def make_parameters():
+      return [tf.Variable(tf.reshape(tf.range(6.), [2, 3])),
+              tf.Variable([1., 2.], dtype=tf.float64),
+              tf.Variable([3., 4., 5.]),
+              tf.Variable([[1., 2.], [3., 4.], [5., 6.]])]
+
+    sparse_update = tf.IndexedSlices(
+        tf.constant([[0.1, 0.2], [0.3, 0.4]]), tf.constant([2, 0]),
+        tf.constant([3, 2]))
+    if self.primary_device in ("GPU", "TPU"):
+      sparse_update = tf.convert_to_tensor(sparse_update)
+    steps = [
+        # Every parameter has a dense update.
+        [tf.constant([[1., -2., 3.], [.5, -.5, 0.]]),
+         tf.constant([5., 5.], dtype=tf.float64),
+         tf.constant([1., 2., 3.]),
+         tf.ones([3, 2])],
+        # Mixture of dense, sparse and missing updates.
+        [tf.constant([[1., -2., 3.], [.5, -.5, 0.]]),
+         tf.constant([5., 5.], dtype=tf.float64),
+         None,
+         sparse_update],
+    ]
+
+    flat_params, per_param_params = make_parameters(), make_parameters()
+    flat = self.make_optimizer(learning_rate=0.1)
+    per_param = adam.Adam(learning_rate=0.1)
+    for updates in steps * 2:
+      flat.apply(updates, flat_params)
+      per_param.apply(updates, per_param_params)
+      for f, p in zip(flat_params, per_param_params):
+        self.assertAllClose(p.numpy(), f.numpy())
+    for f, p in zip(list(flat.m) + list(flat.v), per_param.m + per_param.v):
+      self.assertAllClose(p.numpy(), f.numpy())
+
+  def testConvertSlots(self):
+    parameters = [tf.Variable([1., 2.]), tf.Variable([[3.], [4.]])]
+    updates = [tf.constant([5., 5.]), tf.constant([[3.], [3.]])]
+    per_param = adam.Adam()
+    per_param.apply(updates, parameters)
+
+    flat = self.make_optimizer()
+    optimizer_utils.convert_slots(per_param, flat, parameters)
+    self.assertEqual(flat.step.numpy(), 1)
+    for f, p in zip(list(flat.m) + list(flat.v), per_param.m + per_param.v):
+      self.assertAllClose(p.numpy(), f.numpy())
+
+    round_trip = adam.Adam()
+    optimizer_utils.convert_slots(flat, round_trip, parameters)
+    for r, p in zip(round_trip.m + round_trip.v, per_param.m + per_param.v):
+      self.assertAllClose(p.numpy(), r.numpy())
+
+
 class ReferenceAdamTest(optimizer_tests.OptimizerTestBase):
 
   def make_optimizer(self, **kwargs):
@@ -0,0 +1,179 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Lazy Adaptive Moment Estimation (Adam) module."""
+
+from typing import Optional, Sequence, Union
+
+from sonnet.src import base
+from sonnet.src import once
+from sonnet.src import types
+from sonnet.src import utils
+from sonnet.src.optimizers import adam
+from sonnet.src.optimizers import optimizer_utils
+import tensorflow as tf
+
+
+def _expand_rows(t: tf.Tensor, rank: int) -> tf.Tensor:
+  """Reshapes a per-row tensor so it broadcasts against a rank `rank` tensor."""
+  if rank <= 1:
+    return t
+  return tf.reshape(t, tf.concat([tf.shape(t), [1] * (rank - 1)], axis=0))
+
+
+class LazyAdam(base.Optimizer):
+  """Adam optimizer with per-row step counts for sparse updates.
+
+  :class:`LazyAdam` applies the same update rule as :class:`Adam`, but instead
+  of a single global step count it keeps one step count per row (first axis) of
+  each parameter. Rows are only advanced when they receive an update, so for
+  `tf.IndexedSlices` updates (e.g. from :class:`~sonnet.Embed`) only the rows in
+  the batch are read and written and bias correction is applied using the
+  number of updates each row has actually received. Rarely touched rows are
+  therefore not under-corrected the way they would be with a global step.
+
+  For dense updates every row is advanced and the update is identical to
+  :class:`Adam`.
+
+  Attributes:
+    learning_rate: Step size (``alpha`` in the paper).
+    beta1: Exponential decay rate for first moment estimate.
+    beta2: Exponential decay rate for second moment estimate.
+    epsilon: Small value to avoid zero denominator.
+    unique_indices: `True` if sparse updates are assumed to have unique indices.
+    step: Number of times :meth:`apply` has been called.
+    m: Biased first moment estimate (a list with one value per parameter).
+    v: Biased second raw moment estimate (a list with one value per parameter).
+    row_step: Step count for each row (a list with one value per parameter).
+  """
+
+  def __init__(self,
+               learning_rate: Union[types.FloatLike, tf.Variable] = 0.001,
+               beta1: Union[types.FloatLike, tf.Variable] = 0.9,
+               beta2: Union[types.FloatLike, tf.Variable] = 0.999,
+               epsilon: Union[types.FloatLike, tf.Variable] = 1e-8,
+               unique_indices: bool = False,
+               name: Optional[str] = None):
+    """Constructs a `LazyAdam` module.
+
+    Args:
+      learning_rate: Step size (``alpha`` in the paper).
+      beta1: Exponential decay rate for first moment estimate.
+      beta2: Exponential decay rate for second moment estimate.
+      epsilon: Small value to avoid zero denominator.
+      unique_indices: If `True`, the indices of `tf.IndexedSlices` updates are
+        assumed to be unique and deduplication is skipped. Results are
+        undefined if this does not hold.
+      name: Name of the module.
+    """
+    super().__init__(name=name)
+    self.learning_rate = learning_rate
+    self.beta1 = beta1
+    self.beta2 = beta2
+    self.epsilon = epsilon
+    self.unique_indices = unique_indices
+    self.step = tf.Variable(0, trainable=False, name="t", dtype=tf.int64)
+    self.m = []
+    self.v = []
+    self.row_step = []
+
+  @once.once
+  def _initialize(self, parameters: Sequence[tf.Variable]):
+    """Moments and per-row step counts are initialized to zero."""
+    zero_var = lambda p: utils.variable_like(p, trainable=False)
+    with tf.name_scope("m"):
+      self.m.extend(zero_var(p) for p in parameters)
+    with tf.name_scope("v"):
+      self.v.extend(zero_var(p) for p in parameters)
+    with tf.name_scope("row_step"):
+      for p in parameters:
+        with tf.device(p.device):
+          self.row_step.append(
+              tf.Variable(tf.zeros(p.shape[:1], tf.int64), trainable=False,
+                          name=p.name.split(":")[0]))
+
+  def apply(self, updates: Sequence[types.ParameterUpdate],
+            parameters: Sequence[tf.Variable]):
+    r"""Applies updates to parameters.
+
+    Applies the Adam update rule for each update, parameter pair, where
+    :math:`t` is the number of updates each row of the parameter has received
+    (including this one):
+
+    .. math::
+
+       \begin{array}{ll}
+       m_t = \beta_1 \cdot m_{t-1} + (1 - \beta_1) \cdot update \\
+       v_t = \beta_2 \cdot v_{t-1} + (1 - \beta_2) \cdot update^2 \\
+       \hat{m}_t = m_t / (1 - \beta_1^t) \\
+       \hat{v}_t = v_t / (1 - \beta_2^t) \\
+       delta = \alpha \cdot \hat{m}_t / (\sqrt{\hat{v}_t} + \epsilon) \\
+       param_t = param_{t-1} - delta \\
+       \end{array}
+
+    Args:
+      updates: A list of updates to apply to parameters. Updates are often
+        gradients as returned by :tf:`GradientTape.gradient`.
+      parameters: A list of parameters.
+
+    Raises:
+      ValueError: If `updates` and `parameters` are empty, have different
+        lengths, or have inconsistent types.
+    """
+    optimizer_utils.check_distribution_strategy()
+    optimizer_utils.check_updates_parameters(updates, parameters)
+    self._initialize(parameters)
+    self.step.assign_add(1)
+    for update, param, m_var, v_var, t_var in zip(updates, parameters, self.m,
+                                                  self.v, self.row_step):
+      if update is None:
+        continue
+
+      optimizer_utils.check_same_dtype(update, param)
+      learning_rate = tf.cast(self.learning_rate, update.dtype)
+      beta_1 = tf.cast(self.beta1, update.dtype)
+      beta_2 = tf.cast(self.beta2, update.dtype)
+      epsilon = tf.cast(self.epsilon, update.dtype)
+
+      if isinstance(update, tf.IndexedSlices):
+        # Sparse read our state, only rows in the update are touched.
+        update, indices = optimizer_utils.deduplicate_indexed_slices(
+            update, assume_unique=self.unique_indices)
+        t = t_var.sparse_read(indices) + 1
+        m = m_var.sparse_read(indices)
+        v = v_var.sparse_read(indices)
+
+        # Compute and apply a sparse update to our parameter and state.
+        update, m, v = adam.adam_update(
+            g=update, alpha=learning_rate, beta_1=beta_1, beta_2=beta_2,
+            epsilon=epsilon, t=_expand_rows(tf.cast(t, update.dtype),
+                                            param.shape.rank),
+            m=m, v=v)
+        param.scatter_sub(tf.IndexedSlices(update, indices))
+        m_var.scatter_update(tf.IndexedSlices(m, indices))
+        v_var.scatter_update(tf.IndexedSlices(v, indices))
+        t_var.scatter_update(tf.IndexedSlices(t, indices))
+
+      else:
+        # Every row is updated.
+        t = t_var + 1
+        update, m, v = adam.adam_update(
+            g=update, alpha=learning_rate, beta_1=beta_1, beta_2=beta_2,
+            epsilon=epsilon, t=_expand_rows(tf.cast(t, update.dtype),
+                                            param.shape.rank),
+            m=m_var, v=v_var)
+        param.assign_sub(update)
+        m_var.assign(m)
+        v_var.assign(v)
+        t_var.assign(t)
@@ -0,0 +1,115 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.lazy_adam."""
+
+from sonnet.src.optimizers import adam
+from sonnet.src.optimizers import lazy_adam
+from sonnet.src.optimizers import optimizer_tests
+import tensorflow as tf
+
+
+class LazyAdamTest(optimizer_tests.OptimizerTestBase):
+
+  def make_optimizer(self, **kwargs):
+    if "learning_rate" not in kwargs:
+      kwargs["learning_rate"] = 0.001
+    return lazy_adam.LazyAdam(**kwargs)
+
+  def testDenseMatchesAdam(self):
+    parameters = [tf.Variable([[1., 2.], [3., 4.]]), tf.Variable(5.)]
+    adam_parameters = [tf.Variable([[1., 2.], [3., 4.]]), tf.Variable(5.)]
+    updates = [tf.constant([[5., -5.], [.5, 1.]]), tf.constant(3.)]
+    optimizer = self.make_optimizer(learning_rate=0.1)
+    adam_optimizer = adam.Adam(learning_rate=0.1)
+    for _ in range(3):
+      optimizer.apply(updates, parameters)
+      adam_optimizer.apply(updates, adam_parameters)
+      self.assertAllClose([p.numpy() for p in adam_parameters],
+                          [p.numpy() for p in parameters])
+    self.assertAllEqual([3, 3], optimizer.row_step[0].numpy())
+    self.assertEqual(3, optimizer.row_step[1].numpy())
+
+  def testSparse(self):
+    if self.primary_device in ("GPU", "TPU"):
+      self.skipTest("IndexedSlices not supported on {}.".format(
+          self.primary_device))
+
+    parameters = [tf.Variable([[1.], [2.], [3.]])]
+    optimizer = self.make_optimizer(learning_rate=0.001)
+
+    def update(row, value=0.1):
+      return [tf.IndexedSlices(tf.constant([[value]]), tf.constant([row]),
+                               tf.constant([3, 1]))]
+
+    # Row 0 is updated twice, row 2 once, row 1 never.
+    optimizer.apply(update(0), parameters)
+    optimizer.apply(update(0), parameters)
+    optimizer.apply(update(2), parameters)
+    self.assertAllEqual([2, 0, 1], optimizer.row_step[0].numpy())
+    self.assertEqual(3, optimizer.step.numpy())
+    # With per-row bias correction the first update of any row moves it by
+    # exactly the learning rate (like the first step of Adam).
+    self.assertAllClose([[0.998], [2.0], [2.999]], parameters[0].numpy())
+    # Untouched rows have no state.
+    self.assertAllEqual([0.], optimizer.m[0].numpy()[1])
+
+  def testSparseDuplicateIndices(self):
+    if self.primary_device in ("GPU", "TPU"):
+      self.skipTest("IndexedSlices not supported on {}.".format(
+          self.primary_device))
+
+    parameters = [tf.Variable([[1.], [2.]])]
+    updates = [
+        tf.IndexedSlices(
+            tf.constant([[0.1], [0.1]]), tf.constant([0, 0]),
+            tf.constant([2, 1]))
+    ]
+    optimizer = self.make_optimizer(learning_rate=0.001)
+    optimizer.apply(updates, parameters)
+    self.assertAllEqual([1, 0], optimizer.row_step[0].numpy())
+    self.assertAllClose([[0.999], [2.0]], parameters[0].numpy())
+    self.assertAllClose([[0.02], [0.]], optimizer.m[0].numpy())
+
+  def testSparseUniqueIndices(self):
+    if self.primary_device in ("GPU", "TPU"):
+      self.skipTest("IndexedSlices not supported on {}.".format(
+          self.primary_device))
+
+    def run(unique_indices):
+      parameters = [tf.Variable([[1.], [2.], [3.]])]
+      updates = [
+          tf.IndexedSlices(
+              tf.constant([[0.1], [0.3]]), tf.constant([2, 0]),
+              tf.constant([3, 1]))
+      ]
+      optimizer = self.make_optimizer(unique_indices=unique_indices)
+      for _ in range(2):
+        optimizer.apply(updates, parameters)
+      return parameters[0].numpy(), optimizer.m[0].numpy()
+
+    self.assertAllClose(run(unique_indices=False), run(unique_indices=True))
+
+  def testAuxVariablesColocatedWithOriginal(self):
+    optimizer = self.make_optimizer(learning_rate=0.001)
+    with tf.device("CPU:0"):
+      var = tf.Variable([1.0])
+    optimizer.apply([tf.constant([0.1])], [var])
+    self.assertEqual(optimizer.m[0].device, var.device)
+    self.assertEqual(optimizer.v[0].device, var.device)
+    self.assertEqual(optimizer.row_step[0].device, var.device)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -41,13 +41,18 @@ class Momentum(base.Optimizer):
     learning_rate: Learning rate.
     momentum: Momentum scalar.
     use_nesterov: `True` if using Nesterov momentum.
+    flat_slots: If `True` the accumulated momentum is stored in one flat buffer
+      per dtype (see :func:`~sonnet.optimizers.convert_slots`).
     accumulated_momentum: Accumulated momentum for each parameter.
   """
 
+  _STATE_NAMES = ("accumulated_momentum",)
+
   def __init__(self,
                learning_rate: Union[types.FloatLike, tf.Variable],
                momentum: Union[types.FloatLike, tf.Variable],
                use_nesterov: bool = False,
+               flat_slots: bool = False,
                name: Optional[str] = None):
     """Constructs a `Momentum` module.
 
@@ -55,16 +60,27 @@ class Momentum(base.Optimizer):
       learning_rate: Learning rate.
       momentum: Momentum scalar.
       use_nesterov: Whether to use Nesterov momentum.
+      flat_slots: If `True`, the accumulated momentum is stored in a single
+        flat variable per dtype rather than one variable per parameter, and
+        dense updates are applied as one vectorized op over this buffer.
+        Checkpoints are not compatible with the default layout, use
+        :func:`~sonnet.optimizers.convert_slots` to convert between the two.
       name: Name of the module.
     """
     super().__init__(name)
     self.learning_rate = learning_rate
     self.momentum = momentum  # TODO(petebu) Reconsider name.
     self.use_nesterov = use_nesterov
+    self.flat_slots = flat_slots
     self.accumulated_momentum = []  # TODO(petebu) Reconsider name.
 
   @once.once
   def _initialize(self, parameters):
+    if self.flat_slots:
+      self.accumulated_momentum = optimizer_utils.FlatSlots(
+          parameters, name="accumulated_momentum")
+      return
+
     with tf.name_scope("accumulated_momentum"):
       self.accumulated_momentum.extend(
           utils.variable_like(p, trainable=False) for p in parameters)
@@ -97,6 +113,12 @@ class Momentum(base.Optimizer):
     optimizer_utils.check_distribution_strategy()
     optimizer_utils.check_updates_parameters(updates, parameters)
     self._initialize(parameters)
+    if self.flat_slots:
+      optimizer_utils.apply_with_flat_slots(
+          updates, parameters, [self.accumulated_momentum],
+          self._flat_update_fn)
+      return
+
     for update, param, momentum_var in zip(updates, parameters,
                                            self.accumulated_momentum):
       if update is None:
@@ -123,3 +145,13 @@ class Momentum(base.Optimizer):
                                            momentum_var, self.use_nesterov)
         momentum_var.assign(momentum)
         param.assign_sub(update)
+
+  def _flat_update_fn(self, dtype: tf.DType):
+    learning_rate = tf.cast(self.learning_rate, dtype)
+    mu = tf.cast(self.momentum, dtype)
+
+    def update_fn(update, momentum):
+      return momentum_update(update, learning_rate, mu, momentum,
+                             self.use_nesterov)
+
+    return update_fn
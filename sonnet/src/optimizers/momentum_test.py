@@ -191,6 +191,12 @@ class MomentumTest(optimizer_tests.OptimizerTestBase):
     self.assertEqual(optimizer.accumulated_momentum[0].device, var.device)
 
 
+class FlatSlotsMomentumTest(MomentumTest):
+
+  def make_optimizer(self, **kwargs):
+    return super().make_optimizer(flat_slots=True, **kwargs)
+
+
 class ReferenceMomentumTest(MomentumTest):
 
   def make_optimizer(self, **kwargs):
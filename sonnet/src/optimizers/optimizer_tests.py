@@ -122,9 +122,10 @@ class AbstractFuzzTest(test_utils.TestCase, parameterized.TestCase):
   def _make_snt(self, learning_rate, momentum, use_nesterov):
     raise NotImplementedError()
 
-  def assertParametersRemainClose(self, seed, config, num_steps=100, atol=1e-4):
+  def assertParametersRemainClose(self, seed, config, num_steps=100, atol=1e-4,
+                                  snt_kwargs=None):
     tf_opt = self._make_tf(**config)
-    snt_opt = self._make_snt(**config)
+    snt_opt = self._make_snt(**config, **(snt_kwargs or {}))
 
     # TODO(tomhennigan) Add sparse data.
     data = _generate_dense_data(seed, num_steps)
@@ -14,8 +14,10 @@
 # ============================================================================
 """Utils for Sonnet optimizers."""
 
-from typing import Sequence
+import collections
+from typing import Callable, List, Optional, Sequence, Tuple
 
+from sonnet.src import base
 from sonnet.src import types
 from sonnet.src.distribute import replicator
 import tensorflow as tf
@@ -58,11 +60,38 @@ def check_same_dtype(update: types.ParameterUpdate, parameter: tf.Variable):
             update, parameter))
 
 
-def deduplicate_indexed_slices(indexed_slice: tf.IndexedSlices):
+def _unsorted_deduplicate(values, indices):
+  unique_indices, new_index_positions = tf.unique(indices)
+  summed_values = tf.math.unsorted_segment_sum(values, new_index_positions,
+                                               tf.shape(unique_indices)[0])
+  return summed_values, unique_indices
+
+
+def _sorted_deduplicate(values, indices):
+  is_new = tf.concat(
+      [tf.ones_like(indices[:1], tf.bool), indices[1:] != indices[:-1]], axis=0)
+  segment_ids = tf.cumsum(tf.cast(is_new, tf.int32)) - 1
+  summed_values = tf.math.segment_sum(values, segment_ids)
+  return summed_values, tf.boolean_mask(indices, is_new)
+
+
+def deduplicate_indexed_slices(indexed_slice: tf.IndexedSlices,
+                               assume_unique: bool = False,
+                               assume_sorted: Optional[bool] = None):
   """Sums `values` associated with any non-unique `indices`.
 
+  When `indices` are sorted (as is common for embedding gradients) duplicates
+  are adjacent, so they are summed with a linear `tf.math.segment_sum` rather
+  than a hash based `tf.unique` followed by `tf.math.unsorted_segment_sum`.
+  Both paths return `unique_indices` in order of first appearance.
+
   Args:
     indexed_slice: An indexed slice with potentially duplicated indices.
+    assume_unique: If `True` the caller guarantees that `indices` are already
+      unique and `values` and `indices` are returned unchanged.
+    assume_sorted: If `True` the caller guarantees that `indices` are sorted
+      in ascending order. If `False` indices are treated as unsorted. If `None`
+      (the default) whether `indices` are sorted is checked at runtime.
 
   Returns:
     A tuple of (`summed_values`, `unique_indices`) where `unique_indices` is a
@@ -70,7 +99,262 @@ def deduplicate_indexed_slices(indexed_slice: tf.IndexedSlices):
     `values` slices associated with each unique index.
   """
   values, indices = indexed_slice.values, indexed_slice.indices
-  unique_indices, new_index_positions = tf.unique(indices)
-  summed_values = tf.math.unsorted_segment_sum(values, new_index_positions,
-                                               tf.shape(unique_indices)[0])
-  return summed_values, unique_indices
+  if assume_unique:
+    return values, indices
+  if assume_sorted:
+    return _sorted_deduplicate(values, indices)
+  if assume_sorted is None:
+    is_sorted = tf.reduce_all(indices[1:] >= indices[:-1])
+    return tf.cond(is_sorted,
+                   lambda: _sorted_deduplicate(values, indices),
+                   lambda: _unsorted_deduplicate(values, indices))
+  return _unsorted_deduplicate(values, indices)
+
+
+def flatten_and_concat(tensors: Sequence[tf.Tensor]) -> tf.Tensor:
+  """Flattens each tensor and concatenates them into a single rank 1 tensor."""
+  if len(tensors) == 1:
+    return tf.reshape(tensors[0], [-1])
+  return tf.concat([tf.reshape(t, [-1]) for t in tensors], axis=0)
+
+
+def split_and_reshape(flat: tf.Tensor,
+                      like: Sequence[tf.Variable]) -> List[tf.Tensor]:
+  """Inverse of `flatten_and_concat`, splits `flat` into tensors shaped `like`.
+
+  Args:
+    flat: A rank 1 tensor as returned by :func:`flatten_and_concat`.
+    like: A sequence of tensors or variables with fully defined shapes whose
+      sizes sum to the size of `flat`.
+
+  Returns:
+    A list with one tensor per element of `like`, with the same shape as that
+    element.
+  """
+  if len(like) == 1:
+    return [tf.reshape(flat, like[0].shape)]
+  sizes = [x.shape.num_elements() for x in like]
+  return [tf.reshape(t, x.shape) for t, x in zip(tf.split(flat, sizes), like)]
+
+
+class FlatSlots(base.Module):
+  """Optimizer state for many parameters stored in one flat buffer per dtype.
+
+  Rather than creating one slot variable per parameter (e.g. via
+  :func:`~sonnet.src.utils.variable_like`), :class:`FlatSlots` creates a single
+  rank 1 variable for each distinct parameter dtype and stores the slot for
+  each parameter in a contiguous segment of it. Per-parameter views are
+  available by indexing:
+
+  >>> params = [tf.Variable(tf.ones([2, 3])), tf.Variable(tf.ones([4]))]
+  >>> slots = FlatSlots(params)
+  >>> len(slots.buffers)
+  1
+  >>> slots[0].shape
+  TensorShape([2, 3])
+
+  Attributes:
+    buffers: A list of flat variables, one per dtype in `parameters` (ordered by
+      first appearance).
+    groups: A list with one entry per buffer containing the indices of the
+      parameters stored in that buffer.
+  """
+
+  def __init__(self,
+               parameters: Sequence[tf.Variable],
+               name: Optional[str] = None):
+    """Constructs a `FlatSlots` module with all slots initialized to zero.
+
+    Args:
+      parameters: A list of parameters to create slots for. Each parameter must
+        have a fully defined shape.
+      name: Name of the module.
+    """
+    super().__init__(name=name)
+    dtype_groups = collections.OrderedDict()
+    for index, parameter in enumerate(parameters):
+      if not parameter.shape.is_fully_defined():
+        raise ValueError("FlatSlots requires parameters with fully defined "
+                         "shapes, got {!r}.".format(parameter))
+      dtype_groups.setdefault(parameter.dtype, []).append(index)
+
+    self.groups = list(dtype_groups.values())
+    self.buffers = []
+    self._locations = [None] * len(parameters)
+    self._shapes = [p.shape for p in parameters]
+    for buffer_index, group in enumerate(self.groups):
+      offset = 0
+      for index in group:
+        size = parameters[index].shape.num_elements()
+        self._locations[index] = (buffer_index, offset, size)
+        offset += size
+      first = parameters[group[0]]
+      with tf.device(first.device):
+        self.buffers.append(
+            tf.Variable(tf.zeros([offset], first.dtype), trainable=False,
+                        name="buffer_{}".format(first.dtype.name)))
+
+  def __len__(self) -> int:
+    return len(self._locations)
+
+  def __getitem__(self, index: int) -> tf.Tensor:
+    return self.read(index)
+
+  def __iter__(self):
+    return (self.read(i) for i in range(len(self)))
+
+  def read(self, index: int) -> tf.Tensor:
+    """Returns the slot value for the `index`-th parameter."""
+    buffer_index, offset, size = self._locations[index]
+    value = self.buffers[buffer_index][offset:offset + size]
+    return tf.reshape(value, self._shapes[index])
+
+  def assign(self, index: int, value: tf.Tensor):
+    """Sets the slot value for the `index`-th parameter."""
+    buffer_index, offset, size = self._locations[index]
+    self.buffers[buffer_index][offset:offset + size].assign(
+        tf.reshape(value, [size]))
+
+  def _element_indices(self, index: int, indices: tf.Tensor) -> tf.Tensor:
+    """Returns buffer positions of the given rows of the `index`-th slot."""
+    _, offset, size = self._locations[index]
+    row_size = size // max(self._shapes[index][0], 1)
+    indices = tf.cast(indices, tf.int64)
+    positions = (offset + indices[:, tf.newaxis] * row_size +
+                 tf.range(row_size, dtype=tf.int64)[tf.newaxis, :])
+    return tf.reshape(positions, [-1])
+
+  def sparse_read(self, index: int, indices: tf.Tensor) -> tf.Tensor:
+    """Gathers rows of the `index`-th slot (like `tf.Variable.sparse_read`)."""
+    buffer_index = self._locations[index][0]
+    value = self.buffers[buffer_index].sparse_read(
+        self._element_indices(index, indices))
+    return tf.reshape(
+        value, tf.concat([tf.shape(indices), self._shapes[index][1:]], 0))
+
+  def scatter_update(self, index: int, sparse_delta: tf.IndexedSlices):
+    """Updates rows of the `index`-th slot (like `tf.Variable.scatter_update`)."""
+    buffer_index = self._locations[index][0]
+    self.buffers[buffer_index].scatter_update(
+        tf.IndexedSlices(
+            tf.reshape(sparse_delta.values, [-1]),
+            self._element_indices(index, sparse_delta.indices)))
+
+
+def _copy_slots(source, destination):
+  if len(source) != len(destination):
+    raise ValueError(
+        "`source` and `destination` must have the same number of slots, got "
+        "{} and {}.".format(len(source), len(destination)))
+  for index, value in enumerate(source):
+    if isinstance(destination, FlatSlots):
+      destination.assign(index, value)
+    else:
+      destination[index].assign(value)
+
+
+def convert_slots(source: base.Optimizer,
+                  destination: base.Optimizer,
+                  parameters: Sequence[tf.Variable]):
+  """Copies optimizer state between per-parameter and flat slot storage.
+
+  Optimizers constructed with ``flat_slots=True`` store their state in
+  differently shaped variables to the default per-parameter layout, so their
+  checkpoints are not interchangeable. To move state between the two, restore
+  into an optimizer using the layout of the checkpoint and copy the state into
+  an optimizer using the other layout:
+
+  >>> params = [tf.Variable(tf.ones([2, 3])), tf.Variable(tf.ones([4]))]
+  >>> grads = [tf.ones([2, 3]), tf.ones([4])]
+  >>> per_parameter = snt.optimizers.Adam()
+  >>> per_parameter.apply(grads, params)
+  >>> flat = snt.optimizers.Adam(flat_slots=True)
+  >>> snt.optimizers.convert_slots(per_parameter, flat, params)
+  >>> len(flat.m.buffers)
+  1
+  >>> flat.m[1].shape
+  TensorShape([4])
+
+  Args:
+    source: An initialized optimizer to copy state from.
+    destination: An optimizer of the same type to copy state into. If it is not
+      yet initialized it is initialized for `parameters`.
+    parameters: The parameters `source` was applied to.
+
+  Raises:
+    ValueError: If `source` and `destination` are different types or hold
+      state for a different number of parameters.
+  """
+  if type(source) is not type(destination):  # pylint: disable=unidiomatic-typecheck
+    raise ValueError("Cannot convert slots from {} to {}.".format(
+        type(source).__name__, type(destination).__name__))
+  destination._initialize(parameters)  # pylint: disable=protected-access
+  for name in source._STATE_NAMES:  # pylint: disable=protected-access
+    source_state = getattr(source, name)
+    destination_state = getattr(destination, name)
+    if isinstance(source_state, tf.Variable):
+      destination_state.assign(source_state)
+    else:
+      _copy_slots(source_state, destination_state)
+
+
+UpdateFn = Callable[..., Tuple[tf.Tensor, ...]]
+
+
+def apply_with_flat_slots(updates: Sequence[types.ParameterUpdate],
+                          parameters: Sequence[tf.Variable],
+                          slots: Sequence[FlatSlots],
+                          make_update_fn: Callable[[tf.DType], UpdateFn]):
+  """Applies an optimizer update rule to parameters with `FlatSlots` state.
+
+  For each dtype, if every parameter of that dtype has a dense update the rule
+  is applied once to the concatenated updates and the whole flat slot buffers.
+  Otherwise (some updates are `None` or `tf.IndexedSlices`) the rule is applied
+  per parameter, using the segments of the flat buffers for that parameter.
+
+  Args:
+    updates: A list of updates to apply to parameters.
+    parameters: A list of parameters.
+    slots: A list of `FlatSlots` (all created from `parameters`).
+    make_update_fn: A function taking a dtype and returning an update rule for
+      that dtype. The update rule is called with the update followed by the
+      current value of each slot and must return the delta to subtract from
+      the parameter followed by the new value of each slot.
+  """
+  for buffer_index, group in enumerate(slots[0].groups):
+    group_updates = [updates[i] for i in group]
+    group_params = [parameters[i] for i in group]
+    present = [(i, u) for i, u in zip(group, group_updates) if u is not None]
+    if not present:
+      continue
+
+    for i, update in present:
+      check_same_dtype(update, parameters[i])
+    update_fn = make_update_fn(group_params[0].dtype)
+
+    if all(not isinstance(u, tf.IndexedSlices) and u is not None
+           for u in group_updates):
+      # Dense update for the whole buffer.
+      delta, *values = update_fn(
+          flatten_and_concat(group_updates),
+          *(s.buffers[buffer_index] for s in slots))
+      for slot, value in zip(slots, values):
+        slot.buffers[buffer_index].assign(value)
+      for param, param_delta in zip(group_params,
+                                    split_and_reshape(delta, group_params)):
+        param.assign_sub(param_delta)
+      continue
+
+    for i, update in present:
+      if isinstance(update, tf.IndexedSlices):
+        update, indices = deduplicate_indexed_slices(update)
+        delta, *values = update_fn(
+            update, *(s.sparse_read(i, indices) for s in slots))
+        for slot, value in zip(slots, values):
+          slot.scatter_update(i, tf.IndexedSlices(value, indices))
+        parameters[i].scatter_sub(tf.IndexedSlices(delta, indices))
+      else:
+        delta, *values = update_fn(update, *(s.read(i) for s in slots))
+        for slot, value in zip(slots, values):
+          slot.assign(i, value)
+        parameters[i].assign_sub(delta)
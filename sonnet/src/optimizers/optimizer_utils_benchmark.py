@@ -0,0 +1,93 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Benchmarks for sonnet.v2.src.optimizers.optimizer_utils.
+
+Run with:
+
+    python optimizer_utils_benchmark.py --benchmark_filter=.
+"""
+
+import itertools
+import time
+
+import numpy as np
+from sonnet.src.optimizers import optimizer_utils
+import tensorflow as tf
+
+VOCAB_SIZES = (1000, 100000, 10000000)
+# Fraction of lookups that hit an index already present in the batch.
+DUPLICATION_RATES = (0., 0.5, 0.9)
+NUM_LOOKUPS = 16384
+EMBED_DIM = 64
+
+
+def _make_indexed_slices(vocab_size, duplication_rate, sort, seed=0):
+  rng = np.random.RandomState(seed)
+  num_unique = max(1, int(NUM_LOOKUPS * (1. - duplication_rate)))
+  unique = rng.choice(vocab_size, size=min(num_unique, vocab_size),
+                      replace=False)
+  indices = rng.choice(unique, size=NUM_LOOKUPS)
+  indices[:len(unique)] = unique
+  if sort:
+    indices = np.sort(indices)
+  else:
+    rng.shuffle(indices)
+  values = rng.normal(size=(NUM_LOOKUPS, EMBED_DIM)).astype(np.float32)
+  return tf.IndexedSlices(tf.constant(values), tf.constant(indices))
+
+
+class DeduplicateIndexedSlicesBenchmark(tf.test.Benchmark):
+  """Compares `deduplicate_indexed_slices` for sorted and unsorted indices."""
+
+  def _run(self, name, fn, indexed_slice, iters=100):
+    fn = tf.function(fn)
+    fn(indexed_slice)  # Warmup and trace.
+    start = time.time()
+    for _ in range(iters):
+      values, _ = fn(indexed_slice)
+    values.numpy()
+    wall_time = (time.time() - start) / iters
+    self.report_benchmark(iters=iters, wall_time=wall_time, name=name)
+
+  def benchmark_deduplicate(self):
+    for vocab_size, duplication_rate in itertools.product(VOCAB_SIZES,
+                                                          DUPLICATION_RATES):
+      suffix = "vocab_{}_dup_{}".format(vocab_size, duplication_rate)
+      sorted_slice = _make_indexed_slices(vocab_size, duplication_rate,
+                                          sort=True)
+      unsorted_slice = _make_indexed_slices(vocab_size, duplication_rate,
+                                            sort=False)
+
+      # Baseline: hash based dedup regardless of order.
+      self._run(
+          "unique_" + suffix,
+          lambda s: optimizer_utils.deduplicate_indexed_slices(  # pylint: disable=g-long-lambda
+              s, assume_sorted=False),
+          sorted_slice)
+      # Sorted segment reduction, with and without the runtime check.
+      self._run(
+          "sorted_" + suffix,
+          lambda s: optimizer_utils.deduplicate_indexed_slices(  # pylint: disable=g-long-lambda
+              s, assume_sorted=True),
+          sorted_slice)
+      self._run("detect_sorted_" + suffix,
+                optimizer_utils.deduplicate_indexed_slices, sorted_slice)
+      # Cost of the runtime check when indices turn out to be unsorted.
+      self._run("detect_unsorted_" + suffix,
+                optimizer_utils.deduplicate_indexed_slices, unsorted_slice)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,76 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.optimizers.optimizer_utils."""
+
+from absl.testing import parameterized
+from sonnet.src import test_utils
+from sonnet.src.optimizers import optimizer_utils
+import tensorflow as tf
+
+
+class DeduplicateIndexedSlicesTest(test_utils.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(None, False, True)
+  def testSorted(self, assume_sorted):
+    indexed_slice = tf.IndexedSlices(
+        tf.constant([[1.], [2.], [3.], [4.], [5.]]),
+        tf.constant([0, 0, 3, 5, 5]))
+    values, indices = optimizer_utils.deduplicate_indexed_slices(
+        indexed_slice, assume_sorted=assume_sorted)
+    self.assertAllEqual([0, 3, 5], indices)
+    self.assertAllClose([[3.], [3.], [9.]], values)
+
+  @parameterized.parameters(None, False)
+  def testUnsorted(self, assume_sorted):
+    indexed_slice = tf.IndexedSlices(
+        tf.constant([[1.], [2.], [3.], [4.], [5.]]),
+        tf.constant([5, 0, 3, 0, 5]))
+    values, indices = optimizer_utils.deduplicate_indexed_slices(
+        indexed_slice, assume_sorted=assume_sorted)
+    self.assertAllEqual([5, 0, 3], indices)
+    self.assertAllClose([[6.], [6.], [3.]], values)
+
+  def testAssumeUnique(self):
+    indexed_slice = tf.IndexedSlices(
+        tf.constant([[1.], [2.]]), tf.constant([5, 0]))
+    values, indices = optimizer_utils.deduplicate_indexed_slices(
+        indexed_slice, assume_unique=True)
+    self.assertIs(indexed_slice.values, values)
+    self.assertIs(indexed_slice.indices, indices)
+
+  @parameterized.parameters(None, False, True)
+  def testEmpty(self, assume_sorted):
+    indexed_slice = tf.IndexedSlices(
+        tf.zeros([0, 2]), tf.zeros([0], tf.int64))
+    values, indices = optimizer_utils.deduplicate_indexed_slices(
+        indexed_slice, assume_sorted=assume_sorted)
+    self.assertEqual([0], indices.shape)
+    self.assertEqual([0, 2], values.shape)
+
+  @test_utils.combined_named_parameters(
+      (("sorted", [1, 1, 2, 7]), ("unsorted", [7, 1, 2, 1])),
+      test_utils.named_bools("autograph"))
+  def testTFFunction(self, indices, autograph):
+    indexed_slice = tf.IndexedSlices(
+        tf.ones([4, 3]), tf.constant(indices))
+    f = tf.function(optimizer_utils.deduplicate_indexed_slices,
+                    autograph=autograph)
+    values, unique_indices = f(indexed_slice)
+    self.assertAllEqual(sorted(set(indices)), sorted(unique_indices.numpy()))
+    self.assertAllClose(12., tf.reduce_sum(values))
+
+
+if __name__ == "__main__":
+  tf.test.main()
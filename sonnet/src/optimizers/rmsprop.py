@@ -68,14 +68,19 @@ class RMSProp(base.Optimizer):
     mom: Accumulated mom for each parameter.
     ms: Accumulated ms for each parameter.
     mg: Accumulated mg for each parameter.
+    flat_slots: If `True` `mom`, `ms` and `mg` are stored in one flat buffer
+      per dtype (see :func:`~sonnet.optimizers.convert_slots`).
   """
 
+  _STATE_NAMES = ("mom", "ms", "mg")
+
   def __init__(self,
                learning_rate: Union[types.FloatLike, tf.Variable],
                decay: Union[types.FloatLike, tf.Variable] = 0.9,
                momentum: Union[types.FloatLike, tf.Variable] = 0.0,
                epsilon: Union[types.FloatLike, tf.Variable] = 1e-10,
                centered: bool = False,
+               flat_slots: bool = False,
                name: Optional[str] = None):
     """Constructs an `RMSProp` module.
 
@@ -88,6 +93,11 @@ class RMSProp(base.Optimizer):
         the gradient; if False, by the uncentered second moment. Setting this to
         True may help with training, but is slightly more expensive in terms of
         computation and memory. Defaults to False.
+      flat_slots: If `True`, `mom`, `ms` and `mg` are each stored in a single
+        flat variable per dtype rather than one variable per parameter, and
+        dense updates are applied as one vectorized op over these buffers.
+        Checkpoints are not compatible with the default layout, use
+        :func:`~sonnet.optimizers.convert_slots` to convert between the two.
       name: Name for this module.
     """
     super().__init__(name)
@@ -96,12 +106,20 @@ class RMSProp(base.Optimizer):
     self.momentum = momentum
     self.epsilon = epsilon
     self.centered = centered
+    self.flat_slots = flat_slots
     self.mom = []
     self.ms = []
     self.mg = []
 
   @once.once
   def _initialize(self, parameters: Sequence[tf.Variable]):
+    if self.flat_slots:
+      self.mom = optimizer_utils.FlatSlots(parameters, name="momentum")
+      self.ms = optimizer_utils.FlatSlots(parameters, name="rms")
+      if self.centered:
+        self.mg = optimizer_utils.FlatSlots(parameters, name="mg")
+      return
+
     zero_var = lambda p: utils.variable_like(p, trainable=False)
     with tf.name_scope("momentum"):
       self.mom.extend(zero_var(p) for p in parameters)
@@ -127,6 +145,12 @@ class RMSProp(base.Optimizer):
     optimizer_utils.check_distribution_strategy()
     optimizer_utils.check_updates_parameters(updates, parameters)
     self._initialize(parameters)
+    if self.flat_slots:
+      slots = [self.mom, self.ms] + ([self.mg] if self.centered else [])
+      optimizer_utils.apply_with_flat_slots(updates, parameters, slots,
+                                            self._flat_update_fn)
+      return
+
     for update, parameter, mom_var, ms_var, mg_var in itertools.zip_longest(
         updates, parameters, self.mom, self.ms, self.mg):
       if update is None:
@@ -163,3 +187,16 @@ class RMSProp(base.Optimizer):
         ms_var.assign(ms)
         if self.centered:
           mg_var.assign(mg)
+
+  def _flat_update_fn(self, dtype: tf.DType):
+    learning_rate = tf.cast(self.learning_rate, dtype)
+    decay = tf.cast(self.decay, dtype)
+    mu = tf.cast(self.momentum, dtype)
+    epsilon = tf.cast(self.epsilon, dtype)
+
+    def update_fn(update, mom, ms, mg=None):
+      mom, ms, mg = rmsprop_update(update, decay, learning_rate, epsilon, mu,
+                                   mom, ms, mg)
+      return (mom, mom, ms) + ((mg,) if self.centered else ())
+
+    return update_fn
@@ -195,6 +195,12 @@ class RMSPropTest(optimizer_tests.OptimizerTestBase):
     self.assertEqual(optimizer.ms[0].device, var.device)
 
 
+class FlatSlotsRMSPropTest(RMSPropTest):
+
+  def make_optimizer(self, **kwargs):
+    return super().make_optimizer(flat_slots=True, **kwargs)
+
+
 class ReferenceRMSPropTest(RMSPropTest):
 
   def make_optimizer(self, **kwargs):
@@ -0,0 +1,273 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Parallel recurrent cores."""
+
+from typing import Optional
+
+from sonnet.src import initializers
+from sonnet.src import once
+from sonnet.src import recurrent
+from sonnet.src import types
+from sonnet.src import utils
+import tensorflow as tf
+
+
+class ParallelLSTM(recurrent.RNNCore):
+  """Parallel LSTM.
+
+  This is equivalent to ``num_cores`` separate :class:`~sonnet.LSTM` cores
+  applied in parallel to ``num_cores`` inputs. It takes an input of shape
+  ``[num_cores, batch_size, input_size]`` and a state of
+  :class:`~sonnet.LSTMState` with hidden and cell of shape
+  ``[num_cores, batch_size, hidden_size]`` and returns outputs of shape
+  ``[num_cores, batch_size, hidden_size]``.
+
+  The weights of all cores are stacked along a leading axis, so each step
+  runs a single batched matmul for the inputs and one for the hidden state
+  rather than two matmuls per core. See also ``ParallelLinears``.
+
+  Attributes:
+    input_to_hidden: Input-to-hidden weights of shape
+      ``[num_cores, input_size, 4 * hidden_size]``, see
+      :attr:`~sonnet.LSTM.input_to_hidden`.
+    hidden_to_hidden: Hidden-to-hidden weights of shape
+      ``[num_cores, hidden_size, 4 * hidden_size]``.
+    b: Biases of shape ``[num_cores, 1, 4 * hidden_size]``.
+  """
+
+  def __init__(self,
+               num_cores: int,
+               hidden_size: int,
+               w_i_init: Optional[initializers.Initializer] = None,
+               w_h_init: Optional[initializers.Initializer] = None,
+               b_init: Optional[initializers.Initializer] = None,
+               forget_bias: types.FloatLike = 1.0,
+               dtype: tf.DType = tf.float32,
+               name: Optional[str] = None):
+    """Constructs a `ParallelLSTM`.
+
+    Args:
+      num_cores: Number of independent LSTMs.
+      hidden_size: Hidden layer size of each LSTM.
+      w_i_init: Optional initializer for the input-to-hidden weights.
+        Defaults to :class:`~initializers.TruncatedNormal` with a standard
+        deviation of ``1 / sqrt(input_size)``.
+      w_h_init: Optional initializer for the hidden-to-hidden weights.
+        Defaults to :class:`~initializers.TruncatedNormal` with a standard
+        deviation of ``1 / sqrt(hidden_size)``.
+      b_init: Optional initializer for the biases. Defaults to
+        :class:`~initializers.Zeros`.
+      forget_bias: Optional float to add to the bias of the forget gate after
+        initialization.
+      dtype: Optional :tf:`DType` of the core's variables. Defaults to
+        ``tf.float32``.
+      name: Name of the module.
+    """
+    super().__init__(name)
+    self._num_cores = num_cores
+    self._hidden_size = hidden_size
+    self._w_i_init = w_i_init
+    self._w_h_init = w_h_init
+    self._b_init = b_init or initializers.Zeros()
+    self._forget_bias = forget_bias
+    self._dtype = dtype
+
+  def __call__(self, inputs, prev_state):
+    """See base class."""
+    self._initialize(inputs)
+
+    gates = tf.matmul(inputs, self._w_i)
+    gates += tf.matmul(prev_state.hidden, self._w_h)
+    gates += self.b
+
+    # i = input, f = forget, g = cell updates, o = output.
+    i, f, g, o = tf.split(gates, num_or_size_splits=4, axis=-1)
+    next_cell = tf.sigmoid(f) * prev_state.cell
+    next_cell += tf.sigmoid(i) * tf.tanh(g)
+    next_hidden = tf.sigmoid(o) * tf.tanh(next_cell)
+    return next_hidden, recurrent.LSTMState(hidden=next_hidden, cell=next_cell)
+
+  def initial_state(self, batch_size: int) -> recurrent.LSTMState:
+    """See base class."""
+    shape = [self._num_cores, batch_size, self._hidden_size]
+    return recurrent.LSTMState(
+        hidden=tf.zeros(shape, dtype=self._dtype),
+        cell=tf.zeros(shape, dtype=self._dtype))
+
+  @property
+  def input_to_hidden(self):
+    return self._w_i
+
+  @property
+  def hidden_to_hidden(self):
+    return self._w_h
+
+  @once.once
+  def _initialize(self, inputs):
+    input_size = _check_inputs(inputs, self._num_cores, self._dtype)
+    dtype = self._dtype
+
+    # Initialize each core's weights as for `LSTM`, see `_stacked_init`.
+    w_i_init = self._w_i_init or initializers.TruncatedNormal(
+        stddev=1.0 / tf.sqrt(tf.cast(input_size, dtype)))
+    w_h_init = self._w_h_init or initializers.TruncatedNormal(
+        stddev=1.0 / tf.sqrt(tf.constant(self._hidden_size, dtype=dtype)))
+    self._w_i = tf.Variable(
+        _stacked_init(w_i_init, self._num_cores,
+                      [input_size, 4 * self._hidden_size], dtype),
+        name="w_i")
+    self._w_h = tf.Variable(
+        _stacked_init(w_h_init, self._num_cores,
+                      [self._hidden_size, 4 * self._hidden_size], dtype),
+        name="w_h")
+
+    b = _stacked_init(self._b_init, self._num_cores, [4 * self._hidden_size],
+                      dtype)
+    b_i, b_f, b_g, b_o = tf.split(
+        tf.expand_dims(b, 1), num_or_size_splits=4, axis=-1)
+    b_f += self._forget_bias
+    self.b = tf.Variable(tf.concat([b_i, b_f, b_g, b_o], axis=-1), name="b")
+
+
+class ParallelGRU(recurrent.RNNCore):
+  """Parallel GRU.
+
+  This is equivalent to ``num_cores`` separate :class:`~sonnet.GRU` cores
+  applied in parallel to ``num_cores`` inputs. It takes an input of shape
+  ``[num_cores, batch_size, input_size]`` and a state of shape
+  ``[num_cores, batch_size, hidden_size]`` and returns outputs of shape
+  ``[num_cores, batch_size, hidden_size]``.
+
+  The weights of all cores are stacked along a leading axis, so each step
+  runs batched matmuls rather than separate matmuls per core. See also
+  ``ParallelLinears``.
+
+  Attributes:
+    input_to_hidden: Input-to-hidden weights of shape
+      ``[num_cores, input_size, 3 * hidden_size]``, see
+      :attr:`~sonnet.GRU.input_to_hidden`.
+    hidden_to_hidden: Hidden-to-hidden weights of shape
+      ``[num_cores, hidden_size, 3 * hidden_size]``.
+    b: Biases of shape ``[num_cores, 1, 3 * hidden_size]``.
+  """
+
+  def __init__(self,
+               num_cores: int,
+               hidden_size: int,
+               w_i_init: Optional[initializers.Initializer] = None,
+               w_h_init: Optional[initializers.Initializer] = None,
+               b_init: Optional[initializers.Initializer] = None,
+               dtype: tf.DType = tf.float32,
+               name: Optional[str] = None):
+    """Constructs a `ParallelGRU`.
+
+    Args:
+      num_cores: Number of independent GRUs.
+      hidden_size: Hidden layer size of each GRU.
+      w_i_init: Optional initializer for the input-to-hidden weights of each
+        core. Defaults to Glorot uniform initializer.
+      w_h_init: Optional initializer for the hidden-to-hidden weights of each
+        core. Defaults to Glorot uniform initializer.
+      b_init: Optional initializer for the biases. Defaults to
+        :class:`~initializers.Zeros`.
+      dtype: Optional :tf:`DType` of the core's variables. Defaults to
+        ``tf.float32``.
+      name: Name of the module.
+    """
+    super().__init__(name)
+    self._num_cores = num_cores
+    self._hidden_size = hidden_size
+    self._w_i_init = w_i_init
+    self._w_h_init = w_h_init
+    self._b_init = b_init or initializers.Zeros()
+    self._dtype = dtype
+
+  def __call__(self, inputs, prev_state):
+    """See base class."""
+    self._initialize(inputs)
+
+    gates_x = tf.matmul(inputs, self._w_i)
+    zr_idx = slice(2 * self._hidden_size)
+    zr_x = gates_x[..., zr_idx]
+    zr_h = tf.matmul(prev_state, self._w_h[..., zr_idx])
+    zr = zr_x + zr_h + self.b[..., zr_idx]
+    z, r = tf.split(tf.sigmoid(zr), num_or_size_splits=2, axis=-1)
+
+    a_idx = slice(2 * self._hidden_size, 3 * self._hidden_size)
+    a_x = gates_x[..., a_idx]
+    a_h = tf.matmul(r * prev_state, self._w_h[..., a_idx])
+    a = tf.tanh(a_x + a_h + self.b[..., a_idx])
+
+    next_state = (1 - z) * prev_state + z * a
+    return next_state, next_state
+
+  def initial_state(self, batch_size):
+    """See base class."""
+    return tf.zeros([self._num_cores, batch_size, self._hidden_size],
+                    dtype=self._dtype)
+
+  @property
+  def input_to_hidden(self):
+    return self._w_i
+
+  @property
+  def hidden_to_hidden(self):
+    return self._w_h
+
+  @once.once
+  def _initialize(self, inputs):
+    input_size = _check_inputs(inputs, self._num_cores, self._dtype)
+    dtype = self._dtype
+
+    # Initialize each core's weights as for `GRU`, see `_stacked_init`.
+    glorot_uniform = initializers.VarianceScaling(
+        mode="fan_avg", distribution="uniform")
+    self._w_i = tf.Variable(
+        _stacked_init(self._w_i_init or glorot_uniform, self._num_cores,
+                      [input_size, 3 * self._hidden_size], dtype),
+        name="w_i")
+    self._w_h = tf.Variable(
+        _stacked_init(self._w_h_init or glorot_uniform, self._num_cores,
+                      [self._hidden_size, 3 * self._hidden_size], dtype),
+        name="w_h")
+    self.b = tf.Variable(
+        self._b_init([self._num_cores, 1, 3 * self._hidden_size], dtype),
+        name="b")
+
+
+def _stacked_init(init, num_cores, shape, dtype):
+  """Stacks ``num_cores`` values of ``shape`` from ``init``.
+
+  Initializing each core separately keeps ``num_cores`` out of the fans of
+  e.g. :class:`~initializers.VarianceScaling`, such that each core is
+  initialized as the equivalent single core would be.
+  """
+  return tf.stack([init(shape, dtype) for _ in range(num_cores)])
+
+
+def _check_inputs(inputs, num_cores, expected_dtype):
+  """Checks inputs are ``[num_cores, batch_size, input_size]``."""
+  utils.assert_rank(inputs, 3)
+  if inputs.dtype is not expected_dtype:
+    raise TypeError("inputs must have dtype {!r}, got {!r}".format(
+        expected_dtype, inputs.dtype))
+  if inputs.shape[0] is not None and inputs.shape[0] != num_cores:
+    raise ValueError(
+        "inputs must have a leading dimension of num_cores={}, got shape "
+        "{}".format(num_cores, inputs.shape))
+  input_size = inputs.shape[2]
+  if input_size is None:  # Can happen inside an @tf.function.
+    raise ValueError("Input size must be specified at module build time.")
+  return input_size
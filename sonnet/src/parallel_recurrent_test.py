@@ -0,0 +1,136 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.parallel_recurrent."""
+
+from absl.testing import parameterized
+from sonnet.src import parallel_recurrent
+from sonnet.src import recurrent
+from sonnet.src import test_utils
+import tensorflow as tf
+import tree
+
+NUM_CORES = 3
+BATCH_SIZE = 2
+INPUT_SIZE = 5
+HIDDEN_SIZE = 4
+
+
+def _cores(core_cls):
+  if core_cls is parallel_recurrent.ParallelLSTM:
+    return core_cls(NUM_CORES, HIDDEN_SIZE), [
+        recurrent.LSTM(HIDDEN_SIZE) for _ in range(NUM_CORES)]
+  return core_cls(NUM_CORES, HIDDEN_SIZE), [
+      recurrent.GRU(HIDDEN_SIZE) for _ in range(NUM_CORES)]
+
+
+class ParallelRecurrentTest(test_utils.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(parallel_recurrent.ParallelLSTM,
+                            parallel_recurrent.ParallelGRU)
+  def test_output_size_correct(self, core_cls):
+    core = core_cls(NUM_CORES, HIDDEN_SIZE)
+    state = core.initial_state(BATCH_SIZE)
+    outputs, next_state = core(tf.ones([NUM_CORES, BATCH_SIZE, INPUT_SIZE]),
+                               state)
+    self.assertEqual(outputs.shape, [NUM_CORES, BATCH_SIZE, HIDDEN_SIZE])
+    tree.map_structure(lambda s, n: self.assertEqual(s.shape, n.shape), state,
+                       next_state)
+
+  @test_utils.combined_named_parameters(
+      (("LSTM", parallel_recurrent.ParallelLSTM),
+       ("GRU", parallel_recurrent.ParallelGRU)),
+      test_utils.named_bools("use_tf_function"))
+  def test_behaves_same_as_separate_cores(self, core_cls, use_tf_function):
+    parallel, cores = _cores(core_cls)
+    input_sequence = tf.random.normal([6, NUM_CORES, BATCH_SIZE, INPUT_SIZE])
+    initial_state = tree.map_structure(
+        lambda s: tf.random.normal(s.shape), parallel.initial_state(BATCH_SIZE))
+
+    parallel(input_sequence[0], initial_state)
+    for i, core in enumerate(cores):
+      core(input_sequence[0, i],
+           tree.map_structure(lambda s, i=i: s[i], initial_state))
+      for v, parallel_v in zip(
+          (core.input_to_hidden, core.hidden_to_hidden, core.b),
+          (parallel.input_to_hidden, parallel.hidden_to_hidden, parallel.b)):
+        v.assign(tf.reshape(parallel_v[i], v.shape))
+
+    def unroll(core, input_sequence, initial_state):
+      return recurrent.dynamic_unroll(core, input_sequence, initial_state)
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    output_sequence, final_state = unroll(parallel, input_sequence,
+                                          initial_state)
+    for i, core in enumerate(cores):
+      expected_output_sequence, expected_final_state = unroll(
+          core, input_sequence[:, i],
+          tree.map_structure(lambda s, i=i: s[i], initial_state))
+      self.assertAllClose(output_sequence[:, i], expected_output_sequence,
+                          atol=1e-5)
+      self.assertAllClose(
+          tree.map_structure(lambda s, i=i: s[i], final_state),
+          expected_final_state, atol=1e-5)
+
+  @parameterized.parameters((parallel_recurrent.ParallelLSTM, 4),
+                            (parallel_recurrent.ParallelGRU, 3))
+  def test_initializers_called_per_core(self, core_cls, num_gates):
+    shapes = []
+
+    def initializer(shape, dtype):
+      shapes.append(list(shape))
+      return tf.zeros(shape, dtype)
+
+    core = core_cls(NUM_CORES, HIDDEN_SIZE, w_i_init=initializer,
+                    w_h_init=initializer)
+    core(tf.ones([NUM_CORES, BATCH_SIZE, INPUT_SIZE]),
+         core.initial_state(BATCH_SIZE))
+    # Fan based initializers then match those of separate cores.
+    self.assertEqual(
+        shapes,
+        [[INPUT_SIZE, num_gates * HIDDEN_SIZE]] * NUM_CORES +
+        [[HIDDEN_SIZE, num_gates * HIDDEN_SIZE]] * NUM_CORES)
+
+  def test_lstm_forget_bias(self):
+    core = parallel_recurrent.ParallelLSTM(NUM_CORES, HIDDEN_SIZE,
+                                           forget_bias=2.)
+    core(tf.ones([NUM_CORES, BATCH_SIZE, INPUT_SIZE]),
+         core.initial_state(BATCH_SIZE))
+    expected = tf.concat([
+        tf.zeros([HIDDEN_SIZE]),
+        tf.fill([HIDDEN_SIZE], 2.),
+        tf.zeros([2 * HIDDEN_SIZE])], axis=0)
+    self.assertAllClose(core.b, tf.broadcast_to(expected, core.b.shape))
+
+  @parameterized.parameters(parallel_recurrent.ParallelLSTM,
+                            parallel_recurrent.ParallelGRU)
+  def test_num_cores_mismatch(self, core_cls):
+    core = core_cls(NUM_CORES, HIDDEN_SIZE)
+    with self.assertRaisesRegex(ValueError, "num_cores=3"):
+      core(tf.ones([NUM_CORES + 1, BATCH_SIZE, INPUT_SIZE]),
+           core.initial_state(BATCH_SIZE))
+
+  @parameterized.parameters(parallel_recurrent.ParallelLSTM,
+                            parallel_recurrent.ParallelGRU)
+  def test_dtype_mismatch(self, core_cls):
+    core = core_cls(NUM_CORES, HIDDEN_SIZE, dtype=tf.bfloat16)
+    with self.assertRaisesRegex(
+        TypeError, "inputs must have dtype tf.bfloat16, got tf.float32"):
+      core(tf.ones([NUM_CORES, BATCH_SIZE, INPUT_SIZE]),
+           core.initial_state(BATCH_SIZE))
+
+
+if __name__ == "__main__":
+  tf.test.main()
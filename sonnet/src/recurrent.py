@@ -17,10 +17,12 @@
 import abc
 import collections
 import functools
-from typing import Optional, Sequence, Tuple, Union
+import math
+from typing import Iterator, Optional, Sequence, Tuple, Union
 import uuid
 
 from sonnet.src import base
+from sonnet.src import batch_apply
 from sonnet.src import conv
 from sonnet.src import initializers
 from sonnet.src import linear
@@ -199,7 +201,8 @@ def static_unroll(
     core: RNNCore,
     input_sequence: types.TensorNest,  # time-major.
     initial_state: types.TensorNest,
-    sequence_length: Optional[types.IntegerLike] = None
+    sequence_length: Optional[types.IntegerLike] = None,
+    checkpoint_stride: Optional[int] = None
 ) -> Tuple[types.TensorNest, types.TensorNest]:
   """Performs a static unroll of an RNN.
 
@@ -237,6 +240,10 @@ def static_unroll(
     initial_state: An initial state of the given core.
     sequence_length: An optional tensor of shape ``[B]`` specifying the lengths
       of sequences within the (padded) batch.
+    checkpoint_stride: If given, enables gradient checkpointing: only the
+      state every ``checkpoint_stride`` steps is kept for the backward pass and
+      the core activations in between are recomputed during backprop. See
+      :func:`dynamic_unroll`.
 
   Returns:
     A tuple with two elements:
@@ -246,23 +253,52 @@ def static_unroll(
       * **final_state** - Core state at time step ``T``.
 
   Raises:
-    ValueError: If ``input_sequence`` is empty or its leading dimension is
-      not known statically.
+    ValueError: If ``input_sequence`` is empty or ragged, its leading dimension
+      is not known statically or if ``checkpoint_stride`` is not positive.
   """
+  if _is_ragged(input_sequence):
+    raise ValueError(
+        "static_unroll does not support ragged input_sequence, use "
+        "dynamic_unroll instead")
+
+  if checkpoint_stride is not None:
+    return _checkpointed_unroll(_static_unroll_window, core, input_sequence,
+                                initial_state, sequence_length,
+                                checkpoint_stride)
+
   num_steps, input_tas = _unstack_input_sequence(input_sequence)
   if not isinstance(num_steps, int):
     raise ValueError(
         "input_sequence must have a statically known number of time steps")
 
-  outputs = None
-  state = initial_state
+  output_sequence, _, final_state = _static_unroll_window(
+      core,
+      input_tas,
+      sequence_length,
+      start=0,
+      num_steps=num_steps,
+      prev_outputs=None,
+      prev_state=initial_state)
+  return output_sequence, final_state
+
+
+def _static_unroll_window(core, input_tas, sequence_length, start, num_steps,
+                          prev_outputs, prev_state):
+  """Statically unrolls ``core`` over ``num_steps`` steps from ``start``.
+
+  Returns:
+    A tuple of the output sequence for the window, the outputs of the last step
+    and the state after the last step.
+  """
+  outputs = prev_outputs
+  state = prev_state
   output_accs = None
   for t in range(num_steps):
     outputs, state = _rnn_step(
         core,
         input_tas,
         sequence_length,
-        t,
+        start + t,
         prev_outputs=outputs,
         prev_state=state)
     if t == 0:
@@ -273,7 +309,7 @@ def static_unroll(
 
   output_sequence = tree.map_structure(lambda acc: tf.stack(acc.data),
                                        output_accs)
-  return output_sequence, state
+  return output_sequence, outputs, state
 
 
 class _ListWrapper:
@@ -298,8 +334,11 @@ def dynamic_unroll(
     initial_state,
     sequence_length=None,
     parallel_iterations=1,
-    swap_memory=False):
-  """Performs a dynamic unroll of an RNN.
+    swap_memory=False,
+    checkpoint_stride=None,
+    length_aware=False,
+    compact_finished=False):
+  r"""Performs a dynamic unroll of an RNN.
 
       >>> core = snt.LSTM(hidden_size=16)
       >>> batch_size = 3
@@ -320,11 +359,31 @@ def dynamic_unroll(
   :tf:`function`. See :func:`static_unroll` for an unroll function which
   replaces a loop with its body repeated multiple times.
 
+  Variable length sequences can also be given as :tf:`RaggedTensor`\ s of
+  shape ``[B, (T), ...]`` (note that ragged sequences are batch-major), e.g.
+  built from packed values with :tf:`RaggedTensor.from_row_lengths`:
+
+      >>> input_sequence = tf.RaggedTensor.from_row_lengths(
+      ...     tf.random.uniform([6, 2]), row_lengths=[3, 1, 2])
+      >>> output_sequence, final_state = snt.dynamic_unroll(
+      ...     core,
+      ...     input_sequence,
+      ...     core.initial_state(batch_size))
+      >>> output_sequence.row_lengths()
+      <tf.Tensor: ... numpy=array([3, 1, 2])>
+
+  The core is then only called on the sequences which have not finished yet,
+  so the amount of computation is proportional to the total number of
+  elements rather than to ``B * max(T)``. The output sequence is ragged with
+  the same row lengths and the final state of each sequence is the state after
+  its last element.
+
   Args:
     core: An :class:`RNNCore` to unroll.
     input_sequence: An arbitrarily nested structure of tensors of shape
       ``[T, B, ...]`` where ``T`` is the number of time steps, and ``B`` is the
-      batch size.
+      batch size, or of :tf:`RaggedTensor`\ s of shape ``[B, (T), ...]`` with
+      the same row lengths.
     initial_state: initial state of the given core.
     sequence_length: An optional tensor of shape ``[B]`` specifying the lengths
       of sequences within the (padded) batch.
@@ -338,27 +397,351 @@ def dynamic_unroll(
       but needed for back prop from GPU to CPU. This allows training RNNs which
       would typically not fit on a single GPU, with very minimal (or no)
       performance penalty. Defaults to False.
+    checkpoint_stride: If given, enables gradient checkpointing (also known as
+      rematerialization). The unroll is split into windows of
+      ``checkpoint_stride`` steps and only the outputs and state at the start of
+      each window are kept for the backward pass. The activations within a
+      window are recomputed when computing gradients. This reduces the memory
+      needed for backprop from ``O(T)`` to ``O(T / checkpoint_stride +
+      checkpoint_stride)`` steps, at the cost of running the forward pass of
+      the core twice. ``T`` must be known statically. Defaults to None, i.e.
+      all activations are kept.
+    length_aware: If ``True`` and ``sequence_length`` is given, steps before
+      ``min(sequence_length)`` are run without masking the outputs and state
+      and the loop stops at ``max(sequence_length)`` rather than at ``T``.
+      The output sequence and final state are the same as for the default
+      unroll, but the core is not called for steps where every sequence in
+      the batch has finished. Can not be combined with ``checkpoint_stride``.
+      Defaults to False.
+    compact_finished: If ``True``, the batch is sorted by ``sequence_length``
+      and finished sequences are dropped from the inputs and state passed to
+      the core, so that each step only does work for the sequences which have
+      not yet finished. The core must support a varying batch size and the
+      leading dimension of non-scalar state tensors must be the batch
+      dimension. Requires ``length_aware``. Defaults to False.
 
   Returns:
     A tuple with two elements:
       * **output_sequence** - An arbitrarily nested structure of tensors
-        of shape ``[T, B, ...]``. Dimensions following the batch size could
-        be different from that of the ``input_sequence``.
+        of shape ``[T, B, ...]`` (or ``[B, (T), ...]`` for ragged inputs).
+        Dimensions following the batch size could be different from that of
+        the ``input_sequence``.
       * **final_state** - Core state at time step ``T``.
 
   Raises:
-    ValueError: If ``input_sequence`` is empty.
+    ValueError: If ``input_sequence`` is empty, if ``checkpoint_stride`` is
+      given and is not positive or ``T`` is not known statically, if
+      ``compact_finished`` is used without ``length_aware`` or if
+      ``sequence_length`` or ``checkpoint_stride`` are used with a ragged
+      ``input_sequence``.
+  """
+  if compact_finished and not length_aware:
+    raise ValueError("compact_finished requires length_aware=True")
+  if length_aware and checkpoint_stride is not None:
+    raise ValueError("length_aware can not be combined with checkpoint_stride")
+
+  if _is_ragged(input_sequence):
+    if sequence_length is not None or checkpoint_stride is not None:
+      raise ValueError(
+          "sequence_length and checkpoint_stride can not be used with ragged "
+          "input_sequence")
+    return _ragged_dynamic_unroll(
+        core,
+        input_sequence,
+        initial_state,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+
+  if length_aware and sequence_length is not None:
+    return _length_aware_dynamic_unroll(
+        core,
+        input_sequence,
+        initial_state,
+        sequence_length,
+        compact_finished=compact_finished,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+
+  if checkpoint_stride is not None:
+    window_fn = functools.partial(
+        _dynamic_unroll_window,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+    return _checkpointed_unroll(window_fn, core, input_sequence, initial_state,
+                                sequence_length, checkpoint_stride)
+
+  num_steps, input_tas = _unstack_input_sequence(input_sequence)
+  output_sequence, _, final_state = _dynamic_unroll_window(
+      core,
+      input_tas,
+      sequence_length,
+      start=0,
+      num_steps=num_steps,
+      prev_outputs=None,
+      prev_state=initial_state,
+      parallel_iterations=parallel_iterations,
+      swap_memory=swap_memory)
+  return output_sequence, final_state
+
+
+def chunked_dynamic_unroll(
+    core: RNNCore,
+    input_sequence: types.TensorNest,  # time-major.
+    initial_state: types.TensorNest,
+    chunk_size: int,
+    sequence_length: Optional[types.IntegerLike] = None,
+    stop_gradient: bool = True,
+    parallel_iterations: int = 1,
+    swap_memory: bool = False
+) -> Iterator[Tuple[types.TensorNest, types.TensorNest]]:
+  """Performs a dynamic unroll of an RNN one chunk of time steps at a time.
+
+      >>> core = snt.LSTM(hidden_size=16)
+      >>> batch_size = 3
+      >>> input_sequence = tf.random.uniform([10, batch_size, 2])
+      >>> chunks = snt.chunked_dynamic_unroll(
+      ...     core,
+      ...     input_sequence,
+      ...     core.initial_state(batch_size),
+      ...     chunk_size=4)
+      >>> [output_chunk.shape[0] for output_chunk, _ in chunks]
+      [4, 4, 2]
+
+  The input sequence is split along the time axis into windows of (at most)
+  ``chunk_size`` steps. Each window is unrolled as in :func:`dynamic_unroll`,
+  starting from the state at the end of the previous window, and its outputs
+  are yielded before the next window is computed. Concatenating the yielded
+  output chunks gives the same result as :func:`dynamic_unroll`.
+
+  The computation for each window only happens when the next element is
+  requested from the returned iterator, so this can be used for truncated
+  backpropagation through time, where the activations kept for backprop are
+  bounded by ``chunk_size`` rather than the full sequence length::
+
+      chunks = snt.chunked_dynamic_unroll(
+          core, input_sequence, initial_state, chunk_size=100)
+      for target_chunk in tf.split(targets, num_chunks):
+        with tf.GradientTape() as tape:
+          output_chunk, _ = next(chunks)
+          loss = loss_fn(output_chunk, target_chunk)
+        grads = tape.gradient(loss, core.trainable_variables)
+        optimizer.apply(grads, core.trainable_variables)
+
+  Args:
+    core: An :class:`RNNCore` to unroll.
+    input_sequence: An arbitrarily nested structure of tensors of shape
+      ``[T, B, ...]`` where ``T`` is the number of time steps, and ``B`` is the
+      batch size. ``T`` must be known statically.
+    initial_state: initial state of the given core.
+    chunk_size: Number of time steps in each chunk. The last chunk is shorter
+      if ``T`` is not divisible by ``chunk_size``.
+    sequence_length: An optional tensor of shape ``[B]`` specifying the lengths
+      of sequences within the (padded) batch.
+    stop_gradient: If ``True`` (the default), gradients do not flow through the
+      state (and outputs) carried between chunks, i.e. truncated
+      backpropagation through time.
+    parallel_iterations: See :func:`dynamic_unroll`.
+    swap_memory: See :func:`dynamic_unroll`.
+
+  Returns:
+    An iterator which yields a tuple with two elements for each chunk:
+      * **output_chunk** - An arbitrarily nested structure of tensors
+        of shape ``[chunk_size, B, ...]``.
+      * **state** - Core state at the end of the chunk. The state yielded for
+        the last chunk is the final state.
+
+  Raises:
+    ValueError: If ``input_sequence`` is empty, its leading dimension is not
+      known statically or if ``chunk_size`` is not positive. These are raised
+      when this function is called, not when the iterator is first advanced.
   """
+  if chunk_size < 1:
+    raise ValueError("chunk_size must be positive, got {}".format(chunk_size))
   num_steps, input_tas = _unstack_input_sequence(input_sequence)
+  if not isinstance(num_steps, int):
+    raise ValueError(
+        "input_sequence must have a statically known number of time steps")
+
+  return _chunked_dynamic_unroll(
+      core, input_tas, initial_state, chunk_size, num_steps, sequence_length,
+      stop_gradient, parallel_iterations, swap_memory)
+
+
+def _chunked_dynamic_unroll(core, input_tas, initial_state, chunk_size,
+                            num_steps, sequence_length, stop_gradient,
+                            parallel_iterations, swap_memory):
+  """Generator behind :func:`chunked_dynamic_unroll`, after validation."""
+  outputs = None
+  state = initial_state
+  for start in range(0, num_steps, chunk_size):
+    if start > 0 and stop_gradient:
+      outputs, state = tree.map_structure(tf.stop_gradient, (outputs, state))
+    output_chunk, outputs, state = _dynamic_unroll_window(
+        core,
+        input_tas,
+        sequence_length,
+        start=start,
+        num_steps=min(chunk_size, num_steps - start),
+        prev_outputs=outputs,
+        prev_state=state,
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory)
+    yield output_chunk, state
+
+
+@utils.smart_autograph
+def bidirectional_dynamic_unroll(
+    forward_core,
+    backward_core,
+    input_sequence,  # time-major.
+    initial_state_fw,
+    initial_state_bw,
+    sequence_length=None,
+    parallel_iterations=1,
+    swap_memory=False):
+  """Performs a dynamic unroll of an RNN in both directions.
+
+      >>> forward_core = snt.LSTM(hidden_size=16)
+      >>> backward_core = snt.LSTM(hidden_size=8)
+      >>> batch_size = 3
+      >>> input_sequence = tf.random.uniform([5, batch_size, 2])
+      >>> output_sequences, final_states = snt.bidirectional_dynamic_unroll(
+      ...     forward_core,
+      ...     backward_core,
+      ...     input_sequence,
+      ...     forward_core.initial_state(batch_size),
+      ...     backward_core.initial_state(batch_size),
+      ...     sequence_length=tf.constant([5, 2, 4]))
+      >>> output_fw, output_bw = output_sequences
+      >>> output_fw.shape, output_bw.shape
+      (TensorShape([5, 3, 16]), TensorShape([5, 3, 8]))
+
+  ``forward_core`` is unrolled over the input sequence as in
+  :func:`dynamic_unroll` and ``backward_core`` is unrolled over each sequence
+  in reverse, i.e. starting from its last element within ``sequence_length``::
+
+      state_fw = initial_state_fw
+      for t in range(len(input_sequence)):
+        output_fw[t], state_fw = forward_core(input_sequence[t], state_fw)
+
+      state_bw = initial_state_bw
+      for t in reversed(range(len(input_sequence))):
+        output_bw[t], state_bw = backward_core(input_sequence[t], state_bw)
+
+  Both directions run in the same loop, so the steps of the two cores are
+  independent and can run concurrently. The input sequence is unstacked only
+  once and read in both directions, so no reversed copy of it is made. The
+  outputs of both directions are aligned with the input, i.e. ``output_bw[t]``
+  is the output of ``backward_core`` for ``input_sequence[t]``.
+
+  Args:
+    forward_core: An :class:`RNNCore` to unroll forward in time.
+    backward_core: An :class:`RNNCore` to unroll backward in time.
+    input_sequence: An arbitrarily nested structure of tensors of shape
+      ``[T, B, ...]`` where ``T`` is the number of time steps, and ``B`` is the
+      batch size.
+    initial_state_fw: Initial state of ``forward_core``.
+    initial_state_bw: Initial state of ``backward_core``.
+    sequence_length: An optional tensor of shape ``[B]`` specifying the lengths
+      of sequences within the (padded) batch. Forward outputs after the end of
+      a sequence are as in :func:`dynamic_unroll`, backward outputs there are
+      zeros.
+    parallel_iterations: See :func:`dynamic_unroll`.
+    swap_memory: See :func:`dynamic_unroll`.
+
+  Returns:
+    A tuple with two elements:
+      * **output_sequences** - A tuple ``(output_fw, output_bw)`` of the
+        output sequences of the two cores, each an arbitrarily nested structure
+        of tensors of shape ``[T, B, ...]``.
+      * **final_states** - A tuple ``(final_state_fw, final_state_bw)``. The
+        final backward state is the state after the first time step.
+
+  Raises:
+    ValueError: If ``input_sequence`` is empty or ragged.
+  """
+  if _is_ragged(input_sequence):
+    raise ValueError(
+        "bidirectional_dynamic_unroll does not support ragged input_sequence")
+
+  # Every element is read once by each direction.
+  num_steps, input_tas = _unstack_input_sequence(
+      input_sequence, clear_after_read=False)
+  last_step = num_steps - 1
 
   # Unroll the first time step separately to infer outputs structure.
-  outputs, state = _rnn_step(
-      core,
+  outputs_fw, state_fw = _rnn_step(
+      forward_core,
       input_tas,
       sequence_length,
       t=0,
       prev_outputs=None,
-      prev_state=initial_state)
+      prev_state=initial_state_fw)
+  outputs_bw, state_bw = _rnn_step(
+      backward_core,
+      input_tas,
+      sequence_length,
+      t=last_step,
+      prev_outputs=None,
+      prev_state=initial_state_bw)
+  output_tas_fw = tree.map_structure(
+      lambda o: tf.TensorArray(o.dtype, num_steps).write(0, o), outputs_fw)
+  output_tas_bw = tree.map_structure(
+      lambda o: tf.TensorArray(o.dtype, num_steps).write(last_step, o),
+      outputs_bw)
+
+  # AutoGraph converts a for loop over `tf.range` to `tf.while_loop`.
+  # `maximum_iterations` are needed to backprop through the loop on TPU.
+  for t in tf.range(1, num_steps):
+    tf.autograph.experimental.set_loop_options(
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory,
+        maximum_iterations=num_steps - 1)
+    outputs_fw, state_fw = _rnn_step(
+        forward_core,
+        input_tas,
+        sequence_length,
+        t,
+        prev_outputs=outputs_fw,
+        prev_state=state_fw)
+    # Steps past the end of a sequence keep the initial state, so each
+    # sequence is effectively unrolled from its last element.
+    outputs_bw, state_bw = _rnn_step(
+        backward_core,
+        input_tas,
+        sequence_length,
+        last_step - t,
+        prev_outputs=None,
+        prev_state=state_bw)
+    output_tas_fw = tree.map_structure(
+        lambda ta, o, _t=t: ta.write(_t, o), output_tas_fw, outputs_fw)
+    output_tas_bw = tree.map_structure(
+        lambda ta, o, _t=last_step - t: ta.write(_t, o), output_tas_bw,
+        outputs_bw)
+
+  output_sequences = tree.map_structure(tf.TensorArray.stack,
+                                        (output_tas_fw, output_tas_bw))
+  return output_sequences, (state_fw, state_bw)
+
+
+@utils.smart_autograph
+def _dynamic_unroll_window(core, input_tas, sequence_length, start, num_steps,
+                           prev_outputs, prev_state, parallel_iterations,
+                           swap_memory):
+  """Unrolls ``core`` over ``num_steps`` steps of ``input_tas`` from ``start``.
+
+  Returns:
+    A tuple of the output sequence for the window, the outputs of the last step
+    and the state after the last step.
+  """
+  # Unroll the first time step separately to infer outputs structure.
+  outputs, state = _rnn_step(
+      core,
+      input_tas,
+      sequence_length,
+      t=start,
+      prev_outputs=prev_outputs,
+      prev_state=prev_state)
   output_tas = tree.map_structure(
       lambda o: tf.TensorArray(o.dtype, num_steps).write(0, o), outputs)
 
@@ -373,30 +756,385 @@ def dynamic_unroll(
         core,
         input_tas,
         sequence_length,
-        t,
+        start + t,
         prev_outputs=outputs,
         prev_state=state)
     output_tas = tree.map_structure(
         lambda ta, o, _t=t: ta.write(_t, o), output_tas, outputs)
 
   output_sequence = tree.map_structure(tf.TensorArray.stack, output_tas)
+  return output_sequence, outputs, state
+
+
+@utils.smart_autograph
+def _length_aware_dynamic_unroll(core, input_sequence, initial_state,
+                                 sequence_length, compact_finished,
+                                 parallel_iterations, swap_memory):
+  """Dynamically unrolls ``core`` skipping work for finished sequences.
+
+  The unroll is split into three phases:
+
+  1. ``[0, min(sequence_length))``: every sequence is active, so the outputs
+     and state are not masked.
+  2. ``[min(sequence_length), max(sequence_length))``: some sequences have
+     finished, their outputs and state are propagated as in
+     :func:`_rnn_step`. With ``compact_finished`` the batch is sorted by
+     decreasing length so that the active sequences are a prefix of the batch
+     and only that prefix is passed to the core.
+  3. ``[max(sequence_length), T)``: every sequence has finished, the last
+     outputs are repeated without calling the core.
+
+  Returns:
+    A tuple of the output sequence and the final state.
+  """
+  num_steps = _input_sequence_num_steps(input_sequence)
+  sequence_length = tf.convert_to_tensor(sequence_length)
+  max_len = tf.minimum(
+      tf.cast(tf.reduce_max(sequence_length), tf.int32), num_steps)
+  min_len = tf.minimum(tf.cast(tf.reduce_min(sequence_length), tf.int32),
+                       max_len)
+  # The first step is always unrolled (see below).
+  min_len = tf.maximum(min_len, 1)
+  max_len = tf.maximum(max_len, 1)
+
+  if compact_finished:
+    order = tf.argsort(sequence_length, direction="DESCENDING", stable=True)
+    sequence_length = tf.gather(sequence_length, order)
+    input_sequence = tree.map_structure(
+        lambda i: tf.gather(i, order, axis=1), input_sequence)
+    initial_state = tree.map_structure(
+        lambda s: _maybe_gather(s, order), initial_state)
+
+  _, input_tas = _unstack_input_sequence(input_sequence)
+
+  # Unroll the first time step separately to infer outputs structure.
+  outputs, state = _rnn_step(
+      core,
+      input_tas,
+      sequence_length,
+      t=0,
+      prev_outputs=None,
+      prev_state=initial_state)
+  output_tas = tree.map_structure(
+      lambda o: tf.TensorArray(o.dtype, num_steps).write(0, o), outputs)
+
+  for t in tf.range(1, min_len):
+    tf.autograph.experimental.set_loop_options(
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory,
+        maximum_iterations=num_steps - 1)
+    outputs, state = _rnn_step(
+        core,
+        input_tas,
+        sequence_length=None,
+        t=t,
+        prev_outputs=outputs,
+        prev_state=state)
+    output_tas = tree.map_structure(
+        lambda ta, o, _t=t: ta.write(_t, o), output_tas, outputs)
+
+  for t in tf.range(min_len, max_len):
+    tf.autograph.experimental.set_loop_options(
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory,
+        maximum_iterations=num_steps - 1)
+    if compact_finished:
+      outputs, state = _compact_rnn_step(
+          core,
+          input_tas,
+          sequence_length,
+          t,
+          prev_outputs=outputs,
+          prev_state=state)
+    else:
+      outputs, state = _rnn_step(
+          core,
+          input_tas,
+          sequence_length,
+          t,
+          prev_outputs=outputs,
+          prev_state=state)
+    output_tas = tree.map_structure(
+        lambda ta, o, _t=t: ta.write(_t, o), output_tas, outputs)
+
+  def finish(ta, o):
+    # Every sequence has finished, so the remaining outputs repeat the last.
+    padding = tf.tile(o[tf.newaxis],
+                      tf.concat([[num_steps - max_len],
+                                 tf.ones([o.shape.rank], tf.int32)], axis=0))
+    output_sequence = tf.concat([ta.gather(tf.range(max_len)), padding],
+                                axis=0)
+    if isinstance(num_steps, int):
+      output_sequence.set_shape(
+          tf.TensorShape([num_steps]).concatenate(o.shape))
+    return output_sequence
+
+  output_sequence = tree.map_structure(finish, output_tas, outputs)
+
+  if compact_finished:
+    inverse_order = tf.math.invert_permutation(order)
+    output_sequence = tree.map_structure(
+        lambda o: _maybe_gather(o, inverse_order, axis=1), output_sequence)
+    state = tree.map_structure(lambda s: _maybe_gather(s, inverse_order),
+                               state)
+
   return output_sequence, state
 
 
-def _unstack_input_sequence(input_sequence):
-  r"""Unstacks the input sequence into a nest of :tf:`TensorArray`\ s.
+def _maybe_gather(x, indices, axis=0):
+  """Gathers along the batch ``axis`` unless ``x`` has no batch dimension."""
+  return x if x.shape.rank <= axis else tf.gather(x, indices, axis=axis)
 
-  This allows to traverse the input sequence using :tf:`TensorArray.read`
-  instead of a slice, avoiding O(sliced tensor) slice gradient
-  computation during the backwards pass.
+
+def _compact_rnn_step(core, input_tas, sequence_length, t, prev_outputs,
+                      prev_state):
+  """Performs an RNN step for the active prefix of a length-sorted batch."""
+  num_active = tf.reduce_sum(
+      tf.cast(tf.cast(t, sequence_length.dtype) < sequence_length, tf.int32))
+  inputs = tree.map_structure(
+      lambda i: _take_prefix(num_active, i.read(t)), input_tas)
+  outputs, state = _prefix_rnn_step(core, inputs, num_active, prev_state)
+  outputs = tree.map_structure(
+      functools.partial(_merge_prefix, num_active), prev_outputs, outputs)
+  return outputs, state
+
+
+def _prefix_rnn_step(core, inputs, num_active, prev_state):
+  """Calls ``core`` on the first ``num_active`` rows of the batch.
 
   Args:
-    input_sequence: See :func:`dynamic_unroll` or :func:`static_unroll`.
+    core: An :class:`RNNCore`.
+    inputs: Inputs for the first ``num_active`` rows of the batch.
+    num_active: Number of active rows.
+    prev_state: State for the whole batch.
 
   Returns:
-    num_steps: Number of steps in the input sequence.
-    input_tas: An arbitrarily nested structure of :tf:`TensorArray`\ s of
-      size ``num_steps``.
+    A tuple of the outputs for the active rows and the state for the whole
+    batch. Rows after ``num_active`` keep their previous state.
+  """
+  outputs, state = core(
+      inputs,
+      tree.map_structure(functools.partial(_take_prefix, num_active),
+                         prev_state))
+  state = tree.map_structure(
+      functools.partial(_merge_prefix, num_active), prev_state, state)
+  return outputs, state
+
+
+def _take_prefix(num_active, x):
+  # Like `_safe_where`, scalars are not split along the batch.
+  return x if x.shape.rank == 0 else x[:num_active]
+
+
+def _merge_prefix(num_active, prev, x):
+  if x.shape.rank == 0:
+    return x
+  x = tf.concat([x, prev[num_active:]], axis=0)
+  x.set_shape(prev.shape)
+  return x
+
+
+def _is_ragged(input_sequence):
+  """Checks whether ``input_sequence`` is a nest of ragged tensors."""
+  ragged = [
+      isinstance(i, tf.RaggedTensor) for i in tree.flatten(input_sequence)
+  ]
+  if any(ragged) and not all(ragged):
+    raise ValueError(
+        "input_sequence tensors must either all be dense or all be ragged")
+  return any(ragged)
+
+
+@utils.smart_autograph
+def _ragged_dynamic_unroll(core, input_sequence, initial_state,
+                           parallel_iterations, swap_memory):
+  """Dynamically unrolls ``core`` over batch-major ragged sequences.
+
+  The sequences are sorted by decreasing length and packed time-major, so that
+  the sequences which are active at step ``t`` are a prefix of the batch and
+  the inputs for step ``t`` are a contiguous block of the packed values. Each
+  step only calls the core on the active sequences, and no padding is ever
+  materialized.
+
+  Returns:
+    A tuple of the (ragged) output sequence and the final state.
+  """
+  flat_input_sequence = tree.flatten(input_sequence)
+  for i in flat_input_sequence:
+    if i.ragged_rank != 1:
+      raise ValueError(
+          "input_sequence must have a single ragged (time) dimension, got "
+          "ragged_rank={}".format(i.ragged_rank))
+  row_splits = flat_input_sequence[0].row_splits
+  row_lengths = flat_input_sequence[0].row_lengths()
+
+  order = tf.argsort(row_lengths, direction="DESCENDING", stable=True)
+  sorted_lengths = tf.gather(row_lengths, order)
+  # At least one step is unrolled to infer the outputs structure.
+  num_steps = tf.maximum(tf.cast(tf.reduce_max(sorted_lengths), tf.int32), 1)
+  active = (tf.range(num_steps, dtype=row_lengths.dtype)[:, tf.newaxis] <
+            sorted_lengths[tf.newaxis])
+  batch_sizes = tf.reduce_sum(tf.cast(active, tf.int32), axis=1)
+  # Positions in the ragged values of the packed (time-major) values.
+  time_and_row = tf.where(active)
+  packed_indices = (tf.gather(row_splits, tf.gather(order, time_and_row[:, 1]))
+                    + tf.cast(time_and_row[:, 0], row_splits.dtype))
+
+  input_tas = tree.map_structure(
+      lambda i: tf.TensorArray(  # pylint: disable=g-long-lambda
+          i.dtype,
+          num_steps,
+          element_shape=tf.TensorShape([None]).concatenate(i.shape[2:]),
+          infer_shape=False).split(
+              tf.gather(i.values, packed_indices), batch_sizes),
+      input_sequence)
+  state = tree.map_structure(lambda s: _maybe_gather(s, order), initial_state)
+
+  # Unroll the first time step separately to infer outputs structure.
+  outputs, state = _prefix_rnn_step(
+      core, tree.map_structure(lambda ta: ta.read(0), input_tas),
+      batch_sizes[0], state)
+  output_tas = tree.map_structure(
+      lambda o: tf.TensorArray(  # pylint: disable=g-long-lambda
+          o.dtype,
+          num_steps,
+          element_shape=tf.TensorShape([None]).concatenate(o.shape[1:]),
+          infer_shape=False).write(0, o),
+      outputs)
+
+  for t in tf.range(1, num_steps):
+    tf.autograph.experimental.set_loop_options(
+        parallel_iterations=parallel_iterations,
+        swap_memory=swap_memory,
+        maximum_iterations=num_steps - 1)
+    step_outputs, state = _prefix_rnn_step(
+        core, tree.map_structure(lambda ta, _t=t: ta.read(_t), input_tas),
+        batch_sizes[t], state)
+    output_tas = tree.map_structure(
+        lambda ta, o, _t=t: ta.write(_t, o), output_tas, step_outputs)
+
+  unpack_indices = tf.math.invert_permutation(packed_indices)
+  output_sequence = tree.map_structure(
+      lambda ta: tf.RaggedTensor.from_row_splits(  # pylint: disable=g-long-lambda
+          tf.gather(ta.concat(), unpack_indices), row_splits, validate=False),
+      output_tas)
+  final_state = tree.map_structure(
+      lambda s: _maybe_gather(s, tf.math.invert_permutation(order)), state)
+  return output_sequence, final_state
+
+
+def _checkpointed_unroll(window_fn, core, input_sequence, initial_state,
+                         sequence_length, checkpoint_stride):
+  """Unrolls ``core`` recomputing activations in windows during backprop.
+
+  Args:
+    window_fn: Either :func:`_static_unroll_window` or
+      :func:`_dynamic_unroll_window`.
+    core: See :func:`dynamic_unroll`.
+    input_sequence: See :func:`dynamic_unroll`.
+    initial_state: See :func:`dynamic_unroll`.
+    sequence_length: See :func:`dynamic_unroll`.
+    checkpoint_stride: Number of time steps in each window.
+
+  Returns:
+    A tuple of the output sequence and the final state.
+
+  Raises:
+    ValueError: If the number of time steps is not known statically or if
+      ``checkpoint_stride`` is not positive.
+  """
+  if checkpoint_stride < 1:
+    raise ValueError("checkpoint_stride must be positive, got {}".format(
+        checkpoint_stride))
+  num_steps = _input_sequence_num_steps(input_sequence)
+  # Windows are unrolled in Python since `tf.recompute_grad` inside of a
+  # `tf.while_loop` cannot capture variables.
+  if not isinstance(num_steps, int):
+    raise ValueError(
+        "input_sequence must have a statically known number of time steps "
+        "when using checkpoint_stride")
+
+  lengths = [min(checkpoint_stride, num_steps - start)
+             for start in range(0, num_steps, checkpoint_stride)]
+  # The gradient of `tf.split` is a single concat, unlike slicing which
+  # would produce an O(input_sequence) gradient per window.
+  input_windows = tree.map_structure(
+      lambda i: _ListWrapper(tf.split(i, lengths)), input_sequence)
+
+  outputs = None
+  state = initial_state
+  output_windows = []
+  for w, start in enumerate(range(0, num_steps, checkpoint_stride)):
+    input_window = tree.map_structure(lambda i, _w=w: i.data[_w],
+                                      input_windows)
+    if w == 0:
+      # The first window is unrolled without checkpointing. It creates the
+      # variables of the core (if needed) and determines the outputs
+      # structure.
+      _, input_tas = _unstack_input_sequence(input_window)
+      output_window, outputs, state = window_fn(
+          core,
+          input_tas,
+          sequence_length,
+          start=0,
+          num_steps=lengths[0],
+          prev_outputs=None,
+          prev_state=state)
+    else:
+      output_window, outputs, state = _recompute_window(
+          window_fn,
+          core,
+          sequence_length,
+          start=start,
+          prev_outputs=outputs,
+          prev_state=state,
+          input_window=input_window)
+    output_windows.append(output_window)
+
+  output_sequence = tree.map_structure(lambda *o: tf.concat(o, axis=0),
+                                       *output_windows)
+  return output_sequence, state
+
+
+def _recompute_window(window_fn, core, sequence_length, start, prev_outputs,
+                      prev_state, input_window):
+  """Unrolls ``core`` over a window recomputing activations during backprop.
+
+  Only the arguments of the window (the outputs and state carried in and the
+  input window) are kept for the backward pass, the core is called again over
+  the window when gradients are computed.
+
+  Returns:
+    A tuple of the output sequence for the window, the outputs of the last step
+    and the state after the last step.
+  """
+  if sequence_length is not None:
+    # The window is unrolled from t=0, so lengths are shifted accordingly.
+    sequence_length = tf.convert_to_tensor(sequence_length)
+    sequence_length -= tf.cast(start, sequence_length.dtype)
+
+  args = (prev_outputs, prev_state, input_window)
+
+  @tf.recompute_grad
+  def unroll_window(*flat_args):
+    prev_outputs, prev_state, input_window = tree.unflatten_as(args, flat_args)
+    num_steps, input_tas = _unstack_input_sequence(input_window)
+    return tree.flatten(window_fn(
+        core,
+        input_tas,
+        sequence_length,
+        start=0,
+        num_steps=num_steps,
+        prev_outputs=prev_outputs,
+        prev_state=prev_state))
+
+  flat_results = unroll_window(*tree.flatten(args))
+  return tree.unflatten_as((prev_outputs, prev_outputs, prev_state),
+                           flat_results)
+
+
+def _input_sequence_num_steps(input_sequence):
+  """Returns the (static if possible) number of steps in ``input_sequence``.
 
   Raises:
     ValueError: If tensors in ``input_sequence`` have inconsistent number
@@ -418,9 +1156,35 @@ def _unstack_input_sequence(input_sequence):
     #   tf.debugging.assert_equal(
     #       tf.shape(i)[0], num_steps,
     #       "input_sequence tensors must have consistent number of time steps")
+  return num_steps
 
+
+def _unstack_input_sequence(input_sequence, clear_after_read=True):
+  r"""Unstacks the input sequence into a nest of :tf:`TensorArray`\ s.
+
+  This allows to traverse the input sequence using :tf:`TensorArray.read`
+  instead of a slice, avoiding O(sliced tensor) slice gradient
+  computation during the backwards pass.
+
+  Args:
+    input_sequence: See :func:`dynamic_unroll` or :func:`static_unroll`.
+    clear_after_read: See :tf:`TensorArray`. Must be ``False`` if an element
+      is read more than once.
+
+  Returns:
+    num_steps: Number of steps in the input sequence.
+    input_tas: An arbitrarily nested structure of :tf:`TensorArray`\ s of
+      size ``num_steps``.
+
+  Raises:
+    ValueError: If tensors in ``input_sequence`` have inconsistent number
+      of steps or the number of steps is 0.
+  """
+  num_steps = _input_sequence_num_steps(input_sequence)
   input_tas = tree.map_structure(
-      lambda i: tf.TensorArray(i.dtype, num_steps).unstack(i), input_sequence)
+      lambda i: tf.TensorArray(  # pylint: disable=g-long-lambda
+          i.dtype, num_steps, clear_after_read=clear_after_read).unstack(i),
+      input_sequence)
   return num_steps, input_tas
 
 
@@ -440,7 +1204,8 @@ def _rnn_step(core, input_tas, sequence_length, t, prev_outputs, prev_state):
       tree.map_structure(lambda i: i.read(t), input_tas), prev_state)
 
   if prev_outputs is None:
-    assert t == 0
+    # Either the first step, or a backward step in a bidirectional unroll
+    # which outputs zeros for the padding after a sequence.
     prev_outputs = tree.map_structure(tf.zeros_like, outputs)
 
   # TODO(slebedev): do not go into this block if t < min_len.
@@ -832,6 +1597,54 @@ class LSTM(RNNCore):
     return _lstm_fn(inputs, prev_state, self._w_i, self._w_h, self.b,
                     self.projection)
 
+  def precompute_inputs(self, input_sequence):
+    """Computes the input contribution to the gates for a whole sequence.
+
+    The input-to-hidden part of the gates does not depend on the state, so
+    instead of a small matrix multiplication per time step it can be computed
+    for all time steps at once before the unroll. Each step then only computes
+    the hidden-to-hidden part, see :meth:`call_precomputed`:
+
+        >>> core = snt.LSTM(hidden_size=16)
+        >>> batch_size = 3
+        >>> input_sequence = tf.random.uniform([10, batch_size, 2])
+        >>> output_sequence, final_state = snt.dynamic_unroll(
+        ...     core.call_precomputed,
+        ...     core.precompute_inputs(input_sequence),
+        ...     core.initial_state(batch_size))
+
+    This gives the same results as unrolling the core itself.
+
+    Args:
+      input_sequence: A tensor of shape ``[T, B, input_size]`` or a
+        :tf:`RaggedTensor` of shape ``[B, (T), input_size]``.
+
+    Returns:
+      ``input_sequence @ input_to_hidden + b``, a tensor of shape
+      ``[T, B, 4 * hidden_size]`` (or a :tf:`RaggedTensor` of shape
+      ``[B, (T), 4 * hidden_size]``).
+    """
+    if isinstance(input_sequence, tf.RaggedTensor):
+      self._initialize(input_sequence.flat_values)
+    else:
+      utils.assert_rank(input_sequence, 3)  # [num_steps, batch_size, ...].
+      self._initialize(input_sequence[0])
+    return _project_inputs(input_sequence, self._w_i, self.b)
+
+  def call_precomputed(self, precomputed_inputs, prev_state):
+    """Performs one step of the LSTM given precomputed inputs.
+
+    Args:
+      precomputed_inputs: A tensor of shape ``[B, 4 * hidden_size]``, a single
+        time step of the output of :meth:`precompute_inputs`.
+      prev_state: Previous state of the core.
+
+    Returns:
+      A tuple of outputs and the new state, as for :meth:`__call__`.
+    """
+    return _precomputed_lstm_fn(precomputed_inputs, prev_state, self._w_h,
+                                self.projection)
+
   def initial_state(self, batch_size: int) -> LSTMState:
     """See base class."""
     return LSTMState(
@@ -884,7 +1697,25 @@ def _lstm_fn(inputs, prev_state, w_i, w_h, b, projection=None):
   gates_x = tf.matmul(inputs, w_i)
   gates_h = tf.matmul(prev_state.hidden, w_h)
   gates = gates_x + gates_h + b
+  return _lstm_gates_fn(gates, prev_state, projection)
 
+
+def _precomputed_lstm_fn(gates_x, prev_state, w_h, projection=None):
+  """Compute one step of an LSTM given ``inputs @ w_i + b``."""
+  gates = gates_x + tf.matmul(prev_state.hidden, w_h)
+  return _lstm_gates_fn(gates, prev_state, projection)
+
+
+def _project_inputs(input_sequence, w_i, b):
+  """Computes ``input_sequence @ w_i + b`` for all time steps at once."""
+  if isinstance(input_sequence, tf.RaggedTensor):
+    return tf.ragged.map_flat_values(lambda x: tf.matmul(x, w_i) + b,
+                                     input_sequence)
+  return tf.tensordot(input_sequence, w_i, axes=1) + b
+
+
+def _lstm_gates_fn(gates, prev_state, projection):
+  """Compute the next LSTM state given the pre-activation gates."""
   # i = input, f = forget, g = cell updates, o = output.
   i, f, g, o = tf.split(gates, num_or_size_splits=4, axis=1)
 
@@ -913,6 +1744,9 @@ class UnrolledLSTM(UnrolledRNN):
                b_init: Optional[initializers.Initializer] = None,
                forget_bias: types.FloatLike = 1.0,
                dtype: tf.DType = tf.float32,
+               projection_size: Optional[int] = None,
+               projection_init: Optional[initializers.Initializer] = None,
+               jit_compile: bool = False,
                name: Optional[str] = None):
     """Construct an unrolled LSTM.
 
@@ -930,10 +1764,31 @@ class UnrolledLSTM(UnrolledRNN):
         initialization.
       dtype: Optional :tf:`DType` of the core's variables. Defaults to
         ``tf.float32``.
+      projection_size: Optional int; if set, then the hidden state is projected
+        to this size via a trainable projection matrix, see :class:`LSTM`.
+        Device-specialized kernels do not support projections, so the
+        unroll always uses a loop with the input-to-hidden projection
+        precomputed for the whole sequence.
+      projection_init: Optional initializer for the projection matrix.
+        Defaults to :class:`~initializers.TruncatedNormal` with a standard
+        deviation of ``1 / sqrt(hidden_size)``.
+      jit_compile: If ``True``, on CPU the unroll uses a loop with the
+        input-to-hidden projection precomputed for the whole sequence, compiled
+        with XLA. This is typically faster than the default CPU implementation
+        for small batch sizes (e.g. when serving). The backward pass recomputes
+        the forward pass. Other devices are not affected.
       name: Name of the module.
     """
     super().__init__(name)
     self._hidden_size = hidden_size
+    self._jit_compile = jit_compile
+    self._projection_size = projection_size
+    self._eff_hidden_size = self._projection_size or self._hidden_size
+    self._projection_init = projection_init
+    if projection_size is None and projection_init is not None:
+      raise ValueError(
+          "projection_init must be None when projection is not used")
+
     self._w_i_init = w_i_init
     self._w_h_init = w_h_init
     self._b_init = b_init or initializers.Zeros()
@@ -941,15 +1796,27 @@ class UnrolledLSTM(UnrolledRNN):
     self._dtype = dtype
 
   def __call__(self, input_sequence, initial_state):
-    """See base class."""
+    """See base class.
+
+    ``input_sequence`` can also be a :tf:`RaggedTensor` of shape
+    ``[B, (T), input_size]``, see :func:`dynamic_unroll`. In this case the
+    output sequence is ragged as well.
+    """
     self._initialize(input_sequence)
+    if (isinstance(input_sequence, tf.RaggedTensor) or
+        self.projection is not None):
+      return _fallback_unrolled_lstm(input_sequence, initial_state, self._w_i,
+                                     self._w_h, self.b, self.projection)
+    if self._jit_compile:
+      return _specialized_jit_unrolled_lstm(input_sequence, initial_state,
+                                            self._w_i, self._w_h, self.b)
     return _specialized_unrolled_lstm(input_sequence, initial_state, self._w_i,
                                       self._w_h, self.b)
 
   def initial_state(self, batch_size):
     """See base class."""
     return LSTMState(
-        hidden=tf.zeros([batch_size, self._hidden_size], dtype=self._dtype),
+        hidden=tf.zeros([batch_size, self._eff_hidden_size], dtype=self._dtype),
         cell=tf.zeros([batch_size, self._hidden_size], dtype=self._dtype))
 
   @property
@@ -969,17 +1836,29 @@ class UnrolledLSTM(UnrolledRNN):
     w_i_init = self._w_i_init or initializers.TruncatedNormal(
         stddev=1.0 / tf.sqrt(tf.cast(input_size, dtype)))
     w_h_init = self._w_h_init or initializers.TruncatedNormal(
-        stddev=1.0 / tf.sqrt(tf.constant(self._hidden_size, dtype=dtype)))
+        stddev=1.0 / tf.sqrt(tf.constant(self._eff_hidden_size, dtype=dtype)))
     self._w_i = tf.Variable(
         w_i_init([input_size, 4 * self._hidden_size], dtype), name="w_i")
     self._w_h = tf.Variable(
-        w_h_init([self._hidden_size, 4 * self._hidden_size], dtype), name="w_h")
+        w_h_init([self._eff_hidden_size, 4 * self._hidden_size], dtype),
+        name="w_h")
 
     b_i, b_f, b_g, b_o = tf.split(
         self._b_init([4 * self._hidden_size], dtype), num_or_size_splits=4)
     b_f += self._forget_bias
     self.b = tf.Variable(tf.concat([b_i, b_f, b_g, b_o], axis=0), name="b")
 
+    if self._projection_size is None:
+      self.projection = None
+    else:
+      projection_init = self._projection_init
+      if projection_init is None:
+        projection_init = initializers.TruncatedNormal(
+            stddev=1.0 / tf.sqrt(tf.constant(self._hidden_size, dtype=dtype)))
+      self.projection = tf.Variable(
+          projection_init([self._hidden_size, self._projection_size], dtype),
+          name="projection")
+
 
 # TODO(b/133740216): consider upstreaming into TensorFlow.
 def _specialize_per_device(api_name, specializations, default):
@@ -1042,11 +1921,118 @@ def _specialize_per_device(api_name, specializations, default):
   return wrapper
 
 
-def _fallback_unrolled_lstm(input_sequence, initial_state, w_i, w_h, b):
-  """Fallback version of :class:`UnrolledLSTM` which works on any device."""
+def _fallback_unrolled_lstm(input_sequence,
+                            initial_state,
+                            w_i,
+                            w_h,
+                            b,
+                            projection=None):
+  """Fallback version of :class:`UnrolledLSTM` which works on any device.
+
+  The input-to-hidden projection is computed for the whole sequence in a single
+  matrix multiplication, leaving only the hidden-to-hidden one in the loop.
+  """
+  # Distributed variables are captured (rather than passed as inputs) by
+  # `_specialize_per_device` in the order they are first read. The
+  # implementation selector requires all specializations to have the same
+  # signature, so read the weights in the same order as the other ones.
+  w_i, w_h, b = (tf.convert_to_tensor(w) for w in (w_i, w_h, b))
   return dynamic_unroll(
-      functools.partial(_lstm_fn, w_i=w_i, w_h=w_h, b=b), input_sequence,
-      initial_state)
+      functools.partial(_precomputed_lstm_fn, w_h=w_h, projection=projection),
+      _project_inputs(input_sequence, w_i, b), initial_state)
+
+
+def _hoisted_unrolled_lstm(input_sequence, initial_state, w_i, w_h, b):
+  """:class:`UnrolledLSTM` with a hoisted projection, compiled by XLA on CPU.
+
+  Unlike :func:`_block_unrolled_lstm`, which multiplies the concatenation of
+  the inputs and the hidden state by the concatenated weights at every step,
+  the input-to-hidden projection is computed for the whole sequence in a single
+  matrix multiplication. The time loop then only does the hidden-to-hidden
+  matrix multiplication and the gates, writing into a preallocated
+  :tf:`TensorArray`.
+
+  This is only used through :func:`_jit_unrolled_lstm`. Without XLA,
+  ``BlockLSTMV2`` was as fast or faster on every shape measured by
+  ``recurrent_benchmark.py``, so it remains the CPU specialization.
+  """
+  # See `_fallback_unrolled_lstm`.
+  w_i, w_h, b = (tf.convert_to_tensor(w) for w in (w_i, w_h, b))
+  hidden_size = w_h.shape[0]
+
+  def reorder_gates(w):
+    # [i, f, g, o] -> [i, f, o, g] so that a single sigmoid covers i, f and o.
+    i, f, g, o = tf.split(w, num_or_size_splits=4, axis=-1)
+    return tf.concat([i, f, o, g], axis=-1)
+
+  w_i, w_h, b = reorder_gates(w_i), reorder_gates(w_h), reorder_gates(b)
+  num_steps = tf.shape(input_sequence)[0]
+  gates_x = _project_inputs(input_sequence, w_i, b)
+  gates_x_ta = tf.TensorArray(
+      gates_x.dtype, size=num_steps,
+      element_shape=gates_x.shape[1:]).unstack(gates_x)
+  hidden_ta = tf.TensorArray(
+      initial_state.hidden.dtype,
+      size=num_steps,
+      element_shape=initial_state.hidden.shape)
+
+  def body(t, hidden, cell, hidden_ta):
+    gates = gates_x_ta.read(t) + tf.matmul(hidden, w_h)
+    ifo, g = tf.split(gates, [3 * hidden_size, hidden_size], axis=1)
+    i, f, o = tf.split(tf.sigmoid(ifo), num_or_size_splits=3, axis=1)
+    cell = f * cell + i * tf.tanh(g)
+    hidden = o * tf.tanh(cell)
+    return t + 1, hidden, cell, hidden_ta.write(t, hidden)
+
+  _, hidden, cell, hidden_ta = tf.while_loop(
+      lambda t, *_: t < num_steps,
+      body,
+      (0, initial_state.hidden, initial_state.cell, hidden_ta),
+      maximum_iterations=num_steps)
+  return hidden_ta.stack(), LSTMState(hidden, cell)
+
+
+@tf.function(jit_compile=True)
+def _jit_lstm_forward(input_sequence, hidden, cell, w_i, w_h, b):
+  output_sequence, final_state = _hoisted_unrolled_lstm(
+      input_sequence, LSTMState(hidden, cell), w_i, w_h, b)
+  return output_sequence, final_state.hidden, final_state.cell
+
+
+@tf.function(jit_compile=True)
+def _jit_lstm_backward(inputs, output_gradients):
+  with tf.GradientTape() as tape:
+    tape.watch(inputs)
+    outputs = _jit_lstm_forward.python_function(*inputs)
+  return tape.gradient(outputs, inputs, output_gradients=output_gradients)
+
+
+@tf.custom_gradient
+def _jit_lstm(input_sequence, hidden, cell, w_i, w_h, b):
+  """Runs the XLA compiled forward pass, recomputing it for the gradient."""
+  # XLA can not hand the loop's TensorArrays over to a TF gradient, so the
+  # forward pass is hidden from the tape and the backward pass is compiled
+  # separately, redoing the forward pass.
+  inputs = tuple(tf.stop_gradient(x)
+                 for x in (input_sequence, hidden, cell, w_i, w_h, b))
+  outputs = _jit_lstm_forward(*inputs)
+
+  def grad(*output_gradients):
+    output_gradients = [
+        tf.zeros_like(y) if dy is None else dy
+        for y, dy in zip(outputs, output_gradients)]
+    return _jit_lstm_backward(inputs, output_gradients)
+
+  return outputs, grad
+
+
+def _jit_unrolled_lstm(input_sequence, initial_state, w_i, w_h, b):
+  """XLA compiled variant of :func:`_hoisted_unrolled_lstm`."""
+  # See `_fallback_unrolled_lstm`.
+  w_i, w_h, b = (tf.convert_to_tensor(w) for w in (w_i, w_h, b))
+  output_sequence, hidden, cell = _jit_lstm(
+      input_sequence, initial_state.hidden, initial_state.cell, w_i, w_h, b)
+  return output_sequence, LSTMState(hidden, cell)
 
 
 def _block_unrolled_lstm(input_sequence, initial_state, w_i, w_h, b):
@@ -1107,6 +2093,12 @@ if hasattr(tf.raw_ops, "BlockLSTMV2"):
 _specialized_unrolled_lstm = _specialize_per_device(
     "snt_unrolled_lstm", specializations=_unrolled_lstm_impls, default="TPU")
 
+# Used by `UnrolledLSTM(jit_compile=True)`.
+_specialized_jit_unrolled_lstm = _specialize_per_device(
+    "snt_jit_unrolled_lstm",
+    specializations=dict(_unrolled_lstm_impls, CPU=_jit_unrolled_lstm),
+    default="TPU")
+
 
 class _RecurrentDropoutWrapper(RNNCore):
   """Recurrent dropout wrapper for a base RNN core.
@@ -1200,6 +2192,88 @@ def lstm_with_recurrent_dropout(hidden_size, dropout=0.5, seed=None, **kwargs):
   return _RecurrentDropoutWrapper(lstm, rate, seed), lstm
 
 
+class _SeparableConvND(base.Module):
+  """Depthwise separable ``SAME`` convolution without bias.
+
+  A depthwise convolution with ``kernel_shape`` followed by a ``1x1``
+  convolution to ``output_channels``.
+  """
+
+  def __init__(self,
+               num_spatial_dims: int,
+               output_channels: int,
+               kernel_shape: Union[int, Sequence[int]],
+               w_init: Optional[initializers.Initializer] = None,
+               data_format: Optional[str] = None,
+               name: Optional[str] = None):
+    super().__init__(name)
+    self._num_spatial_dims = num_spatial_dims
+    self._kernel_shape = utils.replicate(kernel_shape, num_spatial_dims,
+                                         "kernel_shape")
+    self._channel_index = utils.get_channel_index(data_format)
+    self._pointwise = conv.ConvND(
+        num_spatial_dims,
+        output_channels=output_channels,
+        kernel_shape=1,
+        with_bias=False,
+        w_init=w_init,
+        data_format=data_format,
+        name="pointwise")
+
+  @property
+  def w(self):
+    return self._pointwise.w
+
+  def __call__(self, inputs):
+    self._initialize(inputs)
+    channels_first = self._channel_index == 1
+    if channels_first:
+      inputs = tf.transpose(
+          inputs, [0] + list(range(2, self._num_spatial_dims + 2)) + [1])
+    outputs = _depthwise_conv(inputs, self.depthwise_w)
+    if channels_first:
+      outputs = tf.transpose(
+          outputs, [0, self._num_spatial_dims + 1] +
+          list(range(1, self._num_spatial_dims + 1)))
+    return self._pointwise(outputs)
+
+  @once.once
+  def _initialize(self, inputs):
+    input_channels = inputs.shape[self._channel_index]
+    if input_channels is None:
+      raise ValueError("The number of input channels must be known.")
+    # See `DepthwiseConv2D`.
+    w_init = initializers.TruncatedNormal(
+        stddev=1 / math.sqrt(math.prod(self._kernel_shape)))
+    self.depthwise_w = tf.Variable(
+        w_init(self._kernel_shape + (input_channels, 1), inputs.dtype),
+        name="depthwise_w")
+
+
+def _depthwise_conv(inputs, w):
+  """Channels last, ``SAME`` depthwise convolution with 1-3 spatial dims."""
+  num_spatial_dims = inputs.shape.rank - 2
+  conv2d = functools.partial(
+      tf.nn.depthwise_conv2d, strides=[1, 1, 1, 1], padding="SAME")
+  if num_spatial_dims == 1:
+    return conv2d(inputs[:, None], w[None])[:, 0]
+  elif num_spatial_dims == 2:
+    return conv2d(inputs, w)
+
+  # There is no 3D depthwise convolution on all devices, so sum 2D depthwise
+  # convolutions over the depth of the kernel.
+  depth = w.shape[0]
+  before = (depth - 1) // 2
+  padded = tf.pad(inputs, [[0, 0], [before, depth - 1 - before]] +
+                  [[0, 0]] * 3)
+  num_frames = inputs.shape[1] or tf.shape(inputs)[1]
+  outputs = 0
+  for i in range(depth):
+    frames = batch_apply.merge_leading_dims(padded[:, i:i + num_frames], 2)
+    outputs += conv2d(frames, w[i])
+  return batch_apply.split_leading_dim(outputs, inputs, 2)
+
+
 class _ConvNDLSTM(RNNCore):
   r"""``num_spatial_dims``-D convolutional LSTM.
 
@@ -1228,6 +2302,15 @@ class _ConvNDLSTM(RNNCore):
       ``forget_bias`` (defaults to 1.0) to :math:`b_f` after initialization
       in order to reduce the scale of forgetting in the beginning of
       the training.
+    Precomputed inputs:
+      The input-to-hidden convolution does not depend on the state, so it can
+      be computed for the whole sequence as a single batched convolution
+      before the unroll, see :meth:`precompute_inputs`.
+    Separable convolutions:
+      With ``separable=True`` each of :math:`W_{i\cdot}` and
+      :math:`W_{h\cdot}` is factorized into a depthwise convolution followed
+      by a ``1x1`` convolution to the gates, which needs far fewer
+      multiplications per step for large kernels or many channels.
 
   Attributes:
     input_to_hidden: Input-to-hidden convolution weights :math:`W_{ii}`,
@@ -1242,6 +2325,10 @@ class _ConvNDLSTM(RNNCore):
       times.
     b: Biases :math:`b_i`, :math:`b_f`, :math:`b_g` and :math:`b_o` concatenated
       into a tensor of shape ``[4 * output_channels]``.
+
+    With ``separable=True``, ``input_to_hidden`` and ``hidden_to_hidden`` are
+    the weights of the ``1x1`` convolutions, of shape ``[1*, input_channels, 4
+    * output_channels]``.
   """
 
   def __init__(self,
@@ -1255,6 +2342,7 @@ class _ConvNDLSTM(RNNCore):
                b_init: Optional[initializers.Initializer] = None,
                forget_bias: types.FloatLike = 1.0,
                dtype: tf.DType = tf.float32,
+               separable: bool = False,
                name: Optional[str] = None):
     """Constructs a convolutional LSTM.
 
@@ -1280,6 +2368,10 @@ class _ConvNDLSTM(RNNCore):
         initialization.
       dtype: Optional :tf:`DType` of the core's variables. Defaults to
         ``tf.float32``.
+      separable: If ``True``, the input-to-hidden and hidden-to-hidden
+        convolutions are depthwise separable: a depthwise convolution with
+        ``kernel_shape`` followed by a ``1x1`` convolution. ``w_i_init`` and
+        ``w_h_init`` then initialize the ``1x1`` convolutions.
       name: Name of the module.
     """
     super().__init__(name)
@@ -1292,24 +2384,27 @@ class _ConvNDLSTM(RNNCore):
     self._forget_bias = forget_bias
     self._dtype = dtype
 
-    self._input_to_hidden = conv.ConvND(
-        self._num_spatial_dims,
-        output_channels=4 * output_channels,
-        kernel_shape=kernel_shape,
-        padding="SAME",
-        with_bias=False,
-        w_init=w_i_init,
-        data_format=data_format,
-        name="input_to_hidden")
-    self._hidden_to_hidden = conv.ConvND(
-        self._num_spatial_dims,
-        output_channels=4 * output_channels,
-        kernel_shape=kernel_shape,
-        padding="SAME",
-        with_bias=False,
-        w_init=w_h_init,
-        data_format=data_format,
-        name="hidden_to_hidden")
+    def make_conv(w_init, name):
+      if separable:
+        return _SeparableConvND(
+            self._num_spatial_dims,
+            output_channels=4 * output_channels,
+            kernel_shape=kernel_shape,
+            w_init=w_init,
+            data_format=data_format,
+            name=name)
+      return conv.ConvND(
+          self._num_spatial_dims,
+          output_channels=4 * output_channels,
+          kernel_shape=kernel_shape,
+          padding="SAME",
+          with_bias=False,
+          w_init=w_init,
+          data_format=data_format,
+          name=name)
+
+    self._input_to_hidden = make_conv(w_i_init, name="input_to_hidden")
+    self._hidden_to_hidden = make_conv(w_h_init, name="hidden_to_hidden")
 
   def __call__(self, inputs, prev_state):
     """See base class."""
@@ -1318,7 +2413,47 @@ class _ConvNDLSTM(RNNCore):
     gates = self._input_to_hidden(inputs)
     gates += self._hidden_to_hidden(prev_state.hidden)
     gates += self.b
+    return self._gates_fn(gates, prev_state)
+
+  def precompute_inputs(self, input_sequence):
+    """Computes the input contribution to the gates for a whole sequence.
+
+    The input-to-hidden convolution does not depend on the state, so instead
+    of one convolution per time step it can be computed for all time steps as
+    a single convolution over a batch of ``T * B`` before the unroll. Each
+    step then only computes the hidden-to-hidden convolution, see
+    :meth:`call_precomputed`. This gives the same results as unrolling the core
+    itself.
+
+    Args:
+      input_sequence: A tensor of shape ``[T, B] + input_shape``.
+
+    Returns:
+      The input-to-hidden convolution of ``input_sequence`` plus ``b``, a
+      tensor of shape ``[T, B, spatial_dims*, 4 * output_channels]``.
+    """
+    utils.assert_rank(input_sequence, self._num_spatial_dims + 3)
+    self._initialize(input_sequence[0])
+    gates = self._input_to_hidden(
+        batch_apply.merge_leading_dims(input_sequence, num_dims=2))
+    gates += self.b
+    return batch_apply.split_leading_dim(gates, input_sequence, num_dims=2)
+
+  def call_precomputed(self, precomputed_inputs, prev_state):
+    """Performs one step of the LSTM given precomputed inputs.
+
+    Args:
+      precomputed_inputs: A single time step of the output of
+        :meth:`precompute_inputs`.
+      prev_state: Previous state of the core.
+
+    Returns:
+      A tuple of outputs and the new state, as for :meth:`__call__`.
+    """
+    gates = precomputed_inputs + self._hidden_to_hidden(prev_state.hidden)
+    return self._gates_fn(gates, prev_state)
 
+  def _gates_fn(self, gates, prev_state):
     # i = input, f = forget, g = cell updates, o = output.
     i, f, g, o = tf.split(
         gates, num_or_size_splits=4, axis=self._num_spatial_dims + 1)
@@ -1367,6 +2502,7 @@ class Conv1DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
                b_init: Optional[initializers.Initializer] = None,
                forget_bias: types.FloatLike = 1.0,
                dtype: tf.DType = tf.float32,
+               separable: bool = False,
                name: Optional[str] = None):
     """Constructs a 1-D convolutional LSTM.
 
@@ -1389,6 +2525,10 @@ class Conv1DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
         initialization.
       dtype: Optional :tf:`DType` of the core's variables. Defaults to
         ``tf.float32``.
+      separable: If ``True``, the input-to-hidden and hidden-to-hidden
+        convolutions are depthwise separable: a depthwise convolution with
+        ``kernel_shape`` followed by a ``1x1`` convolution. ``w_i_init`` and
+        ``w_h_init`` then initialize the ``1x1`` convolutions.
       name: Name of the module.
     """
     super().__init__(
@@ -1402,6 +2542,7 @@ class Conv1DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
         b_init=b_init,
         forget_bias=forget_bias,
         dtype=dtype,
+        separable=separable,
         name=name)
 
 
@@ -1418,6 +2559,7 @@ class Conv2DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
                b_init: Optional[initializers.Initializer] = None,
                forget_bias: types.FloatLike = 1.0,
                dtype: tf.DType = tf.float32,
+               separable: bool = False,
                name: Optional[str] = None):
     """Constructs a 2-D convolutional LSTM.
 
@@ -1440,6 +2582,10 @@ class Conv2DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
         initialization.
       dtype: Optional :tf:`DType` of the core's variables. Defaults to
         ``tf.float32``.
+      separable: If ``True``, the input-to-hidden and hidden-to-hidden
+        convolutions are depthwise separable: a depthwise convolution with
+        ``kernel_shape`` followed by a ``1x1`` convolution. ``w_i_init`` and
+        ``w_h_init`` then initialize the ``1x1`` convolutions.
       name: Name of the module.
     """
     super().__init__(
@@ -1453,6 +2599,7 @@ class Conv2DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
         b_init=b_init,
         forget_bias=forget_bias,
         dtype=dtype,
+        separable=separable,
         name=name)
 
 
@@ -1469,6 +2616,7 @@ class Conv3DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
                b_init: Optional[initializers.Initializer] = None,
                forget_bias: types.FloatLike = 1.0,
                dtype: tf.DType = tf.float32,
+               separable: bool = False,
                name: Optional[str] = None):
     """Constructs a 3-D convolutional LSTM.
 
@@ -1491,6 +2639,10 @@ class Conv3DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
         initialization.
       dtype: Optional :tf:`DType` of the core's variables. Defaults to
         ``tf.float32``.
+      separable: If ``True``, the input-to-hidden and hidden-to-hidden
+        convolutions are depthwise separable: a depthwise convolution with
+        ``kernel_shape`` followed by a ``1x1`` convolution. ``w_i_init`` and
+        ``w_h_init`` then initialize the ``1x1`` convolutions.
       name: Name of the module.
     """
     super().__init__(
@@ -1504,6 +2656,7 @@ class Conv3DLSTM(_ConvNDLSTM):  # pylint: disable=missing-docstring,empty-docstr
         b_init=b_init,
         forget_bias=forget_bias,
         dtype=dtype,
+        separable=separable,
         name=name)
 
 
@@ -0,0 +1,91 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Benchmarks for sonnet.v2.src.recurrent.
+
+Run with:
+
+    python recurrent_benchmark.py --benchmark_filter=.
+"""
+
+import itertools
+import time
+
+from sonnet.src import recurrent
+import tensorflow as tf
+
+BATCH_SIZES = (1, 32, 128)
+HIDDEN_SIZES = (64, 256)
+NUM_STEPS = (16, 128)
+INPUT_SIZE = 64
+
+
+def _unrolled_lstm_impls():
+  impls = {
+      "fallback": recurrent._fallback_unrolled_lstm,  # pylint: disable=protected-access
+      "hoisted": recurrent._hoisted_unrolled_lstm,  # pylint: disable=protected-access
+      "jit": recurrent._jit_unrolled_lstm,  # pylint: disable=protected-access
+  }
+  if hasattr(tf.raw_ops, "BlockLSTMV2"):
+    impls["block"] = recurrent._block_unrolled_lstm  # pylint: disable=protected-access
+  if tf.config.list_physical_devices("GPU"):
+    impls["cudnn"] = recurrent._cudnn_unrolled_lstm  # pylint: disable=protected-access
+  return impls
+
+
+class UnrolledLSTMBenchmark(tf.test.Benchmark):
+  """Compares the device specializations of `UnrolledLSTM`."""
+
+  def _run(self, name, fn, args, iters=20):
+    fn = tf.function(fn)
+    fn(*args)  # Warmup and trace.
+    start = time.time()
+    for _ in range(iters):
+      result = fn(*args)
+    tf.nest.map_structure(lambda t: t.numpy(), result)
+    wall_time = (time.time() - start) / iters
+    self.report_benchmark(iters=iters, wall_time=wall_time, name=name)
+
+  def benchmark_unrolled_lstm(self):
+    impls = _unrolled_lstm_impls()
+    for batch_size, hidden_size, num_steps in itertools.product(
+        BATCH_SIZES, HIDDEN_SIZES, NUM_STEPS):
+      suffix = "batch_{}_hidden_{}_steps_{}".format(batch_size, hidden_size,
+                                                    num_steps)
+      lstm = recurrent.UnrolledLSTM(hidden_size)
+      input_sequence = tf.random.uniform([num_steps, batch_size, INPUT_SIZE])
+      initial_state = lstm.initial_state(batch_size)
+      lstm._initialize(input_sequence)  # pylint: disable=protected-access
+      weights = (lstm.input_to_hidden, lstm.hidden_to_hidden, lstm.b)
+
+      for impl_name, impl in impls.items():
+        device = "GPU" if impl_name == "cudnn" else "CPU"
+
+        def forward(input_sequence, initial_state, impl=impl, device=device):
+          with tf.device("/device:{}:0".format(device)):
+            return impl(input_sequence, initial_state, *weights)
+
+        def forward_backward(input_sequence, initial_state, forward=forward):
+          with tf.GradientTape() as tape:
+            output_sequence, _ = forward(input_sequence, initial_state)
+          return tape.gradient(output_sequence, weights)
+
+        self._run("{}_forward_{}".format(impl_name, suffix), forward,
+                  (input_sequence, initial_state))
+        self._run("{}_forward_backward_{}".format(impl_name, suffix),
+                  forward_backward, (input_sequence, initial_state))
+
+
+if __name__ == "__main__":
+  tf.test.main()
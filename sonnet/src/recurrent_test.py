@@ -14,6 +14,7 @@
 # ============================================================================
 """Tests for sonnet.v2.src.recurrent."""
 
+import functools
 import itertools
 import unittest
 
@@ -221,6 +222,46 @@ class LSTMTest(test_utils.TestCase, parameterized.TestCase):
     for v in core.variables:
       self.assertAllClose(self.evaluate(v), self.evaluate(tf.ones_like(v)))
 
+  @parameterized.parameters(itertools.product([False, True], [None, 4]))
+  def testPrecomputedInputs(self, use_tf_function, projection_size):
+    num_steps = 5
+    core = recurrent.LSTM(self.hidden_size, projection_size=projection_size)
+    input_sequence = tf.random.uniform(
+        [num_steps, self.batch_size, self.input_size])
+    initial_state = core.initial_state(self.batch_size)
+
+    def unroll_precomputed(input_sequence):
+      return recurrent.dynamic_unroll(core.call_precomputed,
+                                      core.precompute_inputs(input_sequence),
+                                      initial_state)
+
+    if use_tf_function:
+      unroll_precomputed = tf.function(unroll_precomputed)
+
+    output_sequence, final_state = unroll_precomputed(input_sequence)
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state)
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    self.assertAllClose(final_state, expected_final_state)
+
+  def testPrecomputedRaggedInputs(self):
+    core = recurrent.LSTM(self.hidden_size)
+    input_sequence = tf.RaggedTensor.from_row_lengths(
+        tf.random.uniform([6, self.input_size]), [1, 3, 2])
+    precomputed_inputs = core.precompute_inputs(input_sequence)
+    self.assertIsInstance(precomputed_inputs, tf.RaggedTensor)
+    self.assertEqual(precomputed_inputs.shape.as_list(),
+                     [3, None, 4 * self.hidden_size])
+
+    initial_state = core.initial_state(3)
+    output_sequence, final_state = recurrent.dynamic_unroll(
+        core.call_precomputed, precomputed_inputs, initial_state)
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state)
+    self.assertAllClose(output_sequence.values,
+                        expected_output_sequence.values)
+    self.assertAllClose(final_state, expected_final_state)
+
   @parameterized.parameters([1e-6, 0.5, 1 - 1e-6])
   def testRecurrentDropout(self, rate):
     num_steps = 2
@@ -319,6 +360,83 @@ class UnrolledLSTMTest(test_utils.TestCase, parameterized.TestCase):
           initial_state)
       self.assertEqual(output_sequence.shape[0], num_steps)
 
+  @parameterized.parameters(itertools.product([1, 4], [True, False]))
+  def testJitCompile(self, num_steps, use_tf_function):
+    unrolled_lstm = recurrent.UnrolledLSTM(self.hidden_size, jit_compile=True)
+    initial_state = unrolled_lstm.initial_state(self.batch_size)
+
+    if use_tf_function:
+      # See testComputationAgainstLSTM.
+      @tf.function
+      def unrolled_lstm_fn(*args, **kwargs):
+        with tf.device("/device:{}:0".format(self.primary_device)):
+          return unrolled_lstm(*args, **kwargs)
+    else:
+      unrolled_lstm_fn = unrolled_lstm
+
+    input_sequence = tf.random.uniform(
+        [num_steps, self.batch_size, self.input_size])
+    with tf.GradientTape(persistent=True) as tape:
+      output_sequence, final_state = unrolled_lstm_fn(input_sequence,
+                                                      initial_state)
+      expected_output_sequence, expected_final_state = (
+          recurrent._fallback_unrolled_lstm(input_sequence, initial_state,
+                                            unrolled_lstm.input_to_hidden,
+                                            unrolled_lstm.hidden_to_hidden,
+                                            unrolled_lstm.b))
+    self.assertAllClose(output_sequence, expected_output_sequence, atol=1e-5)
+    self.assertAllClose(final_state, expected_final_state, atol=1e-5)
+    for grad, expected_grad in zip(
+        tape.gradient(output_sequence, unrolled_lstm.trainable_variables),
+        tape.gradient(expected_output_sequence,
+                      unrolled_lstm.trainable_variables)):
+      self.assertAllClose(grad, expected_grad, atol=1e-5)
+
+  @parameterized.parameters([True, False])
+  def testHoistedSpecialization(self, jit_compile):
+    unrolled_lstm = recurrent.UnrolledLSTM(self.hidden_size)
+    initial_state = unrolled_lstm.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([4, self.batch_size, self.input_size])
+    expected_output_sequence, expected_final_state = unrolled_lstm(
+        input_sequence, initial_state)
+
+    unrolled_lstm_fn = (
+        recurrent._jit_unrolled_lstm
+        if jit_compile else tf.function(recurrent._hoisted_unrolled_lstm))
+    output_sequence, final_state = unrolled_lstm_fn(
+        input_sequence, initial_state, unrolled_lstm.input_to_hidden,
+        unrolled_lstm.hidden_to_hidden, unrolled_lstm.b)
+    self.assertAllClose(output_sequence, expected_output_sequence, atol=1e-5)
+    self.assertAllClose(final_state, expected_final_state, atol=1e-5)
+
+  @parameterized.parameters([True, False])
+  def testProjection(self, use_tf_function):
+    num_steps = 4
+    projection_size = 4
+    unrolled_lstm = recurrent.UnrolledLSTM(
+        self.hidden_size, projection_size=projection_size)
+    initial_state = unrolled_lstm.initial_state(self.batch_size)
+    self.assertEqual(initial_state.hidden.shape,
+                     [self.batch_size, projection_size])
+
+    unrolled_lstm_fn = (
+        tf.function(unrolled_lstm) if use_tf_function else unrolled_lstm)
+    input_sequence = tf.random.uniform(
+        [num_steps, self.batch_size, self.input_size])
+    output_sequence, final_state = unrolled_lstm_fn(input_sequence,
+                                                    initial_state)
+
+    lstm = recurrent.LSTM(self.hidden_size, projection_size=projection_size)
+    lstm._initialize(input_sequence[0])
+    lstm._w_i = unrolled_lstm._w_i
+    lstm._w_h = unrolled_lstm._w_h
+    lstm.b = unrolled_lstm.b
+    lstm.projection = unrolled_lstm.projection
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        lstm, input_sequence, lstm.initial_state(self.batch_size))
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    self.assertAllClose(final_state, expected_final_state)
+
   def testDtypeMismatch(self):
     unrolled_lstm = recurrent.UnrolledLSTM(
         hidden_size=self.hidden_size, dtype=tf.bfloat16)
@@ -400,6 +518,72 @@ class ConvNDLSTMTest(test_utils.TestCase, parameterized.TestCase):
     self.assertAllClose(expected_hidden, next_state.hidden, atol=atol)
     self.assertAllClose(expected_cell, next_state.cell, atol=atol)
 
+  @parameterized.parameters(
+      itertools.product(
+          [False, True],
+          [recurrent.Conv1DLSTM, recurrent.Conv2DLSTM, recurrent.Conv3DLSTM],
+          [False, True]))
+  def testPrecomputedInputs(self, use_tf_function, core_cls, separable):
+    num_spatial_dims = self._num_spatial_dims(core_cls)
+    input_shape = ((self.input_size,) * num_spatial_dims +
+                   (self.input_channels,))
+    core = core_cls(input_shape, self.output_channels, kernel_shape=3,
+                    separable=separable)
+    input_sequence = tf.random.uniform((4, self.batch_size) + input_shape)
+    initial_state = core.initial_state(self.batch_size)
+
+    def unroll(core_fn, input_sequence):
+      return recurrent.dynamic_unroll(core_fn, input_sequence, initial_state)
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    output_sequence, final_state = unroll(core.call_precomputed,
+                                          core.precompute_inputs(input_sequence))
+    expected_output_sequence, expected_final_state = unroll(
+        core, input_sequence)
+    self.assertAllClose(output_sequence, expected_output_sequence, atol=1e-5)
+    self.assertAllClose(final_state, expected_final_state, atol=1e-5)
+
+  @parameterized.parameters(
+      itertools.product(
+          [recurrent.Conv1DLSTM, recurrent.Conv2DLSTM, recurrent.Conv3DLSTM],
+          [1, 2, 3]))
+  def testSeparable(self, core_cls, kernel_shape):
+    num_spatial_dims = self._num_spatial_dims(core_cls)
+    input_shape = ((self.batch_size,) + (self.input_size + 2,) *
+                   num_spatial_dims + (self.input_channels,))
+    inputs = tf.random.uniform(input_shape)
+    core = core_cls(input_shape[1:], self.output_channels,
+                    kernel_shape=kernel_shape, separable=True)
+    prev_state = tree.map_structure(
+        lambda s: tf.random.uniform(s.shape),
+        core.initial_state(self.batch_size))
+    _, next_state = core(inputs, prev_state)
+
+    def separable_conv(x, module):
+      # A depthwise convolution is a dense one with a block diagonal kernel.
+      depthwise_w = module.depthwise_w
+      w = depthwise_w * tf.eye(depthwise_w.shape[-2])
+      x = tf.nn.convolution(x, w, padding="SAME")
+      return tf.nn.convolution(x, module.w, padding="SAME")
+
+    # pylint: disable=protected-access
+    expected_core = functools.partial(
+        core._gates_fn,
+        separable_conv(inputs, core._input_to_hidden) +
+        separable_conv(prev_state.hidden, core._hidden_to_hidden) + core.b)
+    # pylint: enable=protected-access
+    _, expected_next_state = expected_core(prev_state)
+    self.assertAllClose(next_state, expected_next_state, atol=1e-5)
+    self.assertEqual(core.input_to_hidden.shape,
+                     (1,) * num_spatial_dims +
+                     (self.input_channels, 4 * self.output_channels))
+
+  def _num_spatial_dims(self, core_cls):
+    return {recurrent.Conv1DLSTM: 1,
+            recurrent.Conv2DLSTM: 2,
+            recurrent.Conv3DLSTM: 3}[core_cls]
+
   def testDtypeMismatch(self):
     num_spatial_dims = 1
     input_shape = ((self.batch_size,) + (self.input_size,) * num_spatial_dims +
@@ -898,5 +1082,546 @@ class UnknownStepsUnrollTest(test_utils.TestCase):
           tf.random.uniform([self.num_steps + 1, self.batch_size, 1]))
 
 
+
+class ChunkedDynamicUnrollTest(test_utils.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+
+    self.num_steps = 5
+    self.batch_size = 3
+    self.hidden_size = 2
+
+  def _concat_chunks(self, chunks):
+    output_chunks, states = zip(*chunks)
+    output_sequence = tree.map_structure(lambda *o: tf.concat(o, axis=0),
+                                         *output_chunks)
+    return output_sequence, states[-1]
+
+  @test_utils.combined_named_parameters(
+      (("chunk_size_1", 1), ("chunk_size_2", 2), ("chunk_size_5", 5),
+       ("chunk_size_7", 7)),
+      test_utils.named_bools("use_tf_function"))
+  def testMatchesDynamicUnroll(self, chunk_size, use_tf_function):
+    core = Counter(self.hidden_size)
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+
+    def unroll(input_sequence, initial_state):
+      return self._concat_chunks(
+          recurrent.chunked_dynamic_unroll(
+              core, input_sequence, initial_state, chunk_size=chunk_size))
+
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    output_sequence, final_state = unroll(input_sequence, initial_state)
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state)
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    self.assertAllClose(final_state, expected_final_state)
+
+  @parameterized.parameters(1, 2, 4)
+  def testVariableLength(self, chunk_size):
+    core = Counter(self.hidden_size)
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    sequence_length = tf.constant([0, 2, 5])
+
+    output_sequence, final_state = self._concat_chunks(
+        recurrent.chunked_dynamic_unroll(
+            core,
+            input_sequence,
+            initial_state,
+            chunk_size=chunk_size,
+            sequence_length=sequence_length))
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state, sequence_length=sequence_length)
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    self.assertAllClose(final_state, expected_final_state)
+
+  @parameterized.parameters(
+      lambda: recurrent.DeepRNN([recurrent.LSTM(4), recurrent.GRU(3)]),
+      lambda: recurrent.Conv2DLSTM(  # pylint: disable=g-long-lambda
+          input_shape=(2, 2, 1), output_channels=2, kernel_shape=2))
+  def testCores(self, core_fn):
+    core = core_fn()
+    initial_state = core.initial_state(self.batch_size)
+    if isinstance(core, recurrent.Conv2DLSTM):
+      input_shape = [self.num_steps, self.batch_size, 2, 2, 1]
+    else:
+      input_shape = [self.num_steps, self.batch_size, 1]
+    input_sequence = tf.random.uniform(input_shape)
+
+    output_sequence, final_state = self._concat_chunks(
+        recurrent.chunked_dynamic_unroll(
+            core, input_sequence, initial_state, chunk_size=2))
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state)
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    self.assertAllClose(final_state, expected_final_state)
+
+  @test_utils.combined_named_parameters(test_utils.named_bools("stop_gradient"))
+  def testStopGradient(self, stop_gradient):
+    core = recurrent.LSTM(self.hidden_size)
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+
+    with tf.GradientTape() as tape:
+      tape.watch(initial_state)
+      chunks = list(
+          recurrent.chunked_dynamic_unroll(
+              core,
+              input_sequence,
+              initial_state,
+              chunk_size=2,
+              stop_gradient=stop_gradient))
+      last_output_chunk, _ = chunks[-1]
+      loss = tf.reduce_sum(last_output_chunk)
+
+    grad = tape.gradient(loss, initial_state.hidden)
+    if stop_gradient:
+      self.assertIsNone(grad)
+    else:
+      self.assertNotAllClose(grad, tf.zeros_like(grad))
+
+  def testInvalidChunkSize(self):
+    core = Counter(self.hidden_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    # Raised when called, without advancing the iterator.
+    with self.assertRaisesRegex(ValueError, "chunk_size must be positive"):
+      recurrent.chunked_dynamic_unroll(
+          core, input_sequence, core.initial_state(self.batch_size),
+          chunk_size=0)
+
+  def testUnknownSteps(self):
+    core = Counter(self.hidden_size)
+
+    def do_unroll(input_sequence):
+      initial_state = core.initial_state(self.batch_size)
+      # Raised when called, without advancing the iterator.
+      recurrent.chunked_dynamic_unroll(
+          core, input_sequence, initial_state, chunk_size=2)
+
+    with self.assertRaisesRegex(
+        ValueError, "must have a statically known number of time steps"):
+      tf.function(do_unroll).get_concrete_function(
+          tf.TensorSpec([None, None, 1]))
+
+
+class CheckpointedUnrollTest(test_utils.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+
+    self.num_steps = 5
+    self.batch_size = 3
+    self.hidden_size = 2
+
+  @test_utils.combined_named_parameters(
+      (("dynamic_unroll", recurrent.dynamic_unroll),
+       ("static_unroll", recurrent.static_unroll)),
+      (("stride_1", 1), ("stride_2", 2), ("stride_5", 5), ("stride_7", 7)),
+      test_utils.named_bools("use_tf_function"))
+  def testMatchesUnroll(self, unroll_fn, checkpoint_stride, use_tf_function):
+    core = recurrent.LSTM(self.hidden_size)
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    sequence_length = tf.constant([0, 2, 5])
+
+    def unroll(input_sequence, **kwargs):
+      with tf.GradientTape() as tape:
+        tape.watch(input_sequence)
+        output_sequence, final_state = unroll_fn(
+            core, input_sequence, initial_state,
+            sequence_length=sequence_length, **kwargs)
+        loss = (tf.reduce_sum(tf.square(output_sequence)) +
+                tf.reduce_sum(final_state.cell))
+      grads = tape.gradient(loss,
+                            [input_sequence] + list(core.trainable_variables))
+      return output_sequence, final_state, grads
+
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    expected = unroll(input_sequence)
+    actual = unroll(input_sequence, checkpoint_stride=checkpoint_stride)
+    self.assertEqual(actual[0].shape, expected[0].shape)
+    self.assertAllClose(actual, expected)
+
+  def testRecomputesActivations(self):
+    num_calls = [0]
+
+    def core(inputs, prev_state):
+      num_calls[0] += 1
+      return inputs * prev_state, prev_state + inputs
+
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    with tf.GradientTape() as tape:
+      tape.watch(input_sequence)
+      output_sequence, _ = recurrent.static_unroll(
+          core, input_sequence, tf.ones([self.batch_size, 1]),
+          checkpoint_stride=2)
+    self.assertEqual(num_calls[0], self.num_steps)
+
+    tape.gradient(output_sequence, input_sequence)
+    # All but the first window are recomputed.
+    self.assertEqual(num_calls[0], 2 * self.num_steps - 2)
+
+  @parameterized.parameters(recurrent.dynamic_unroll, recurrent.static_unroll)
+  def testInvalidStride(self, unroll_fn):
+    core = Counter(self.hidden_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    with self.assertRaisesRegex(ValueError,
+                                "checkpoint_stride must be positive"):
+      unroll_fn(core, input_sequence, core.initial_state(self.batch_size),
+                checkpoint_stride=0)
+
+  def testUnknownSteps(self):
+    core = Counter(self.hidden_size)
+
+    def do_unroll(input_sequence):
+      initial_state = core.initial_state(self.batch_size)
+      return recurrent.dynamic_unroll(
+          core, input_sequence, initial_state, checkpoint_stride=2)
+
+    with self.assertRaisesRegex(
+        ValueError, "must have a statically known number of time steps"):
+      tf.function(do_unroll).get_concrete_function(
+          tf.TensorSpec([None, None, 1]))
+
+
+
+class LengthAwareUnrollTest(test_utils.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+
+    self.num_steps = 6
+    self.batch_size = 4
+    self.hidden_size = 2
+
+  @test_utils.combined_named_parameters(
+      (("ragged", [6, 2, 4, 1]), ("empty", [0, 3, 3, 2]),
+       ("equal", [2, 2, 2, 2]), ("all_empty", [0, 0, 0, 0]),
+       ("full", [6, 6, 6, 6])),
+      test_utils.named_bools("compact_finished"),
+      test_utils.named_bools("use_tf_function"))
+  def testMatchesDynamicUnroll(self, sequence_length, compact_finished,
+                               use_tf_function):
+    core = recurrent.DeepRNN(
+        [recurrent.LSTM(self.hidden_size),
+         recurrent.GRU(self.hidden_size)])
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    sequence_length = tf.constant(sequence_length)
+
+    def unroll(input_sequence, **kwargs):
+      with tf.GradientTape() as tape:
+        tape.watch(input_sequence)
+        output_sequence, final_state = recurrent.dynamic_unroll(
+            core, input_sequence, initial_state,
+            sequence_length=sequence_length, **kwargs)
+        loss = (tf.reduce_sum(tf.square(output_sequence)) +
+                sum(tf.reduce_sum(s) for s in tree.flatten(final_state)))
+      grads = tape.gradient(loss,
+                            [input_sequence] + list(core.trainable_variables))
+      return output_sequence, final_state, grads
+
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    expected = unroll(input_sequence)
+    actual = unroll(
+        input_sequence, length_aware=True, compact_finished=compact_finished)
+    self.assertEqual(actual[0].shape, expected[0].shape)
+    self.assertAllClose(actual, expected)
+
+  @test_utils.combined_named_parameters(
+      test_utils.named_bools("compact_finished"))
+  def testScalarState(self, compact_finished):
+    core = Counter(self.hidden_size)
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    sequence_length = tf.constant([3, 1, 5, 2])
+
+    output_sequence, final_state = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state, sequence_length=sequence_length,
+        length_aware=True, compact_finished=compact_finished)
+    expected_output_sequence, _ = recurrent.dynamic_unroll(
+        core, input_sequence, initial_state, sequence_length=sequence_length)
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    # The (scalar) step count stops at the longest sequence.
+    self.assertAllClose(final_state, (5., initial_state[1]))
+
+  @test_utils.combined_named_parameters(
+      (("masked", False, [4, 4, 4, 4, 4]), ("compact", True, [4, 3, 2, 1, 1])))
+  def testSkipsFinishedWork(self, compact_finished, expected_batch_sizes):
+    batch_sizes = []
+
+    def core(inputs, prev_state):
+      batch_sizes.append(inputs.shape[0])
+      return inputs, prev_state
+
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    recurrent.dynamic_unroll(
+        core, input_sequence, tf.zeros([self.batch_size, 1]),
+        sequence_length=tf.constant([2, 5, 1, 3]),
+        length_aware=True, compact_finished=compact_finished)
+    self.assertEqual(batch_sizes, expected_batch_sizes)
+
+  def testUnknownSteps(self):
+    core = recurrent.LSTM(self.hidden_size)
+    sequence_length = tf.constant([1, 3, 2, 0])
+
+    @tf.function(input_signature=[tf.TensorSpec([None, self.batch_size, 1])])
+    def unroll(input_sequence):
+      return recurrent.dynamic_unroll(
+          core, input_sequence, core.initial_state(self.batch_size),
+          sequence_length=sequence_length, length_aware=True,
+          compact_finished=True)
+
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    output_sequence, final_state = unroll(input_sequence)
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, input_sequence, core.initial_state(self.batch_size),
+        sequence_length=sequence_length)
+    self.assertAllClose(output_sequence, expected_output_sequence)
+    self.assertAllClose(final_state, expected_final_state)
+
+  def testCompactRequiresLengthAware(self):
+    core = Counter(self.hidden_size)
+    input_sequence = tf.random.uniform([self.num_steps, self.batch_size, 1])
+    with self.assertRaisesRegex(ValueError,
+                                "compact_finished requires length_aware"):
+      recurrent.dynamic_unroll(
+          core, input_sequence, core.initial_state(self.batch_size),
+          compact_finished=True)
+
+
+
+class RaggedUnrollTest(test_utils.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+
+    self.row_lengths = [3, 0, 5, 1]
+    self.batch_size = len(self.row_lengths)
+    self.input_size = 2
+
+  def _ragged_and_dense(self):
+    input_sequence = tf.RaggedTensor.from_row_lengths(
+        tf.random.uniform([sum(self.row_lengths), self.input_size]),
+        self.row_lengths)
+    # [B, T, ...] -> [T, B, ...]
+    dense_input_sequence = tf.transpose(input_sequence.to_tensor(), [1, 0, 2])
+    return input_sequence, dense_input_sequence
+
+  def _to_ragged(self, output_sequence):
+    return tf.RaggedTensor.from_tensor(
+        tf.transpose(output_sequence, [1, 0, 2]), lengths=self.row_lengths)
+
+  @test_utils.combined_named_parameters(
+      test_utils.named_bools("use_tf_function"))
+  def testMatchesDynamicUnroll(self, use_tf_function):
+    core = recurrent.DeepRNN([recurrent.LSTM(3), recurrent.GRU(2)])
+    initial_state = core.initial_state(self.batch_size)
+    input_sequence, dense_input_sequence = self._ragged_and_dense()
+
+    def unroll(input_sequence, sequence_length=None):
+      with tf.GradientTape() as tape:
+        output_sequence, final_state = recurrent.dynamic_unroll(
+            core, input_sequence, initial_state, sequence_length)
+        if not isinstance(output_sequence, tf.RaggedTensor):
+          output_sequence = self._to_ragged(output_sequence)
+        loss = tf.reduce_sum(tf.square(output_sequence.values))
+      grads = tape.gradient(loss, core.trainable_variables)
+      return output_sequence, final_state, grads
+
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    expected_output_sequence, expected_final_state, expected_grads = unroll(
+        dense_input_sequence, tf.constant(self.row_lengths))
+    output_sequence, final_state, grads = unroll(input_sequence)
+    self.assertIsInstance(output_sequence, tf.RaggedTensor)
+    self.assertAllEqual(output_sequence.row_lengths(), self.row_lengths)
+    self.assertAllClose(output_sequence.values,
+                        expected_output_sequence.values)
+    self.assertAllClose(final_state, expected_final_state)
+    self.assertAllClose(grads, expected_grads)
+
+  def testUnknownShape(self):
+    core = recurrent.LSTM(3)
+    input_sequence, dense_input_sequence = self._ragged_and_dense()
+
+    @tf.function(input_signature=[
+        tf.RaggedTensorSpec([None, None, self.input_size], ragged_rank=1)
+    ])
+    def unroll(input_sequence):
+      return recurrent.dynamic_unroll(
+          core, input_sequence, core.initial_state(self.batch_size))
+
+    output_sequence, final_state = unroll(input_sequence)
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        core, dense_input_sequence, core.initial_state(self.batch_size),
+        sequence_length=tf.constant(self.row_lengths))
+    self.assertAllClose(output_sequence.values,
+                        self._to_ragged(expected_output_sequence).values)
+    self.assertAllClose(final_state, expected_final_state)
+
+  def testOnlyActiveSequences(self):
+    batch_sizes = []
+
+    def core(inputs, prev_state):
+      batch_sizes.append(inputs["x"].shape[0])
+      return inputs["x"], prev_state + inputs["x"]
+
+    input_sequence, _ = self._ragged_and_dense()
+    output_sequence, final_state = recurrent.dynamic_unroll(
+        core, {"x": input_sequence},
+        tf.zeros([self.batch_size, self.input_size]))
+    self.assertEqual(batch_sizes, [3, 2, 2, 1, 1])
+    self.assertAllClose(output_sequence.values, input_sequence.values)
+    self.assertAllClose(final_state, tf.reduce_sum(input_sequence, axis=1))
+
+  def testUnrolledLSTM(self):
+    core = recurrent.UnrolledLSTM(3)
+    input_sequence, dense_input_sequence = self._ragged_and_dense()
+    output_sequence, final_state = core(input_sequence,
+                                        core.initial_state(self.batch_size))
+    expected_output_sequence, expected_final_state = recurrent.dynamic_unroll(
+        functools.partial(recurrent._lstm_fn, w_i=core.input_to_hidden,
+                          w_h=core.hidden_to_hidden, b=core.b),
+        dense_input_sequence, core.initial_state(self.batch_size),
+        sequence_length=tf.constant(self.row_lengths))
+    self.assertAllClose(output_sequence.values,
+                        self._to_ragged(expected_output_sequence).values)
+    self.assertAllClose(final_state, expected_final_state)
+
+  def testStaticUnroll(self):
+    core = recurrent.LSTM(3)
+    input_sequence, _ = self._ragged_and_dense()
+    with self.assertRaisesRegex(ValueError, "does not support ragged"):
+      recurrent.static_unroll(core, input_sequence,
+                              core.initial_state(self.batch_size))
+
+  def testSequenceLength(self):
+    core = recurrent.LSTM(3)
+    input_sequence, _ = self._ragged_and_dense()
+    with self.assertRaisesRegex(ValueError, "can not be used with ragged"):
+      recurrent.dynamic_unroll(core, input_sequence,
+                               core.initial_state(self.batch_size),
+                               sequence_length=tf.constant(self.row_lengths))
+
+  def testMixedDenseAndRagged(self):
+    core = recurrent.LSTM(3)
+    input_sequence, dense_input_sequence = self._ragged_and_dense()
+    with self.assertRaisesRegex(ValueError, "all be dense or all be ragged"):
+      recurrent.dynamic_unroll(core, (input_sequence, dense_input_sequence),
+                               core.initial_state(self.batch_size))
+
+
+class BidirectionalDynamicUnrollTest(test_utils.TestCase,
+                                     parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+
+    self.num_steps = 5
+    self.batch_size = 4
+    self.input_size = 2
+
+  def _expected(self, forward_core, backward_core, input_sequence,
+                sequence_length):
+    output_fw, state_fw = recurrent.dynamic_unroll(
+        forward_core, input_sequence,
+        forward_core.initial_state(self.batch_size), sequence_length)
+    if sequence_length is None:
+      reverse = lambda x: tf.reverse(x, axis=[0])
+    else:
+      reverse = functools.partial(
+          tf.reverse_sequence, seq_lengths=sequence_length, seq_axis=0,
+          batch_axis=1)
+    output_bw, state_bw = recurrent.dynamic_unroll(
+        backward_core, reverse(input_sequence),
+        backward_core.initial_state(self.batch_size), sequence_length)
+    output_bw = reverse(output_bw)
+    if sequence_length is not None:
+      mask = tf.range(self.num_steps)[:, None] < sequence_length[None]
+      output_bw = tf.where(mask[..., None], output_bw, 0.)
+    return (output_fw, output_bw), (state_fw, state_bw)
+
+  @test_utils.combined_named_parameters(
+      (("full_length", None), ("variable_length", [5, 2, 0, 3])),
+      test_utils.named_bools("use_tf_function"))
+  def testMatchesTwoUnrolls(self, sequence_length, use_tf_function):
+    forward_core = recurrent.LSTM(3)
+    backward_core = recurrent.GRU(2)
+    input_sequence = tf.random.uniform(
+        [self.num_steps, self.batch_size, self.input_size])
+    if sequence_length is not None:
+      sequence_length = tf.constant(sequence_length)
+
+    def unroll(unroll_fn):
+      with tf.GradientTape() as tape:
+        output_sequences, final_states = unroll_fn(
+            forward_core, backward_core, input_sequence, sequence_length)
+        loss = sum(tf.reduce_sum(tf.square(o)) for o in output_sequences)
+      variables = (forward_core.trainable_variables +
+                   backward_core.trainable_variables)
+      return output_sequences, final_states, tape.gradient(loss, variables)
+
+    def bidirectional_unroll(forward_core, backward_core, input_sequence,
+                             sequence_length):
+      return recurrent.bidirectional_dynamic_unroll(
+          forward_core, backward_core, input_sequence,
+          forward_core.initial_state(self.batch_size),
+          backward_core.initial_state(self.batch_size), sequence_length)
+
+    if use_tf_function:
+      unroll = tf.function(unroll)
+
+    expected_outputs, expected_states, expected_grads = unroll(self._expected)
+    output_sequences, final_states, grads = unroll(bidirectional_unroll)
+    self.assertAllClose(output_sequences, expected_outputs)
+    self.assertAllClose(final_states, expected_states)
+    for grad, expected_grad in zip(grads, expected_grads):
+      self.assertAllClose(grad, expected_grad)
+
+  def testReadsInputInBothDirections(self):
+    steps = {"fw": [], "bw": []}
+
+    def make_core(direction):
+      def core(inputs, prev_state):
+        steps[direction].append(inputs)
+        return inputs, prev_state + 1
+      return core
+
+    input_sequence = tf.reshape(
+        tf.range(self.num_steps, dtype=tf.float32), [self.num_steps, 1, 1])
+    (output_fw, output_bw), (state_fw, state_bw) = (
+        recurrent.bidirectional_dynamic_unroll(
+            make_core("fw"), make_core("bw"), input_sequence,
+            tf.zeros([1]), tf.zeros([1])))
+    self.assertAllClose(tf.reshape(tf.stack(steps["fw"]), [-1]),
+                        [0, 1, 2, 3, 4])
+    self.assertAllClose(tf.reshape(tf.stack(steps["bw"]), [-1]),
+                        [4, 3, 2, 1, 0])
+    self.assertAllClose(output_fw, input_sequence)
+    self.assertAllClose(output_bw, input_sequence)
+    self.assertAllClose(state_fw, [self.num_steps])
+    self.assertAllClose(state_bw, [self.num_steps])
+
+  def testRagged(self):
+    core = recurrent.LSTM(3)
+    input_sequence = tf.RaggedTensor.from_row_lengths(
+        tf.random.uniform([4, self.input_size]), [3, 1])
+    with self.assertRaisesRegex(ValueError, "does not support ragged"):
+      recurrent.bidirectional_dynamic_unroll(core, core, input_sequence,
+                                             core.initial_state(2),
+                                             core.initial_state(2))
+
+
 if __name__ == "__main__":
   tf.test.main()
@@ -0,0 +1,237 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Sharded checkpoints saved and restored from a thread pool."""
+
+import concurrent.futures
+import heapq
+import json
+import os
+import threading
+from typing import Dict, List, Mapping, Optional
+
+from sonnet.src import mmap_checkpoint
+
+_INDEX = "index.json"
+
+# Directory -> executor writing all checkpoints to it, one at a time.
+_save_executors = {}
+_save_executors_lock = threading.Lock()
+
+
+def _shard_name(generation: int, index: int, num_shards: int) -> str:
+  return "ckpt-{:06d}-shard-{:05d}-of-{:05d}.snt".format(
+      generation, index, num_shards)
+
+
+def _read_index(directory: str) -> Optional[Dict[str, object]]:
+  index_path = os.path.join(directory, _INDEX)
+  if not os.path.exists(index_path):
+    return None
+  with open(index_path) as f:
+    return json.load(f)
+
+
+def _save_executor(directory: str) -> concurrent.futures.Executor:
+  """Returns the single threaded executor which saves to ``directory``."""
+  directory = os.path.realpath(directory)
+  with _save_executors_lock:
+    executor = _save_executors.get(directory)
+    if executor is None:
+      executor = _save_executors[directory] = (
+          concurrent.futures.ThreadPoolExecutor(1))
+    return executor
+
+
+def _assign_shards(sizes: Mapping[str, int],
+                   num_shards: int) -> List[List[str]]:
+  """Greedily assigns names to shards, largest first, balancing bytes."""
+  shards = [[] for _ in range(num_shards)]
+  heap = [(0, index) for index in range(num_shards)]
+  for name in sorted(sizes, key=lambda name: (-sizes[name], name)):
+    size, index = heapq.heappop(heap)
+    shards[index].append(name)
+    heapq.heappush(heap, (size + sizes[name], index))
+  return [shard for shard in shards if shard]
+
+
+def _write_shards(directory: str, shards: List[Dict[str, object]],
+                  trainable: Mapping[str, bool], num_threads: Optional[int]):
+  """Writes each shard from a thread pool, then the index.
+
+  Shards are named by a new generation, so the shards of the previous
+  checkpoint are unchanged until the index is replaced. Only then are they
+  deleted.
+
+  Args:
+    directory: Directory to write to.
+    shards: Values to write to each shard.
+    trainable: Whether each variable is trainable.
+    num_threads: Number of threads to write shards with.
+  """
+  os.makedirs(directory, exist_ok=True)
+  previous = _read_index(directory) or {"generation": 0, "shards": []}
+  generation = previous.get("generation", 0) + 1
+  names = [_shard_name(generation, index, len(shards))
+           for index in range(len(shards))]
+  with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+    futures = [
+        executor.submit(mmap_checkpoint._write,  # pylint: disable=protected-access
+                        os.path.join(directory, name), values, trainable)
+        for name, values in zip(names, shards)]
+    for future in futures:
+      future.result()
+
+  # The index is written last such that it only refers to complete shards.
+  index_path = os.path.join(directory, _INDEX)
+  with open(index_path + ".tmp", "w") as f:
+    json.dump({"generation": generation, "shards": names}, f)
+  os.replace(index_path + ".tmp", index_path)
+
+  for name in previous["shards"]:
+    if name not in names:
+      try:
+        os.remove(os.path.join(directory, name))
+      except FileNotFoundError:
+        pass
+
+
+def save_sharded(
+    directory: str,
+    variables_or_module: mmap_checkpoint.VariablesOrModule,
+    num_shards: int = 8,
+    num_threads: Optional[int] = None,
+    blocking: bool = True,
+) -> Optional[concurrent.futures.Future]:
+  """Saves variables to ``num_shards`` files written concurrently.
+
+  Variables are assigned to shards such that each shard holds roughly the
+  same number of bytes, and shards are written in parallel from a thread pool.
+  Each shard is a memory mapped checkpoint (see :func:`save_mmap`) keyed by
+  variable name:
+
+  >>> import tempfile
+  >>> directory = tempfile.mkdtemp()
+  >>> mlp = snt.nets.MLP([3, 2])
+  >>> _ = mlp(tf.ones([1, 4]))
+  >>> snt.checkpoint.save_sharded(directory, mlp, num_shards=2)
+  >>> snt.checkpoint.restore_sharded(directory, mlp)
+
+  If ``blocking=False`` the values of all variables are read on the calling
+  thread (such that later updates are not saved), then copied to host and
+  written in the background, overlapping with e.g. the next training steps.
+  The returned future completes once the checkpoint is written:
+
+  >>> future = snt.checkpoint.save_sharded(directory, mlp, blocking=False)
+  >>> # ... train ...
+  >>> future.result()
+
+  A checkpoint is only visible to :func:`restore_sharded` once all of its
+  shards have been written. Saving over an existing checkpoint writes new
+  shards alongside the old ones, which are deleted once the new checkpoint is
+  visible. Saves to the same directory (blocking or not) are written one at a
+  time, in the order :func:`save_sharded` was called.
+
+  Args:
+    directory: Local directory to write shards into, created if needed.
+    variables_or_module: A :tf:`Module` (whose ``variables`` are saved) or a
+      sequence of variables. Variable names must be unique.
+    num_shards: Maximum number of files to split variables between.
+    num_threads: Number of threads to write shards with. Defaults to the
+      :class:`~concurrent.futures.ThreadPoolExecutor` default.
+    blocking: If ``False``, write the shards in the background.
+
+  Returns:
+    ``None`` if ``blocking``, otherwise a :class:`~concurrent.futures.Future`
+    which completes when the checkpoint is written (and raises any error from
+    writing it).
+
+  Raises:
+    ValueError: If ``num_shards`` is not positive, variable names are not
+      unique or a variable can not be memory mapped.
+  """
+  if num_shards <= 0:
+    raise ValueError("num_shards must be positive, got: {}".format(num_shards))
+
+  variables = mmap_checkpoint._variables_by_name(variables_or_module)  # pylint: disable=protected-access
+  trainable = {name: v.trainable for name, v in variables.items()}
+  sizes = {name: v.shape.num_elements() * v.dtype.size
+           for name, v in variables.items()}
+  shards = _assign_shards(sizes, num_shards)
+
+  if blocking:
+    values = variables
+  else:
+    # Snapshot values now, the variables may be updated while writing. Reads
+    # share the variable's buffer until it is next updated (copy on write), so
+    # this is cheap and copying to host happens on the background thread.
+    values = {name: v.read_value() for name, v in variables.items()}
+  shards = [{name: values[name] for name in shard} for shard in shards]
+
+  future = _save_executor(directory).submit(
+      _write_shards, directory, shards, trainable, num_threads)
+  if blocking:
+    future.result()
+    return None
+  return future
+
+
+def restore_sharded(
+    directory: str,
+    variables_or_module: mmap_checkpoint.VariablesOrModule,
+    num_threads: Optional[int] = None,
+):
+  """Restores variables saved by :func:`save_sharded`, reading concurrently.
+
+  Each shard is memory mapped and its values assigned to the matching
+  variables from a thread pool.
+
+  Args:
+    directory: Directory passed to :func:`save_sharded`.
+    variables_or_module: A :tf:`Module` (whose ``variables`` are restored) or
+      a sequence of variables.
+    num_threads: Number of threads to read shards with. Defaults to the
+      :class:`~concurrent.futures.ThreadPoolExecutor` default.
+
+  Raises:
+    ValueError: If there is no checkpoint in ``directory``, a variable is not
+      in the checkpoint or has a different shape or dtype to the checkpoint.
+  """
+  index = _read_index(directory)
+  if index is None:
+    raise ValueError("No sharded checkpoint in {!r}.".format(directory))
+  names = index["shards"]
+  shards = [mmap_checkpoint.load_mmap(os.path.join(directory, name))
+            for name in names]
+
+  variables = mmap_checkpoint._variables_by_name(variables_or_module)  # pylint: disable=protected-access
+  by_shard = [[] for _ in shards]
+  missing = []
+  for name, variable in variables.items():
+    for shard, shard_variables in zip(shards, by_shard):
+      if name in shard:
+        shard_variables.append(variable)
+        break
+    else:
+      missing.append(name)
+  if missing:
+    raise ValueError("Variables {} are not in checkpoint {!r}.".format(
+        ", ".join(map(repr, sorted(missing))), directory))
+
+  with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+    futures = [executor.submit(shard.restore, shard_variables)
+               for shard, shard_variables in zip(shards, by_shard)
+               if shard_variables]
+    for future in futures:
+      future.result()
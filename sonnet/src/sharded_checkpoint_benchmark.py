@@ -0,0 +1,87 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Benchmark for sonnet.v2.src.sharded_checkpoint.
+
+Compares saving and restoring a set of variables with `tf.train.Checkpoint`
+against `save_sharded`/`restore_sharded`, and measures how long the caller is
+blocked by a non-blocking save.
+
+Run with:
+
+    python sharded_checkpoint_benchmark.py --benchmark_filter=.
+"""
+
+import os
+import tempfile
+import time
+
+from sonnet.src import sharded_checkpoint
+import tensorflow as tf
+
+NUM_VARIABLES = 64
+VARIABLE_SIZE = 1 << 20
+NUM_SHARDS = (1, 4, 8)
+
+
+def _time(fn):
+  start = time.time()
+  fn()
+  return time.time() - start
+
+
+class ShardedCheckpointBenchmark(tf.test.Benchmark):
+  """Compares `tf.train.Checkpoint` against sharded checkpoints."""
+
+  def _report(self, name, wall_time):
+    num_bytes = NUM_VARIABLES * VARIABLE_SIZE * 4
+    self.report_benchmark(
+        iters=1, wall_time=wall_time, name=name,
+        extras={"megabytes_per_second": num_bytes / wall_time / 1e6})
+
+  def benchmark_checkpoint(self):
+    variables = [
+        tf.Variable(tf.random.normal([VARIABLE_SIZE]), name="v{}".format(i))
+        for i in range(NUM_VARIABLES)]
+    root = tempfile.mkdtemp()
+
+    checkpoint = tf.train.Checkpoint(variables=variables)
+    prefix = os.path.join(root, "tf", "checkpoint")
+    self._report("tf_train_checkpoint_save",
+                 _time(lambda: checkpoint.write(prefix)))
+    self._report("tf_train_checkpoint_restore",
+                 _time(lambda: checkpoint.read(prefix).assert_consumed()))
+
+    for num_shards in NUM_SHARDS:
+      directory = os.path.join(root, "sharded_{}".format(num_shards))
+      self._report(
+          "save_sharded_{}".format(num_shards),
+          _time(lambda: sharded_checkpoint.save_sharded(  # pylint: disable=cell-var-from-loop
+              directory, variables, num_shards=num_shards)))
+      self._report(
+          "restore_sharded_{}".format(num_shards),
+          _time(lambda: sharded_checkpoint.restore_sharded(  # pylint: disable=cell-var-from-loop
+              directory, variables)))
+
+    directory = os.path.join(root, "async")
+    futures = []
+    self._report(
+        "save_sharded_non_blocking",
+        _time(lambda: futures.append(sharded_checkpoint.save_sharded(
+            directory, variables, blocking=False))))
+    futures[0].result()
+
+
+if __name__ == "__main__":
+  tf.test.main()
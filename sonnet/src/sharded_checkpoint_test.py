@@ -0,0 +1,153 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.sharded_checkpoint."""
+
+import os
+
+from absl.testing import parameterized
+from sonnet.src import mmap_checkpoint
+from sonnet.src import sharded_checkpoint
+from sonnet.src import test_utils
+import tensorflow as tf
+
+
+def create_variables():
+  return [tf.Variable(tf.fill([n], float(n)), name="v{}".format(n))
+          for n in range(1, 11)]
+
+
+class ShardedCheckpointTest(test_utils.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(1, 3, 20)
+  def test_save_restore(self, num_shards):
+    directory = self.get_temp_dir()
+    sharded_checkpoint.save_sharded(directory, create_variables(),
+                                    num_shards=num_shards, num_threads=2)
+    variables = [tf.Variable(tf.zeros_like(v), name=v.name.split(":")[0])
+                 for v in create_variables()]
+    sharded_checkpoint.restore_sharded(directory, variables)
+    for n, variable in enumerate(variables, 1):
+      self.assertAllEqual(variable, tf.fill([n], float(n)))
+
+  def test_shards_are_balanced(self):
+    shards = sharded_checkpoint._assign_shards(
+        {"a": 10, "b": 6, "c": 5, "d": 4, "e": 1}, num_shards=2)
+    self.assertEqual(shards, [["a", "d"], ["b", "c", "e"]])
+
+  def test_files(self):
+    directory = self.get_temp_dir()
+    sharded_checkpoint.save_sharded(directory, create_variables(),
+                                    num_shards=3)
+    self.assertCountEqual(
+        os.listdir(directory),
+        ["index.json"] + ["ckpt-000001-shard-{:05d}-of-00003.snt".format(i)
+                          for i in range(3)])
+    sizes = [
+        sum(v.nbytes for v in mmap_checkpoint.load_mmap(
+            os.path.join(directory,
+                         "ckpt-000001-shard-{:05d}-of-00003.snt".format(i)
+                        )).values())
+        for i in range(3)]
+    self.assertEqual(sum(sizes), 55 * 4)
+    self.assertLessEqual(max(sizes) - min(sizes), 10 * 4)
+
+  def test_save_over_existing_checkpoint(self):
+    directory = self.get_temp_dir()
+    variables = create_variables()
+    sharded_checkpoint.save_sharded(directory, variables, num_shards=1)
+    old_value = mmap_checkpoint.load_mmap(
+        os.path.join(directory, "ckpt-000001-shard-00000-of-00001.snt"))["v3"]
+
+    for variable in variables:
+      variable.assign_add(tf.ones_like(variable))
+    sharded_checkpoint.save_sharded(directory, variables, num_shards=2)
+
+    # The old shard was replaced by new files rather than written over.
+    self.assertAllEqual(old_value, [3., 3., 3.])
+    self.assertCountEqual(
+        os.listdir(directory),
+        ["index.json"] + ["ckpt-000002-shard-{:05d}-of-00002.snt".format(i)
+                          for i in range(2)])
+    restored = [tf.Variable(tf.zeros_like(v), name=v.name.split(":")[0])
+                for v in variables]
+    sharded_checkpoint.restore_sharded(directory, restored)
+    for n, variable in enumerate(restored, 1):
+      self.assertAllEqual(variable, tf.fill([n], n + 1.))
+
+  def test_async_saves_are_written_in_order(self):
+    directory = self.get_temp_dir()
+    variables = create_variables()
+    futures = []
+    for _ in range(5):
+      futures.append(sharded_checkpoint.save_sharded(
+          directory, variables, num_shards=2, blocking=False))
+      for variable in variables:
+        variable.assign_add(tf.ones_like(variable))
+    # A blocking save waits for the pending ones.
+    sharded_checkpoint.save_sharded(directory, variables, num_shards=2)
+    self.assertTrue(all(future.done() for future in futures))
+    for future in futures:
+      self.assertIsNone(future.result())
+
+    self.assertCountEqual(
+        os.listdir(directory),
+        ["index.json"] + ["ckpt-000006-shard-{:05d}-of-00002.snt".format(i)
+                          for i in range(2)])
+    restored = [tf.Variable(tf.zeros_like(v), name=v.name.split(":")[0])
+                for v in variables]
+    sharded_checkpoint.restore_sharded(directory, restored)
+    for n, variable in enumerate(restored, 1):
+      self.assertAllEqual(variable, tf.fill([n], n + 5.))
+
+  def test_async_save_snapshots_values(self):
+    directory = self.get_temp_dir()
+    variables = create_variables()
+    future = sharded_checkpoint.save_sharded(directory, variables,
+                                             blocking=False)
+    for variable in variables:
+      variable.assign_add(tf.ones_like(variable))
+    self.assertIsNone(future.result())
+
+    sharded_checkpoint.restore_sharded(directory, variables)
+    for n, variable in enumerate(variables, 1):
+      self.assertAllEqual(variable, tf.fill([n], float(n)))
+
+  def test_async_save_error(self):
+    path = os.path.join(self.get_temp_dir(), "file")
+    with open(path, "w") as f:
+      f.write("foo")
+    future = sharded_checkpoint.save_sharded(
+        os.path.join(path, "directory"), create_variables(), blocking=False)
+    with self.assertRaises(OSError):
+      future.result()
+
+  def test_restore_missing_variable(self):
+    directory = self.get_temp_dir()
+    sharded_checkpoint.save_sharded(directory, create_variables())
+    with self.assertRaisesRegex(ValueError, "'w' are not in checkpoint"):
+      sharded_checkpoint.restore_sharded(directory, [tf.Variable(1., name="w")])
+
+  def test_restore_no_checkpoint(self):
+    with self.assertRaisesRegex(ValueError, "No sharded checkpoint"):
+      sharded_checkpoint.restore_sharded(
+          os.path.join(self.get_temp_dir(), "empty"), create_variables())
+
+  def test_invalid_num_shards(self):
+    with self.assertRaisesRegex(ValueError, "num_shards must be positive"):
+      sharded_checkpoint.save_sharded(self.get_temp_dir(), [], num_shards=0)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,345 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Streaming stateful inference for recurrent cores."""
+
+import collections
+import threading
+import time
+from typing import Any, Callable, Hashable, List
+
+from sonnet.src import recurrent
+from sonnet.src import types
+import tensorflow as tf
+import tree
+
+
+class _Request:
+  """A single step requested by one session."""
+
+  __slots__ = ("session_id", "inputs", "done", "output", "error")
+
+  def __init__(self, session_id, inputs):
+    self.session_id = session_id
+    self.inputs = inputs
+    self.done = False
+    self.output = None
+    self.error = None
+
+
+class StreamingRNN:
+  """Serves an :class:`RNNCore` one step at a time to many sessions.
+
+  Each session is a stream of inputs identified by a hashable ``session_id``
+  (e.g. one client connection). Rather than keeping per-session state in Python
+  and running the core once per session, :class:`StreamingRNN` keeps the state
+  of all sessions in a preallocated table with one row per session. Steps
+  requested concurrently (e.g. from different server threads) are grouped into
+  micro-batches: the states of the sessions in the batch are gathered from the
+  table, the core is run once and the new states are scattered back.
+
+  >>> core = snt.LSTM(hidden_size=8)
+  >>> server = snt.StreamingRNN(core, capacity=16, max_batch_size=4)
+  >>> server.step("alice", tf.ones([3])).shape
+  TensorShape([8])
+  >>> server.step_batch(["alice", "bob"], tf.ones([2, 3])).shape
+  TensorShape([2, 8])
+  >>> server.num_sessions
+  2
+
+  The first step of a session starts from ``core.initial_state``. When all
+  rows of the table are in use, the least recently used session is evicted to
+  make room for a new one. A session that was evicted (or ended with
+  :meth:`end_session`) starts again from the initial state on its next step.
+
+  :meth:`step` and :meth:`step_batch` are thread safe and block until the step
+  has run. There is no background thread: one of the waiting callers runs the
+  pending steps in batches of at most ``max_batch_size`` while the others wait
+  for their result. Batches are padded to a power of two so that the core is traced at
+  most ``log2(max_batch_size) + 1`` times.
+
+  Attributes:
+    core: The wrapped :class:`RNNCore`.
+    capacity: The maximum number of sessions with a state in the table.
+    max_batch_size: The maximum number of steps run together.
+  """
+
+  def __init__(self,
+               core: recurrent.RNNCore,
+               capacity: int,
+               max_batch_size: int = 64,
+               clock: Callable[[], float] = time.monotonic):
+    """Constructs a `StreamingRNN`.
+
+    Args:
+      core: An :class:`RNNCore` to serve. Its state can be any nest of tensors
+        with a leading batch dimension, for example an :class:`LSTMState` or
+        the tuple of states of a :class:`DeepRNN`.
+      capacity: The number of rows in the state table.
+      max_batch_size: The maximum number of steps run together.
+      clock: Returns the current time in seconds, used to track when each
+        session was last active.
+
+    Raises:
+      ValueError: If ``capacity`` or ``max_batch_size`` is not positive or if
+        ``max_batch_size`` is larger than ``capacity``.
+    """
+    if capacity <= 0:
+      raise ValueError("capacity must be positive, got: {}".format(capacity))
+    if max_batch_size <= 0:
+      raise ValueError(
+          "max_batch_size must be positive, got: {}".format(max_batch_size))
+    if max_batch_size > capacity:
+      raise ValueError(
+          "max_batch_size ({}) can not be larger than capacity ({})".format(
+              max_batch_size, capacity))
+
+    self.core = core
+    self.capacity = capacity
+    self.max_batch_size = max_batch_size
+    self._clock = clock
+
+    # The extra row is written to by the padding in each batch.
+    with tf.name_scope("streaming_rnn_state"):
+      self._state_table = tree.map_structure(
+          lambda s: tf.Variable(  # pylint: disable=g-long-lambda
+              tf.zeros([capacity + 1] + s.shape[1:].as_list(), s.dtype),
+              trainable=False),
+          core.initial_state(1))
+    self._step_fn = tf.function(self._step)
+
+    # Session id -> (slot, last active time), least recently active first.
+    self._sessions = collections.OrderedDict()
+    self._free_slots = list(range(capacity - 1, -1, -1))
+    self._pending = collections.deque()
+    self._running = False
+    self._cond = threading.Condition()
+
+  @property
+  def num_sessions(self) -> int:
+    """The number of sessions with a state in the table."""
+    with self._cond:
+      return len(self._sessions)
+
+  def __contains__(self, session_id: Hashable) -> bool:
+    with self._cond:
+      return session_id in self._sessions
+
+  def step(self, session_id: Hashable, inputs: types.TensorNest) -> Any:
+    """Runs one step of ``session_id``, batched with other pending steps.
+
+    Args:
+      session_id: Identifies the session.
+      inputs: The inputs for this step, without a batch dimension.
+
+    Returns:
+      The output of the core for this step, without a batch dimension.
+    """
+    request = _Request(session_id, inputs)
+    with self._cond:
+      self._pending.append(request)
+      while not request.done and self._running:
+        self._cond.wait()
+      if not request.done:
+        self._running = True
+
+    if not request.done:
+      try:
+        while self._run_pending_batch(request):
+          pass
+      finally:
+        with self._cond:
+          self._running = False
+          self._cond.notify_all()
+
+    if request.error is not None:
+      raise request.error
+    return request.output
+
+  def step_batch(self, session_ids: List[Hashable],
+                 inputs: types.TensorNest) -> Any:
+    """Runs one step for each of ``session_ids`` as a single batch.
+
+    Unlike :meth:`step` this does not batch with other callers. It waits for
+    any batch that is running to finish, then runs ``session_ids`` on its own.
+
+    Args:
+      session_ids: A list of distinct session ids, of length at most
+        ``max_batch_size``.
+      inputs: The inputs for this step, with a leading batch dimension of size
+        ``len(session_ids)``.
+
+    Returns:
+      The output of the core, with a leading batch dimension.
+
+    Raises:
+      ValueError: If ``session_ids`` contains duplicates or is longer than
+        ``max_batch_size``.
+    """
+    if len(set(session_ids)) != len(session_ids):
+      raise ValueError("session_ids must be distinct")
+    if len(session_ids) > self.max_batch_size:
+      raise ValueError(
+          "Got {} session_ids but max_batch_size is {}".format(
+              len(session_ids), self.max_batch_size))
+    with self._cond:
+      while self._running:
+        self._cond.wait()
+      self._running = True
+
+    try:
+      with self._cond:
+        slots, reset = self._assign_slots(session_ids)
+      return self._run(slots, reset, inputs, len(session_ids))
+    finally:
+      with self._cond:
+        self._running = False
+        self._cond.notify_all()
+
+  def end_session(self, session_id: Hashable) -> bool:
+    """Frees the row of ``session_id``, returning whether it had one."""
+    with self._cond:
+      return self._evict(session_id)
+
+  def evict_idle(self, max_idle_seconds: float) -> int:
+    """Ends all sessions idle for longer than ``max_idle_seconds``.
+
+    Args:
+      max_idle_seconds: Sessions whose last step was longer ago than this are
+        evicted.
+
+    Returns:
+      The number of sessions evicted.
+    """
+    with self._cond:
+      now = self._clock()
+      idle = []
+      for session_id, (_, last_active) in self._sessions.items():
+        if now - last_active <= max_idle_seconds:
+          break  # Sessions are ordered by last active time.
+        idle.append(session_id)
+      for session_id in idle:
+        self._evict(session_id)
+      return len(idle)
+
+  def _run_pending_batch(self, request: _Request) -> bool:
+    """Runs one batch of pending steps, returns whether to run another."""
+    with self._cond:
+      if request.done:
+        return False
+      batch = []
+      deferred = []
+      session_ids = set()
+      while self._pending and len(batch) < self.max_batch_size:
+        pending = self._pending.popleft()
+        # Steps of the same session depend on each other, they must run in
+        # separate batches.
+        if pending.session_id in session_ids:
+          deferred.append(pending)
+        else:
+          session_ids.add(pending.session_id)
+          batch.append(pending)
+      self._pending.extendleft(reversed(deferred))
+      if not batch:
+        return False
+      try:
+        slots, reset = self._assign_slots([r.session_id for r in batch])
+      except Exception as e:  # pylint: disable=broad-except
+        # Requests were taken from `_pending`, their callers must not wait.
+        for r in batch:
+          r.error = e
+          r.done = True
+        self._cond.notify_all()
+        return True
+
+    try:
+      inputs = tree.map_structure(lambda *x: tf.stack(x),
+                                  *[r.inputs for r in batch])
+      outputs = self._run(slots, reset, inputs, len(batch))
+      for i, r in enumerate(batch):
+        r.output = tree.map_structure(lambda x: x[i], outputs)  # pylint: disable=cell-var-from-loop
+    except Exception as e:  # pylint: disable=broad-except
+      for r in batch:
+        r.error = e
+
+    with self._cond:
+      for r in batch:
+        r.done = True
+      self._cond.notify_all()
+    return True
+
+  def _assign_slots(self, session_ids):
+    """Returns table rows for `session_ids` and which of them are new."""
+    now = self._clock()
+    in_batch = set(session_ids)
+    slots = []
+    reset = []
+    for session_id in session_ids:
+      if session_id in self._sessions:
+        slot, _ = self._sessions.pop(session_id)
+        reset.append(False)
+      else:
+        if not self._free_slots:
+          self._evict(self._least_recently_active(exclude=in_batch))
+        slot = self._free_slots.pop()
+        reset.append(True)
+      self._sessions[session_id] = (slot, now)
+      slots.append(slot)
+    return slots, reset
+
+  def _least_recently_active(self, exclude):
+    for session_id in self._sessions:
+      if session_id not in exclude:
+        return session_id
+    # Not reachable since `max_batch_size <= capacity`.
+    raise AssertionError("All sessions are in the current batch.")
+
+  def _evict(self, session_id) -> bool:
+    entry = self._sessions.pop(session_id, None)
+    if entry is None:
+      return False
+    self._free_slots.append(entry[0])
+    return True
+
+  def _run(self, slots, reset, inputs, batch_size):
+    """Pads the batch to a power of two and runs a step."""
+    padded_size = min(1 << (batch_size - 1).bit_length(), self.max_batch_size)
+    num_padding = padded_size - batch_size
+    slots = tf.constant(slots + [self.capacity] * num_padding, tf.int32)
+    reset = tf.constant(reset + [True] * num_padding)
+    if num_padding:
+      inputs = tree.map_structure(
+          lambda x: tf.pad(x, [[0, num_padding]] + [[0, 0]] * (x.shape.rank - 1)),  # pylint: disable=g-long-lambda
+          inputs)
+    outputs = self._step_fn(slots, reset, inputs)
+    if num_padding:
+      outputs = tree.map_structure(lambda x: x[:batch_size], outputs)
+    return outputs
+
+  def _step(self, slots, reset, inputs):
+    batch_size = tf.shape(slots)[0]
+    initial_state = self.core.initial_state(batch_size)
+
+    def read_state(table, initial):
+      state = table.sparse_read(slots)
+      mask = tf.reshape(reset, [-1] + [1] * (state.shape.rank - 1))
+      return tf.where(mask, initial, state)
+
+    prev_state = tree.map_structure(read_state, self._state_table,
+                                    initial_state)
+    outputs, next_state = self.core(inputs, prev_state)
+    tree.map_structure(
+        lambda table, s: table.scatter_update(tf.IndexedSlices(s, slots)),
+        self._state_table, next_state)
+    return outputs
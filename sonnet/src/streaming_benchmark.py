@@ -0,0 +1,107 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Load generator benchmark for sonnet.v2.src.streaming.
+
+Simulates concurrent client sessions, each stepping an LSTM, and compares a
+`tf.function` call per session (with the state held in Python) against
+`StreamingRNN`.
+
+Run with:
+
+    python streaming_benchmark.py --benchmark_filter=.
+"""
+
+import itertools
+import threading
+import time
+
+import numpy as np
+from sonnet.src import recurrent
+from sonnet.src import streaming
+import tensorflow as tf
+
+NUM_CLIENTS = (1, 16, 64)
+HIDDEN_SIZES = (64, 256)
+STEPS_PER_CLIENT = 50
+INPUT_SIZE = 32
+
+
+def _run_clients(num_clients, client_fn):
+  """Runs `client_fn(i)` on `num_clients` threads, returns the wall time."""
+  threads = [threading.Thread(target=client_fn, args=(i,))
+             for i in range(num_clients)]
+  start = time.time()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return time.time() - start
+
+
+class StreamingRNNBenchmark(tf.test.Benchmark):
+  """Compares per-session calls against micro-batched `StreamingRNN`."""
+
+  def _report(self, name, num_clients, wall_time):
+    num_steps = num_clients * STEPS_PER_CLIENT
+    self.report_benchmark(
+        iters=num_steps,
+        wall_time=wall_time / num_steps,
+        name=name,
+        extras={"steps_per_second": num_steps / wall_time})
+
+  def benchmark_streaming(self):
+    rng = np.random.RandomState(0)
+    for num_clients, hidden_size in itertools.product(NUM_CLIENTS,
+                                                      HIDDEN_SIZES):
+      suffix = "clients_{}_hidden_{}".format(num_clients, hidden_size)
+      core = recurrent.LSTM(hidden_size)
+      inputs = tf.constant(
+          rng.uniform(size=[num_clients, STEPS_PER_CLIENT,
+                            INPUT_SIZE]).astype(np.float32))
+
+      # Baseline: one call per session step, state kept by each client.
+      step_fn = tf.function(core)
+      step_fn(inputs[:1, 0], core.initial_state(1))  # Warmup and trace.
+
+      def per_session_client(i, step_fn=step_fn, core=core, inputs=inputs):
+        state = core.initial_state(1)
+        for t in range(STEPS_PER_CLIENT):
+          _, state = step_fn(inputs[i:i + 1, t], state)
+        tf.nest.map_structure(lambda s: s.numpy(), state)
+
+      self._report("per_session_" + suffix, num_clients,
+                   _run_clients(num_clients, per_session_client))
+
+      server = streaming.StreamingRNN(
+          core, capacity=num_clients, max_batch_size=num_clients)
+      # Warmup and trace every batch size.
+      batch_size = 1
+      while batch_size <= num_clients:
+        server.step_batch(list(range(batch_size)), inputs[:batch_size, 0])
+        batch_size *= 2
+      for i in range(num_clients):
+        server.end_session(i)
+
+      def streaming_client(i, server=server, inputs=inputs):
+        for t in range(STEPS_PER_CLIENT):
+          output = server.step(i, inputs[i, t])
+        output.numpy()
+
+      self._report("streaming_" + suffix, num_clients,
+                   _run_clients(num_clients, streaming_client))
+
+
+if __name__ == "__main__":
+  tf.test.main()
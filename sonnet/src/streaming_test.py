@@ -0,0 +1,233 @@
+# Copyright 2021 The Sonnet Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Tests for sonnet.v2.src.streaming."""
+
+import threading
+
+from absl.testing import parameterized
+import numpy as np
+from sonnet.src import recurrent
+from sonnet.src import streaming
+from sonnet.src import test_utils
+import tensorflow as tf
+
+INPUT_SIZE = 3
+HIDDEN_SIZE = 4
+
+CORES = (
+    ("LSTM", lambda: recurrent.LSTM(HIDDEN_SIZE)),
+    ("GRU", lambda: recurrent.GRU(HIDDEN_SIZE)),
+    ("VanillaRNN", lambda: recurrent.VanillaRNN(HIDDEN_SIZE)),
+    ("DeepRNN", lambda: recurrent.DeepRNN(  # pylint: disable=g-long-lambda
+        [recurrent.LSTM(HIDDEN_SIZE), recurrent.GRU(HIDDEN_SIZE)])),
+)
+
+
+def _input_sequence(num_steps, seed):
+  rng = np.random.RandomState(seed)
+  return tf.constant(
+      rng.uniform(size=[num_steps, INPUT_SIZE]).astype(np.float32))
+
+
+def _unroll(core, input_sequence):
+  """Unrolls `core` over a single session's inputs."""
+  output_sequence, _ = recurrent.dynamic_unroll(
+      core, input_sequence[:, None], core.initial_state(1))
+  return output_sequence[:, 0]
+
+
+class FakeClock:
+
+  def __init__(self):
+    self.time = 0.
+
+  def __call__(self):
+    return self.time
+
+
+class StreamingRNNTest(test_utils.TestCase, parameterized.TestCase):
+
+  @parameterized.named_parameters(*CORES)
+  def test_interleaved_sessions(self, core_fn):
+    core = core_fn()
+    server = streaming.StreamingRNN(core, capacity=4, max_batch_size=2)
+    input_sequences = [_input_sequence(5, seed) for seed in range(3)]
+
+    outputs = [[] for _ in input_sequences]
+    for t in range(5):
+      for i, input_sequence in enumerate(input_sequences):
+        outputs[i].append(server.step(i, input_sequence[t]))
+
+    for input_sequence, output in zip(input_sequences, outputs):
+      self.assertAllClose(tf.stack(output), _unroll(core, input_sequence))
+
+  @parameterized.named_parameters(*CORES)
+  def test_step_batch(self, core_fn):
+    core = core_fn()
+    server = streaming.StreamingRNN(core, capacity=4, max_batch_size=4)
+    input_sequences = tf.stack([_input_sequence(5, seed) for seed in range(3)])
+
+    outputs = []
+    for t in range(5):
+      outputs.append(server.step_batch(["a", "b", "c"], input_sequences[:, t]))
+
+    expected = [_unroll(core, s) for s in tf.unstack(input_sequences)]
+    self.assertAllClose(tf.stack(outputs, axis=1), tf.stack(expected))
+
+  def test_concurrent_steps(self):
+    core = recurrent.LSTM(HIDDEN_SIZE)
+    server = streaming.StreamingRNN(core, capacity=8, max_batch_size=4)
+    num_steps = 6
+    input_sequences = [_input_sequence(num_steps, seed) for seed in range(8)]
+    outputs = [[] for _ in input_sequences]
+
+    def client(i):
+      for t in range(num_steps):
+        outputs[i].append(server.step(i, input_sequences[i][t]))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    for input_sequence, output in zip(input_sequences, outputs):
+      self.assertAllClose(tf.stack(output), _unroll(core, input_sequence))
+
+  def test_evicts_least_recently_active(self):
+    core = recurrent.VanillaRNN(HIDDEN_SIZE)
+    server = streaming.StreamingRNN(core, capacity=2, max_batch_size=1)
+    inputs = _input_sequence(2, seed=0)
+    first = server.step("a", inputs[0])
+    server.step("b", inputs[0])
+    server.step("a", inputs[1])
+    server.step("c", inputs[0])
+
+    self.assertEqual(server.num_sessions, 2)
+    self.assertIn("a", server)
+    self.assertNotIn("b", server)
+    self.assertIn("c", server)
+    # An evicted session restarts from the initial state.
+    self.assertAllClose(server.step("b", inputs[0]), first)
+
+  def test_end_session(self):
+    core = recurrent.VanillaRNN(HIDDEN_SIZE)
+    server = streaming.StreamingRNN(core, capacity=2, max_batch_size=1)
+    inputs = _input_sequence(2, seed=0)
+    first = server.step("a", inputs[0])
+    server.step("a", inputs[1])
+
+    self.assertTrue(server.end_session("a"))
+    self.assertFalse(server.end_session("a"))
+    self.assertEqual(server.num_sessions, 0)
+    self.assertAllClose(server.step("a", inputs[0]), first)
+
+  def test_evict_idle(self):
+    clock = FakeClock()
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=1,
+        clock=clock)
+    inputs = _input_sequence(1, seed=0)[0]
+    server.step("a", inputs)
+    clock.time = 5.
+    server.step("b", inputs)
+    clock.time = 10.
+    server.step("c", inputs)
+    clock.time = 12.
+
+    self.assertEqual(server.evict_idle(4.), 2)
+    self.assertNotIn("a", server)
+    self.assertNotIn("b", server)
+    self.assertIn("c", server)
+
+  def test_step_batch_duplicate_sessions(self):
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=4)
+    with self.assertRaisesRegex(ValueError, "must be distinct"):
+      server.step_batch(["a", "a"], tf.ones([2, INPUT_SIZE]))
+
+  def test_step_batch_too_large(self):
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=2)
+    with self.assertRaisesRegex(ValueError, "max_batch_size is 2"):
+      server.step_batch(["a", "b", "c"], tf.ones([3, INPUT_SIZE]))
+
+  @parameterized.parameters((0, 1), (4, 0), (2, 4))
+  def test_invalid_sizes(self, capacity, max_batch_size):
+    with self.assertRaises(ValueError):
+      streaming.StreamingRNN(
+          recurrent.VanillaRNN(HIDDEN_SIZE), capacity=capacity,
+          max_batch_size=max_batch_size)
+
+  def test_error_is_raised_in_caller(self):
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=1)
+    server.step("a", tf.ones([INPUT_SIZE]))
+    with self.assertRaises(Exception):
+      server.step("a", tf.ones([INPUT_SIZE + 1]))
+
+
+  def test_step_batch_waits_for_running_batch(self):
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=2)
+    with server._cond:
+      server._running = True  # As if another caller is running a batch.
+
+    done = threading.Event()
+
+    def client():
+      server.step_batch(["a", "b"], tf.ones([2, INPUT_SIZE]))
+      done.set()
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    self.assertFalse(done.wait(0.2))
+    self.assertNotIn("a", server)
+
+    with server._cond:
+      server._running = False
+      server._cond.notify_all()
+    thread.join()
+    self.assertTrue(done.is_set())
+    self.assertIn("a", server)
+    self.assertFalse(server._running)
+
+  def test_assign_slots_error_completes_popped_requests(self):
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=2)
+    waiting = streaming._Request("b", tf.ones([INPUT_SIZE]))
+    server._pending.append(waiting)
+
+    def assign_slots(session_ids):
+      del session_ids
+      raise RuntimeError("assign failed")
+
+    server._assign_slots = assign_slots
+    with self.assertRaisesRegex(RuntimeError, "assign failed"):
+      server.step("a", tf.ones([INPUT_SIZE]))
+    # The other request taken from the queue is also completed.
+    self.assertTrue(waiting.done)
+    self.assertIsInstance(waiting.error, RuntimeError)
+    self.assertFalse(server._running)
+
+  def test_run_pending_batch_without_pending(self):
+    server = streaming.StreamingRNN(
+        recurrent.VanillaRNN(HIDDEN_SIZE), capacity=4, max_batch_size=2)
+    request = streaming._Request("a", tf.ones([INPUT_SIZE]))
+    self.assertFalse(server._run_pending_batch(request))
+
+
+if __name__ == "__main__":
+  tf.test.main()